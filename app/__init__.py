@@ -111,7 +111,7 @@ async def init_service_modules():
 
     logger.info("🪄 正在初始化外部服务 (Redis / MQ / EventBus / WebSocket)...")
 
-    # 并发启动所有 BaseService.init()
+    # 按 depends_on 分层并发启动所有 BaseService.init()
     await service.init_all()
 
     logger.info("✅ 异步服务模块启动完成")
@@ -142,7 +142,7 @@ async def lifespan(app: FastAPI):
     logger.info("🚀 FastAPI 启动中，正在初始化模块...")
 
     # 1️⃣ 初始化所有扩展服务（包括 Redis/MQ/EventBusService）
-    await init_service_modules()
+    cleanup_services = await init_service_modules()
 
     # 2️⃣ 注册 Pedro Core（JWT、中间件、异常、蓝图）
     await register_pedro_core()(app)
@@ -157,12 +157,16 @@ async def lifespan(app: FastAPI):
     # ---- shutdown 阶段 ----
     logger.info("🧹 FastAPI 正在关闭中，清理资源...")
 
+    # 按依赖逆序关闭扩展服务（flush 登录风控队列等）
+    await cleanup_services()
+
 
 # ======================================================
 # 🏗️ 应用工厂
 # ======================================================
 def create_app() -> FastAPI:
     """构建 FastAPI 实例并注册所有依赖"""
+    from app.pedro.response import PedroJSONResponse
     settings = get_current_settings()
     # ✅ 根据环境动态关闭 Swagger
     docs_url = "/docs" if settings.app.debug else None
@@ -179,6 +183,7 @@ def create_app() -> FastAPI:
         description="Pedro CMS built on FastAPI",
         debug=settings.app.debug,
         lifespan=lifespan,   # ✅ 新增：lifespan 生命周期控制
+        default_response_class=PedroJSONResponse,  # ✅ 直接返回 dict 的路由同样按请求语言翻译 msg
     )
 
     # 注册模块和中间件
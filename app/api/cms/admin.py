@@ -37,6 +37,7 @@ from app.api.cms.services.wallet.wallet_sync_service import WalletSyncService
 from app.api.v1.services.user_service import UserService
 from app.extension.google_tools.firestore import fs_service
 from app.extension.redis.redis_client import rds
+from app.extension.websocket.presence import presence
 from app.extension.websocket.tasks.ws_user_notify import notify_user, notify_broadcast
 
 from app.config.settings_manager import get_current_settings
@@ -176,14 +177,20 @@ async def list_ledger(
 
 @rp.get("/ws/online/count")
 async def get_ws_online_count() -> int:
-    r = await rds.instance()
-    return await r.scard("ws:online:uids")
+    return await presence.count()
 
 
 @rp.get("/ws/online/detail/{uid}")
 async def get_ws_online_detail(uid: int) -> dict:
-    r = await rds.instance()
-    return await r.hgetall(f"ws:online:detail:{uid}")
+    [(is_online, last_seen)] = await presence.last_seen_many([uid])
+    return {"is_online": is_online, "last_seen": last_seen} if last_seen is not None else {}
+
+
+@rp.get("/db/pool/stats", dependencies=[Depends(admin_required)])
+async def get_db_pool_stats():
+    """数据库连接池状态（checkout 等待 / 使用率）"""
+    from app.pedro.db import pool_stats
+    return PedroResponse.success(data=pool_stats())
 
 
 @rp.post("/binance/switch/{state}")
@@ -4,6 +4,7 @@ from sqlalchemy import select, func, text
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.pedro.model import User as LinUser
 from app.pedro.db import Base, async_session_factory
+from app.pedro.user_cache import user_cache
 from app.util.jsonb_update import JsonbManager
 from typing import List
 
@@ -14,25 +15,25 @@ class User(LinUser):
         super().__init__(**kwargs)
         self._exclude = ["delete_time", "create_time", "is_deleted", "update_time"]
 
-    async def jset(self, key, value):
+    @classmethod
+    async def _jsonb_write(cls, op, user_id: int, *args):
+        """JsonbManager 直接执行 UPDATE 语句（不经 ORM flush），提交后手动清理认证用户缓存"""
         async with async_session_factory() as session:
-            await JsonbManager.set(session, self.__class__, self.id, key, value)
+            await op(session, cls, user_id, *args)
             await session.commit()
+        user_cache.discard(user_id)
+
+    async def jset(self, key, value):
+        await self._jsonb_write(JsonbManager.set, self.id, key, value)
 
     async def jinc(self, key, amount):
-        async with async_session_factory() as session:
-            await JsonbManager.inc(session, self.__class__, self.id, key, amount)
-            await session.commit()
+        await self._jsonb_write(JsonbManager.inc, self.id, key, amount)
 
     async def jremove(self, key):
-        async with async_session_factory() as session:
-            await JsonbManager.remove(session, self.__class__, self.id, key)
-            await session.commit()
+        await self._jsonb_write(JsonbManager.remove, self.id, key)
 
     async def jpush(self, key, value):
-        async with async_session_factory() as session:
-            await JsonbManager.append(session, self.__class__, self.id, key, value)
-            await session.commit()
+        await self._jsonb_write(JsonbManager.append, self.id, key, value)
 
     async def jpush_unique_path(self, path: str, value: dict, unique_fields=None, limit=5):
         if not isinstance(value, dict):
@@ -69,15 +70,11 @@ class User(LinUser):
 
     @classmethod
     async def update_json(cls, user_id: int, key: str, value: any):
-        async with async_session_factory() as session:
-            await JsonbManager.set(session, cls, user_id, key, value)
-            await session.commit()
+        await cls._jsonb_write(JsonbManager.set, user_id, key, value)
 
     @classmethod
     async def inc_json(cls, user_id: int, key: str, amount: float):
-        async with async_session_factory() as session:
-            await JsonbManager.inc(session, cls, user_id, key, amount)
-            await session.commit()
+        await cls._jsonb_write(JsonbManager.inc, user_id, key, amount)
 
     @classmethod
     async def add_login_device(cls, user_id: int, device: dict):
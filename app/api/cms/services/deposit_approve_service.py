@@ -7,7 +7,7 @@ from app.api.v1.model.deposit import Deposit
 from app.api.v1.model.user_wallet import UserWallets
 from app.extension.google_tools.rtdb import rtdb
 from app.extension.google_tools.rtdb_message import rtdb_msg
-from app.extension.websocket.wss import websocket_manager
+from app.extension.eventbus import eventbus
 from app.pedro.exception import ParameterError
 from app.pedro.manager import manager
 
@@ -73,12 +73,12 @@ class DepositApproveService:
 
         ### ✅ 通知
 
-        # WebSocket 实时推送
-        await websocket_manager.send_to_user(user_id, {
+        # WebSocket 实时推送（outbox 异步投递，由 WebSocketAdapter 按 uid 推送）
+        await eventbus.publish_nowait("wallet.admin_recharge", {"uid": user_id, "message": {
             "event": "admin_recharge",
             "amount": float(amt),
             "balance": float(new_balance)
-        })
+        }})
 
         # Firebase 更新余额
         await rtdb_msg.update_balance(user_id, float(new_balance))
@@ -7,7 +7,7 @@
 """
 from typing import Optional, Tuple, List
 from app.api.cms.model.user import User
-from app.extension.redis.redis_client import rds
+from app.extension.websocket.presence import presence
 
 
 class UserService:
@@ -47,23 +47,14 @@ class UserService:
             sort=sort,
         )
 
-        r = await rds.instance()
         results = []
 
-        # ✅ 批量取在线集合（sismember）+ 详情哈希（hget）
-        pipeline = r.pipeline()
-        for u in users:
-            uid = str(getattr(u, "id", None) or getattr(u, "uuid", None))
-            pipeline.sismember("ws:online:uids", uid)
-            pipeline.hget(f"ws:online:detail:{uid}", "last_seen")
-        redis_results = await pipeline.execute()
-
-        for i, u in enumerate(users):
-            uid = str(getattr(u, "uuid", None) or getattr(u, "id", None))
-            is_online = bool(redis_results[i * 2])
-            last_seen = redis_results[i * 2 + 1]
-            if isinstance(last_seen, bytes):
-                last_seen = last_seen.decode()
+        # ✅ 在线状态：ws:online ZSET 一次 ZMSCORE
+        presence_rows = await presence.last_seen_many(
+            getattr(u, "id", None) or getattr(u, "uuid", None) for u in users
+        )
+
+        for u, (is_online, last_seen) in zip(users, presence_rows):
 
             # 🧩 extra 信息
             extra = getattr(u, "extra", {}) or {}
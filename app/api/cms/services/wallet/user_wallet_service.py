@@ -14,7 +14,7 @@
 import asyncio
 from app.api.cms.services.wallet.wallet_secure_service import WalletSecureService
 from app.api.cms.services.wallet.wallet_sync_service import WalletSyncService
-from app.extension.websocket.tasks.ws_user_notify import notify_user
+from app.extension.eventbus import eventbus
 from app.pedro.response import PedroResponse
 
 
@@ -28,7 +28,7 @@ class WalletOrchestratorService:
           1. 调用 WalletSecureService.credit_wallet_admin
           2. Firestore + SQL 原子入账
           3. 异步同步 RTDB/Redis
-          4. 异步通知 WebSocket
+          4. 异步通知 WebSocket（EventBus outbox）
         """
         result = await WalletSecureService.credit_wallet_admin(
             uid=uid,
@@ -48,12 +48,12 @@ class WalletOrchestratorService:
             # 🔄 Firestore/RTDB 同步
             asyncio.create_task(WalletSyncService.sync_balance(uid, balance_after))
 
-            # 🔔 通知用户
-            await notify_user(uid, {
+            # 🔔 通知用户（outbox 异步投递）
+            await eventbus.publish_nowait("user.notify", {"user_id": uid, "event": {
                 "event": "wallet_credit",
                 "amount": amount,
-                "msg": f"账户入账 ${amount:.2f}",
-            })
+                "content": f"账户入账 ${amount:.2f}",
+            }})
 
             return PedroResponse.success(msg=f"充值成功：${amount:.2f} 已入账")
 
@@ -67,7 +67,7 @@ class WalletOrchestratorService:
           1. 调用 WalletSecureService.debit_wallet_admin
           2. Firestore + SQL 原子扣款
           3. 异步同步 RTDB/Redis
-          4. 异步通知 WebSocket
+          4. 异步通知 WebSocket（EventBus outbox）
         """
         result = await WalletSecureService.debit_wallet_admin(
             uid=uid,
@@ -87,12 +87,12 @@ class WalletOrchestratorService:
             # 🔄 同步余额
             asyncio.create_task(WalletSyncService.sync_balance(uid, balance_after))
 
-            # 🔔 通知用户
-            await notify_user(uid, {
+            # 🔔 通知用户（outbox 异步投递）
+            await eventbus.publish_nowait("user.notify", {"user_id": uid, "event": {
                 "event": "wallet_debit",
                 "amount": amount,
-                "msg": f"账户扣款 ${amount:.2f}",
-            })
+                "content": f"账户扣款 ${amount:.2f}",
+            }})
 
             return PedroResponse.success(msg=f"扣款成功：${amount:.2f}")
 
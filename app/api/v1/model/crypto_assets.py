@@ -19,6 +19,7 @@ class CryptoAsset(InfoCrud):
     """虚拟货币模型（含热门标记）"""
 
     __tablename__ = "crypto_assets"
+    __upsert_key__ = ("coin_id",)
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     coin_id = Column(String(50), unique=True, nullable=False)
@@ -33,6 +34,8 @@ class CryptoAsset(InfoCrud):
     sparkline = Column(JSON)
     last_updated = Column(DateTime, default=datetime.utcnow)
     source = Column(String(50), default="coingecko")
+    # 批量采集的行内容哈希（bulk_upsert 据此在库内跳过未变化的行）
+    content_hash = Column(String(32))
 
     # 🔥 热门标签
     is_hot = Column(Boolean, default=False)
@@ -43,14 +46,9 @@ class CryptoAsset(InfoCrud):
     # 异步 Upsert
     # ======================================================
     @classmethod
-    async def upsert_from_external(cls, data: dict, is_trending: bool = False):
-        """
-        异步 Upsert 带热门标签判断
-        """
+    def _external_fields(cls, data: dict, is_trending: bool = False) -> dict:
+        """CoinGecko 数据 → 模型字段（含热门标签判断）"""
         coin_id = str(data.get("id"))
-        if not coin_id:
-            logger.warning("⚠️ 跳过无效数据（缺少 id）")
-            return None
 
         # 自动计算热门（基于市值、成交量、涨幅）
         market_cap_rank = data.get("market_cap_rank")
@@ -63,7 +61,7 @@ class CryptoAsset(InfoCrud):
             or (abs(price_change) >= 5)
         )
 
-        fields = dict(
+        return dict(
             coin_id=coin_id,
             symbol=data.get("symbol"),
             name=data.get("name"),
@@ -80,6 +78,18 @@ class CryptoAsset(InfoCrud):
             source="coingecko",
         )
 
+    @classmethod
+    async def upsert_from_external(cls, data: dict, is_trending: bool = False):
+        """
+        异步 Upsert 带热门标签判断
+        """
+        if not data.get("id"):
+            logger.warning("⚠️ 跳过无效数据（缺少 id）")
+            return None
+
+        fields = cls._external_fields(data, is_trending)
+        coin_id = fields["coin_id"]
+
         async with get_session() as session:
             result = await session.execute(select(cls).where(cls.coin_id == coin_id))
             asset: Optional[cls] = result.scalar_one_or_none()
@@ -98,3 +108,25 @@ class CryptoAsset(InfoCrud):
                 await session.refresh(asset)
                 logger.info(f"✅ 新增币种: {asset.name}")
                 return asset
+
+    # ======================================================
+    # 📦 批量入库（采集任务使用）
+    # ======================================================
+    @classmethod
+    async def bulk_upsert_from_external(cls, items: list[dict], trending_ids=(), chunk_size: int = 500) -> dict:
+        """
+        批量 Upsert：每 chunk_size 行一条 INSERT ... ON CONFLICT，行情未变化的币种跳过
+        （last_updated 不参与比对）
+        """
+        trending_ids = set(trending_ids)
+        rows = [
+            cls._external_fields(item, item.get("id") in trending_ids)
+            for item in items
+            if item.get("id")
+        ]
+        stats = await cls.bulk_upsert(rows, chunk_size=chunk_size, hash_exclude=("last_updated",))
+        logger.info(
+            f"📦 币种批量入库: {stats['rows']} 条 | 写入 {stats['written']} | "
+            f"未变化跳过 {stats['skipped']} | {stats['chunks']} 批"
+        )
+        return stats
@@ -20,6 +20,9 @@ class ShopProduct(InfoCrud):
     """商品模型（Pedro-Core 异步 ORM 版）"""
 
     __tablename__ = "shop_product"
+    __upsert_key__ = ("external_id",)
+    # 检索字段（PostgreSQL pg_trgm / SQLite FTS5 trigram，见 app.pedro.search）
+    __search_fields__ = ("title", "description", "brand")
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     external_id = Column(String(50), unique=True, nullable=True)
@@ -48,6 +51,8 @@ class ShopProduct(InfoCrud):
     source = Column(String(50), default="dummyjson")
     quantity_available = Column(Integer, default=100)
     lang = Column(String(10), default="en")
+    # 批量采集的行内容哈希（bulk_upsert 据此在库内跳过未变化的行）
+    content_hash = Column(String(32))
 
     # ✅ 利润体系
     cost_price = Column(Numeric(10, 2), nullable=False, default=0.00, comment="平台采购价")
@@ -64,11 +69,8 @@ class ShopProduct(InfoCrud):
     # 🔁 异步 Upsert 操作（全字段版）
     # ======================================================
     @classmethod
-    async def upsert_from_external(cls, data: dict):
-        """
-        异步 Upsert：存在则更新，否则创建
-        自动合并 DummyJSON & 自定义采集字段
-        """
+    def _external_fields(cls, data: dict) -> dict:
+        """采集数据 → 模型字段（DummyJSON & 自定义采集字段）"""
         external_id = str(data.get("id") or data.get("external_id"))
 
         # ✅ 自动映射 DummyJSON 字段名差异
@@ -103,7 +105,16 @@ class ShopProduct(InfoCrud):
         )
 
         # ✅ 移除 None，避免覆盖已有数据为 null
-        clean_fields = {k: v for k, v in fields.items() if v is not None}
+        return {k: v for k, v in fields.items() if v is not None}
+
+    @classmethod
+    async def upsert_from_external(cls, data: dict):
+        """
+        异步 Upsert：存在则更新，否则创建
+        自动合并 DummyJSON & 自定义采集字段
+        """
+        clean_fields = cls._external_fields(data)
+        external_id = clean_fields["external_id"]
 
         async with get_session() as session:
             result = await session.execute(select(cls).where(cls.external_id == external_id))
@@ -123,3 +134,19 @@ class ShopProduct(InfoCrud):
                 await session.refresh(product)
                 logger.info(f"✅ 新增商品: {product.title} | 价格: {product.retail_price}")
                 return product
+
+    # ======================================================
+    # 📦 批量入库（采集任务使用）
+    # ======================================================
+    @classmethod
+    async def bulk_upsert_from_external(cls, items: list[dict], chunk_size: int = 500) -> dict:
+        """
+        批量 Upsert：每 chunk_size 行一条 INSERT ... ON CONFLICT，内容未变化的商品跳过
+        """
+        rows = [cls._external_fields(data) for data in items]
+        stats = await cls.bulk_upsert(rows, chunk_size=chunk_size)
+        logger.info(
+            f"📦 商品批量入库: {stats['rows']} 条 | 写入 {stats['written']} | "
+            f"未变化跳过 {stats['skipped']} | {stats['chunks']} 批"
+        )
+        return stats
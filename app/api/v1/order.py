@@ -10,7 +10,7 @@ from app.api.v1.model.shop_product import ShopProduct
 from app.api.v1.schema.user import CreateShopSchema
 from app.extension.google_tools.rtdb_message import rtdb_msg
 from app.extension.rabbitmq.constances import QUEUE_ORDER_DELAY
-from app.extension.websocket.tasks.ws_user_notify import notify_user
+from app.extension.eventbus import eventbus
 from app.pedro import async_session_factory
 from app.api.v1.model.order import Order
 from app.extension.rabbitmq.rabbit import rabbit as rabbitmq_service, rabbit
@@ -55,13 +55,13 @@ async def create_order(data: CreateShopSchema, user=Depends(login_required)):
             "product_id": data.product_id, },
         delay_ms="20s"
     )
-    # 通知用户
-    await notify_user(order.user_id, {
+    # 通知用户（outbox 异步投递，不等待翻译与 WS 推送）
+    await eventbus.publish_nowait("user.notify", {"user_id": order.user_id, "event": {
         "event": "order_created",
         "order_id": order.id,
         "price": data.amount,
-        "msg": "订单创建成功 ✅"
-    })
+        "content": "订单创建成功 ✅"
+    }})
 
     # 通知后台，有新的订单更新
     await rtdb_msg.send_message(user.id, "您的订单已发货 ✅")
@@ -28,7 +28,7 @@ async def product_list(
         category: str | None = None,
         brand: str | None = None,
         featured: Optional[bool] = Query(None, description="是否精选"),
-        order_by: str = "id",
+        order_by: Optional[str] = Query(None, description="排序字段，默认：搜索时按相关度，否则按 id"),
         sort: str = "desc",
         user=Depends(optional_login),  # ✅ 改为可选登录
 ):
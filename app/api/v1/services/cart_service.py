@@ -79,31 +79,55 @@ class CartService:
         if not data:
             return {"items": [], "total": 0}
 
+        # 🔹 解析购物车条目，非法 product_id 直接清理
+        cart = {}
+        stale = []
+        for product_id, json_val in data.items():
+            try:
+                cart[int(product_id)] = json.loads(json_val)
+            except (TypeError, ValueError):
+                stale.append(product_id)
+
+        # 🔹 一次 IN 查询取回所有商品（只取展示所需列）
+        products = {}
+        if cart:
+            async with async_session_factory() as session:
+                result = await session.execute(
+                    select(
+                        ShopProduct.id,
+                        ShopProduct.title,
+                        ShopProduct.price,
+                        ShopProduct.thumbnail,
+                    ).where(
+                        ShopProduct.id.in_(list(cart)),
+                        ShopProduct.is_deleted == False,
+                    )
+                )
+                products = {row.id: row for row in result.all()}
+
         items = []
         total = 0
 
-        async with async_session_factory() as session:
-            for product_id, json_val in data.items():
-                cart_data = json.loads(json_val)
+        for product_id, cart_data in cart.items():
+            product = products.get(product_id)
 
-                result = await session.execute(
-                    select(ShopProduct).where(ShopProduct.id == int(product_id))
-                )
-                product = result.scalar_one_or_none()
-
-                if not product:
-                    continue  # 商品下架也不会报错
-
-                subtotal = float(product.price) * cart_data["qty"]
-                total += subtotal
-
-                items.append({
-                    "product_id": product.id,
-                    "title": product.title,
-                    "price": float(product.price),
-                    "thumbnail": product.thumbnail,
-                    "quantity": cart_data["qty"],
-                    "subtotal": subtotal
-                })
+            if not product:
+                stale.append(str(product_id))  # 商品下架 / 删除 → 从购物车移除
+                continue
+
+            subtotal = float(product.price) * cart_data["qty"]
+            total += subtotal
+
+            items.append({
+                "product_id": product.id,
+                "title": product.title,
+                "price": float(product.price),
+                "thumbnail": product.thumbnail,
+                "quantity": cart_data["qty"],
+                "subtotal": subtotal
+            })
+
+        if stale:
+            await r.hdel(key, *stale)
 
         return {"items": items, "total": round(total, 2)}
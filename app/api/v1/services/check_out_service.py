@@ -4,7 +4,7 @@ from app.api.v1.model.user_address import UserAddress
 
 from app.api.v1.services.cart_service import CartService
 from app.extension.rabbitmq.rabbit import rabbit
-from app.pedro import async_session_factory
+from app.pedro import unit_of_work
 from app.pedro.response import PedroResponse
 from app.util.order_number_generator import OrderNumberGenerator
 
@@ -13,10 +13,6 @@ class CheckoutService:
 
     @staticmethod
     async def checkout(uid: str, address_id: int):
-        address_id = UserAddress.get(id=address_id)
-        if not address_id:
-            return PedroResponse.fail(msg="Address not found")
-
         cart = await CartService.get_cart(uid)
         if not cart["items"]:
             raise ValueError("Cart is empty")
@@ -28,7 +24,12 @@ class CheckoutService:
         subtotal = cart["total"]
         total = subtotal + shipping_fee - discount
 
-        async with async_session_factory() as session:
+        # 地址校验 + 订单 + 明细在同一个事务里，结束时统一提交
+        async with unit_of_work() as session:
+            address = await UserAddress.get(id=address_id)
+            if not address:
+                return PedroResponse.fail(msg="Address not found")
+
             # 保存订单
             order = ShopOrders(
                 user_id=uid,
@@ -37,7 +38,7 @@ class CheckoutService:
                 total=total,
                 shipping_fee=shipping_fee,
                 discount=discount,
-                address_id=address_id
+                address_id=address.id
             )
             session.add(order)
             await session.flush()  # 获取 order.id
@@ -53,8 +54,6 @@ class CheckoutService:
                 )
                 session.add(entry)
 
-            await session.commit()
-
         # 🔄 推送到 MQ 做库存扣减 / 后台处理
         await rabbit.publish_delay(message={"task_type": "order.create", "order_id": order.id, "user_id": uid},
                                    delay_ms="1d")
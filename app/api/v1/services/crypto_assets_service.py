@@ -73,13 +73,7 @@ class CryptoCollectorService:
             logger.exception(f"❌ 采集失败: {e}")
             return {"status": "error", "message": str(e)}
 
-        # Upsert 所有币
-        tasks = []
-        for item in markets:
-            coin_id = item.get("id")
-            is_trending = coin_id in trending_ids
-            tasks.append(CryptoAsset.upsert_from_external(item, is_trending))
-
-        await asyncio.gather(*tasks)
+        # 批量 Upsert（多行 ON CONFLICT，行情未变化的币种跳过）
+        await CryptoAsset.bulk_upsert_from_external(markets, trending_ids)
         logger.info(f"✅ 虚拟货币同步完成，共 {len(markets)} 条")
         return {"status": "success", "count": len(markets)}
@@ -33,7 +33,7 @@ class ProductService:
             category: Optional[str] = None,
             brand: Optional[str] = None,
             featured: Optional[bool] = None,
-            order_by: str = "id",
+            order_by: Optional[str] = None,
             sort: str = "desc",
             page: int = 1,
             size: int = 10,
@@ -42,6 +42,7 @@ class ProductService:
         🔍 获取商品列表（支持搜索、筛选、分页 + 是否收藏）
         ---------------------------------------------
         :param uid: 用户ID（可选，用于判断收藏状态）
+        :param order_by: 为空时：有关键词按相关度，否则按 id 倒序
         :return: (items, total)
         """
 
@@ -145,7 +146,7 @@ class ProductService:
     @staticmethod
     async def search_products(uid: int, keyword: str, limit: int = 20):
         """
-        🔍 搜索商品（模糊匹配 title / description / brand）
+        🔍 搜索商品（全文索引匹配 title / description / brand，按相关度排序）
         -------------------------------------------------
         Firestore 路径:
             users/{uid}/search_history/{keyword}
@@ -154,13 +155,11 @@ class ProductService:
         if not keyword:
             return PedroResponse.fail(msg="搜索关键词不能为空")
 
-        # 1️⃣ ORM 模糊搜索（调用 BaseCrud.filter_like）
+        # 1️⃣ 全文检索（BaseCrud.filter_like，未建索引时回退模糊匹配）
         products = await ShopProduct.filter_like(
             keyword=keyword,
             fields=["title", "description", "brand"],
             limit=limit,
-            order_by="id",
-            sort="desc",
         )
 
         # 2️⃣ Firestore 写入搜索历史（去重 + 自增）
@@ -6,7 +6,6 @@
 @Software: PyCharm
 """
 import aiohttp
-import asyncio
 import random
 from decimal import Decimal
 from typing import List, Dict, Any
@@ -32,7 +31,7 @@ class ProductCollectorService:
     """🛍️ 商品采集服务（DummyJSON v2 全字段版 + 自动利润计算）"""
 
     DUMMY_URL = "https://dummyjson.com/products"
-    CONCURRENCY = 20
+    CHUNK_SIZE = 500
 
     # ----------------------------------------
     # 主采集入口
@@ -119,24 +118,20 @@ class ProductCollectorService:
         return products
 
     # ----------------------------------------
-    # 并发保存
+    # 批量保存（每 CHUNK_SIZE 行一条 INSERT ... ON CONFLICT，未变化的商品跳过）
     # ----------------------------------------
     @classmethod
     async def _bulk_save(cls, items: List[Dict[str, Any]], lang: str):
-        sem = asyncio.Semaphore(cls.CONCURRENCY)
-
-        async def _task(item):
-            async with sem:
-                return await cls._save_product(item, lang)
-
-        results = await asyncio.gather(*[_task(it) for it in items], return_exceptions=True)
-        return [r for r in results if isinstance(r, dict)]
+        payloads = [p for p in (cls._build_payload(it, lang) for it in items) if p]
+        if payloads:
+            await ShopProduct.bulk_upsert_from_external(payloads, chunk_size=cls.CHUNK_SIZE)
+        return payloads
 
     # ----------------------------------------
-    # 保存 + 利润计算
+    # 入库字段 + 利润计算
     # ----------------------------------------
     @classmethod
-    async def _save_product(cls, item: dict, lang: str):
+    def _build_payload(cls, item: dict, lang: str) -> Dict[str, Any]:
         try:
             retail_price = _to_decimal(item.get("price"))
             cost_price = (retail_price * Decimal("0.8")).quantize(Decimal("0.01"))
@@ -171,10 +166,9 @@ class ProductCollectorService:
                 "source": "dummyjson",
             }
 
-            obj = await ShopProduct.upsert_from_external(payload)
-            return obj.to_dict()
+            return payload
 
         except Exception as e:
-            logger.error(f"❌ 保存商品失败: {item.get('title')} | {e}")
+            logger.error(f"❌ 商品数据处理失败: {item.get('title')} | {e}")
             return {}
 
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+# @Time    : 2025/11/26 11:00
+# @Author  : Pedro
+# @File    : migrate.py
+# @Software: PyCharm
+
+已有库的结构迁移（部署时执行一次：python -m app.cli.db.migrate）
+---------------------------------------------
+✅ 新库由 create_all 直接建出最新结构；这里只补齐已存在的表
+✅ 每个迁移幂等（先检查再执行），可重复运行
+✅ 只在部署阶段单进程执行，worker 启动时不跑 DDL
+"""
+import asyncio
+
+from sqlalchemy import inspect, text
+
+from app.pedro.db import get_engine
+
+# 批量采集行内容哈希列（见 BaseCrud.bulk_upsert）
+CONTENT_HASH_TABLES = ("shop_product", "crypto_assets")
+
+
+def add_content_hash(conn):
+    """可空、无默认值的新列：PostgreSQL 只改元数据，不重写表"""
+    inspector = inspect(conn)
+    quote = conn.dialect.identifier_preparer.quote
+    for table in CONTENT_HASH_TABLES:
+        if not inspector.has_table(table):
+            continue
+        if any(c["name"] == "content_hash" for c in inspector.get_columns(table)):
+            continue
+        conn.execute(text(f"ALTER TABLE {quote(table)} ADD COLUMN content_hash VARCHAR(32)"))
+        print(f"✅ {table}.content_hash 已添加")
+
+
+MIGRATIONS = [
+    add_content_hash,
+]
+
+
+async def migrate(engine=None):
+    engine = engine or get_engine()
+    for step in MIGRATIONS:
+        print(f"🧩 迁移: {step.__name__}")
+        async with engine.begin() as conn:
+            await conn.run_sync(step)
+    print("✅ 数据库迁移完成")
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
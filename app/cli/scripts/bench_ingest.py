@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+# @Time    : 2025/11/23 16:10
+# @Author  : Pedro
+# @File    : bench_ingest.py
+# @Software: PyCharm
+
+商品采集入库压测（默认 SQLite）：逐行 upsert_from_external vs 批量 bulk_upsert
+    python -m app.cli.scripts.bench_ingest --rows 20000 --per-row 2000
+最后两轮比对 content_hash 列：内容未变化的行由 DO UPDATE ... WHERE 在库内跳过。
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.api.v1.model.shop_product import ShopProduct
+from app.pedro.db import async_session_factory
+from app.pedro.logger import logger
+
+
+def fake_product(i: int, price: float = 10.0) -> dict:
+    return {
+        "id": i,
+        "title": f"Product {i}",
+        "description": "bench product " * 8,
+        "brand": "Bench",
+        "category": "bench",
+        "stock": i % 100,
+        "retail_price": price,
+        "cost_price": round(price * 0.8, 2),
+        "sale_price": round(price * 0.88, 2),
+        "images": [f"https://cdn.example.com/{i}/1.jpg", f"https://cdn.example.com/{i}/2.jpg"],
+        "rating": 4.5,
+        "lang": "en",
+        "source": "bench",
+    }
+
+
+async def timed(label: str, rows: int, coro):
+    start = time.perf_counter()
+    result = await coro
+    cost = time.perf_counter() - start
+    print(f"   {label:<28} {rows:>7} 行  {cost:7.2f}s  {rows / cost:>10,.0f} 行/秒  {result or ''}")
+
+
+async def run(url: str, rows: int, per_row: int, chunk_size: int):
+    engine = create_async_engine(url)
+    async_session_factory.configure(bind=engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(ShopProduct.__table__.drop, checkfirst=True)
+        await conn.run_sync(ShopProduct.__table__.create)
+
+    print(f"📊 {url} | rows={rows} per_row={per_row} chunk={chunk_size}")
+
+    async def one_by_one():
+        for i in range(per_row):
+            await ShopProduct.upsert_from_external(fake_product(i))
+
+    logger.disable("app")  # 逐行路径每行一条日志，压测时关闭
+    await timed("逐行 upsert_from_external", per_row, one_by_one())
+
+    fresh = [ShopProduct._external_fields(fake_product(per_row + i)) for i in range(rows)]
+    await timed("批量插入", rows, ShopProduct.bulk_upsert(fresh, chunk_size=chunk_size, skip_unchanged=False))
+
+    changed = [ShopProduct._external_fields(fake_product(per_row + i, 12.5)) for i in range(rows)]
+    await timed("批量更新", rows, ShopProduct.bulk_upsert(changed, chunk_size=chunk_size, skip_unchanged=False))
+
+    await timed("批量更新（记录哈希）", rows, ShopProduct.bulk_upsert(changed, chunk_size=chunk_size))
+    await timed("重复采集（内容未变化）", rows, ShopProduct.bulk_upsert(changed, chunk_size=chunk_size))
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="sqlite+aiosqlite:///bench_ingest.db")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--per-row", type=int, default=2000)
+    parser.add_argument("--chunk", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.rows, args.per_row, args.chunk))
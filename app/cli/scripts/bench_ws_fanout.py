@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+# @Time    : 2025/11/21 09:30
+# @Author  : Pedro
+# @File    : bench_ws_fanout.py
+# @Software: PyCharm
+
+WebSocketManager 广播压测：N 个假连接订阅同一频道，其中少量连接“卡死”（send 永不返回），
+统计健康连接的投递延迟 p50 / p99 / max。
+    python -m app.cli.scripts.bench_ws_fanout --clients 10000 --stalled 5 --rounds 50
+"""
+import argparse
+import asyncio
+import time
+
+from app.extension.websocket.wss import WebSocketManager
+
+
+class FakeSocket:
+    """只实现 send_text 的假 WebSocket；stalled=True 时模拟网络卡死的客户端"""
+
+    def __init__(self, stalled: bool, latencies: list):
+        self.stalled = stalled
+        self.latencies = latencies
+
+    async def send_text(self, msg: str):
+        if self.stalled:
+            await asyncio.sleep(3600)
+        sent_at = float(msg[msg.index(":") + 1:-1])
+        self.latencies.append(time.perf_counter() - sent_at)
+
+
+def percentile(values: list, p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+async def run(clients: int, stalled: int, rounds: int, interval: float):
+    manager = WebSocketManager()
+    latencies: list = []
+    outboxes = []
+
+    for i in range(clients):
+        ws = FakeSocket(stalled=i < stalled, latencies=latencies)
+        await manager.connect(ws, uid=str(i))
+        manager.channels.setdefault("bench", set()).add(ws)
+        manager.clients[ws]["channels"].add("bench")
+        outboxes.append(manager.clients[ws]["outbox"])
+
+    started = time.perf_counter()
+    enqueue_cost = []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        await manager.broadcast("bench", {"t": t0})
+        enqueue_cost.append(time.perf_counter() - t0)
+        await asyncio.sleep(interval)
+
+    # 等待健康连接把队列写完
+    expected = (clients - stalled) * rounds
+    while len(latencies) < expected and time.perf_counter() - started < 60:
+        await asyncio.sleep(0.01)
+
+    print(f"📊 clients={clients} stalled={stalled} rounds={rounds}")
+    print(f"   delivered={len(latencies)}/{expected}")
+    print(f"   broadcast() 耗时: p50={percentile(enqueue_cost, 0.5) * 1000:.2f}ms "
+          f"p99={percentile(enqueue_cost, 0.99) * 1000:.2f}ms")
+    print(f"   投递延迟: p50={percentile(latencies, 0.5) * 1000:.2f}ms "
+          f"p99={percentile(latencies, 0.99) * 1000:.2f}ms "
+          f"max={max(latencies, default=0) * 1000:.2f}ms")
+
+    dropped = sum(o.dropped for o in outboxes)
+    print(f"   丢弃消息数: {dropped} | 因超时被断开的连接: {clients - len(manager.clients)}")
+
+    for ws in list(manager.clients):
+        await manager.disconnect(ws)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=10000)
+    parser.add_argument("--stalled", type=int, default=5)
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--interval", type=float, default=0.02)
+    args = parser.parse_args()
+    asyncio.run(run(args.clients, args.stalled, args.rounds, args.interval))
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+"""
+# @Time    : 2025/11/20 10:12
+# @Author  : Pedro
+# @File    : migrate_token_index.py
+# @Software: PyCharm
+
+把旧版本签发的 token:{uid}:access|refresh:* 补录到用户 Token 索引（ZSET）
+部署新版 create_pair / revoke_all 后执行一次即可：
+    python -m app.cli.scripts.migrate_token_index
+"""
+import asyncio
+
+from app.extension.redis.redis_client import rds
+from app.pedro.pedro_jwt import jwt_service
+
+
+async def migrate():
+    count = await jwt_service.migrate_token_index()
+    print(f"✅ 已补录 {count} 个 Token 到用户索引")
+    await rds.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
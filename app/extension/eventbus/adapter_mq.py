@@ -32,10 +32,11 @@ class MQAdapter:
         """带源标识的广播"""
         if not self._connected:
             await self.init()
-        payload["_src"] = MQAdapter.SOURCE_ID
+        # 拷贝后再打标记：payload 与其它 adapter 共享，不能原地修改
+        body = {**payload, "_src": MQAdapter.SOURCE_ID}
         await self.exchange.publish(
             aio_pika.Message(
-                body=json.dumps(payload).encode(),
+                body=json.dumps(body).encode(),
                 delivery_mode=aio_pika.DeliveryMode.PERSISTENT
             ),
             routing_key=""
@@ -1,10 +1,13 @@
 import json
 import asyncio
+import uuid
 import redis.asyncio as aioredis
 from app.config.settings_manager import get_current_settings
 
 class RedisAdapter:
-    def __init__(self):
+    def __init__(self, source_id: str = None):
+        # 源节点标识：收到自己发出的广播时直接丢弃
+        self.source_id = source_id or str(uuid.uuid4())
         self.client = None
         self.pubsub = None
 
@@ -17,7 +20,7 @@ class RedisAdapter:
 
     async def publish(self, event_name, payload):
         if self.client:
-            await self.client.publish("eventbus", json.dumps(payload))
+            await self.client.publish("eventbus", json.dumps({**payload, "_src": self.source_id}))
 
     async def subscribe(self, callback):
         """后台任务，持续接收 Redis 广播"""
@@ -25,6 +28,8 @@ class RedisAdapter:
             if message["type"] == "message":
                 try:
                     payload = json.loads(message["data"])
+                    if payload.get("_src") == self.source_id:
+                        continue
                     await callback(payload)
                 except Exception as e:
                     print(f"⚠️ RedisAdapter 解析错误: {e}")
@@ -34,5 +34,6 @@ class WebSocketAdapter(BaseService):
         msg = data.get("message")
 
         if uid and msg:
+            # 跨节点只走 WS NodeRouter；其它节点中继来的事件不经过 adapter（见 EventBusService）
             await websocket_manager.send_to_user(uid, msg)
             print(f"📢 WS 推送用户 {uid}: {msg}")
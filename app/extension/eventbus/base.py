@@ -1,14 +1,73 @@
 import json
-from typing import Dict, Any, List, Callable
+import asyncio
+import time
+import uuid
+import zlib
+from typing import Dict, Any, List, Callable, Optional
+
+# outbox：Redis Stream + 消费组（多节点共享，每条事件只由一个节点投递）
+OUTBOX_STREAM = "eventbus:outbox"
+OUTBOX_GROUP = "eventbus"
+# 按这些字段分区到固定 worker，同一订单 / 用户的事件按发布顺序处理
+PARTITION_KEYS = ("order_id", "user_id", "uid")
+
 
 class EventBus:
-    """统一事件总线"""
-    def __init__(self):
+    """
+    统一事件总线
+    - 各 adapter（Redis / MQ / WS）并发投递，单个 adapter 超时不影响其它
+    - 本地订阅者按 key 分区到有界 worker 池，同 key 串行保序；队列满时 publish 等待（背压），stats() 可观测
+    - publish_nowait：写入 Redis Stream outbox 即返回，由后台消费组投递（订单 / 钱包路径使用）
+    """
+
+    def __init__(
+            self,
+            adapter_timeout: float = 3.0,
+            handler_timeout: float = 10.0,
+            max_workers: int = 8,
+            queue_size: int = 1000,
+            outbox_stream: str = OUTBOX_STREAM,
+            outbox_block_ms: int = 1000,
+            outbox_claim_idle_ms: int = 60000,
+    ):
         self.subscribers: Dict[str, List[Callable]] = {}
         self.adapters = []
 
+        self.adapter_timeout = adapter_timeout
+        self.handler_timeout = handler_timeout
+        self.max_workers = max_workers
+        self.queue_size = queue_size
+        # 消费者崩溃后，空闲超过 outbox_claim_idle_ms 的未确认事件由其它消费者认领重投
+        self.outbox_stream = outbox_stream
+        self.outbox_block_ms = outbox_block_ms
+        self.outbox_claim_idle_ms = outbox_claim_idle_ms
+        self._consumer = uuid.uuid4().hex
+
+        # 每个 worker 一条队列：同一分区 key 固定落到同一 worker
+        self._queues: List[asyncio.Queue] = []
+        self._workers: List[Optional[asyncio.Task]] = []
+        self._next_partition = 0
+        self._outbox_task: Optional[asyncio.Task] = None
+
+        # 📊 指标
+        self.metrics = {
+            "published": 0,
+            "adapter_errors": 0,
+            "adapter_timeouts": 0,
+            "handled": 0,
+            "handler_errors": 0,
+            "handler_timeouts": 0,
+            "backpressure_waits": 0,  # 入队时队列已满的次数
+            "backpressure_wait_ms": 0.0,  # 累计入队等待时间
+            "outbox_enqueued": 0,
+            "outbox_delivered": 0,
+            "outbox_claimed": 0,  # 认领其它（已崩溃）消费者遗留的事件数
+            "outbox_fallbacks": 0,  # Redis 不可用时退化为同步 publish 的次数
+        }
+
     def register_adapter(self, adapter):
-        self.adapters.append(adapter)
+        if adapter not in self.adapters:
+            self.adapters.append(adapter)
 
     def on(self, event_name: str):
         def wrapper(func):
@@ -16,20 +75,198 @@ class EventBus:
             return func
         return wrapper
 
-    async def publish(self, event_name: str, data: Dict[str, Any]):
+    # ======================================================
+    # 📢 发布
+    # ======================================================
+    async def publish(self, event_name: str, data: Dict[str, Any], relay: bool = True):
+        """
+        并发广播到所有 adapter；本地订阅者交给 worker 池（不等待其执行完成）
+        relay=False：其它节点中继过来的事件，只触发本地订阅者
+        """
         payload = {"event": event_name, "data": data}
-        # 统一广播
-        for adapter in self.adapters:
-            try:
-                await adapter.publish(event_name, payload)
-            except Exception as e:
-                print(f"⚠️ Adapter {adapter.__class__.__name__} 出错: {e}")
+        self.metrics["published"] += 1
+
+        # 统一广播（并发 + 单 adapter 超时）
+        if relay and self.adapters:
+            await asyncio.gather(*(self._publish_adapter(a, event_name, payload) for a in self.adapters))
 
         # 本地触发
-        for fn in self.subscribers.get(event_name, []):
+        handlers = self.subscribers.get(event_name, [])
+        if handlers:
+            self._ensure_workers()
+            for fn in handlers:
+                await self._submit(fn, data)
+
+    async def publish_nowait(self, event_name: str, data: Dict[str, Any]) -> bool:
+        """
+        fire-and-forget：一次 XADD 写入 outbox 即返回，不等待 adapter / 订阅者
+        - 事件持久化在 Redis Stream，进程崩溃后由其它 / 重启后的节点认领重投（至少一次，handler 需幂等）
+        - Redis 不可用时退化为同步 publish（会等待 fan-out，但不丢事件），返回 False
+        """
+        try:
+            redis = await self._redis()
+            await redis.xadd(self.outbox_stream, {
+                "event": event_name,
+                "data": json.dumps(data, ensure_ascii=False, default=str),
+            })
+        except Exception as e:
+            self.metrics["outbox_fallbacks"] += 1
+            print(f"⚠️ EventBus outbox 写入失败，改为同步投递 {event_name}: {e}")
+            await self.publish(event_name, data)
+            return False
+
+        self.metrics["outbox_enqueued"] += 1
+        self.start_outbox()
+        return True
+
+    async def _publish_adapter(self, adapter, event_name: str, payload: dict):
+        try:
+            await asyncio.wait_for(adapter.publish(event_name, payload), timeout=self.adapter_timeout)
+        except asyncio.TimeoutError:
+            self.metrics["adapter_timeouts"] += 1
+            print(f"⏰ Adapter {adapter.__class__.__name__} 超时 ({self.adapter_timeout}s): {event_name}")
+        except Exception as e:
+            self.metrics["adapter_errors"] += 1
+            print(f"⚠️ Adapter {adapter.__class__.__name__} 出错: {e}")
+
+    # ======================================================
+    # 👷 本地订阅者 worker 池（按 key 分区）
+    # ======================================================
+    def _ensure_workers(self):
+        if not self._queues:
+            size = max(self.queue_size // self.max_workers, 1)
+            self._queues = [asyncio.Queue(maxsize=size) for _ in range(self.max_workers)]
+            self._workers = [None] * self.max_workers
+        for i, worker in enumerate(self._workers):
+            if worker is None or worker.done():
+                self._workers[i] = asyncio.create_task(self._worker(self._queues[i]))
+
+    def _partition(self, data: Dict[str, Any]) -> int:
+        """同一 order_id / user_id 固定到同一 worker；无 key 的事件轮询分配"""
+        for key in PARTITION_KEYS:
+            value = data.get(key)
+            if value is not None:
+                return zlib.crc32(str(value).encode()) % self.max_workers
+        self._next_partition = (self._next_partition + 1) % self.max_workers
+        return self._next_partition
+
+    async def _submit(self, fn: Callable, data: Dict[str, Any]):
+        queue = self._queues[self._partition(data)]
+        if queue.full():
+            self.metrics["backpressure_waits"] += 1
+            start = time.perf_counter()
+            await queue.put((fn, data))
+            self.metrics["backpressure_wait_ms"] += (time.perf_counter() - start) * 1000
+        else:
+            queue.put_nowait((fn, data))
+
+    async def _worker(self, queue: asyncio.Queue):
+        while True:
+            fn, data = await queue.get()
             try:
-                await fn(data)
+                await asyncio.wait_for(fn(data), timeout=self.handler_timeout)
+                self.metrics["handled"] += 1
+            except asyncio.TimeoutError:
+                self.metrics["handler_timeouts"] += 1
+                print(f"⏰ Local handler {fn.__name__} 超时 ({self.handler_timeout}s)")
             except Exception as e:
+                self.metrics["handler_errors"] += 1
                 print(f"⚠️ Local handler {fn.__name__} 出错: {e}")
+            finally:
+                queue.task_done()
+
+    # ======================================================
+    # 📮 outbox（Redis Stream 消费组）
+    # ======================================================
+    @staticmethod
+    async def _redis():
+        from app.extension.redis.redis_client import rds
+        return await rds.instance()
+
+    def start_outbox(self):
+        """启动 outbox 投递任务（EventBusService 启动时调用，接管重启前遗留的事件）"""
+        if self._outbox_task is None or self._outbox_task.done():
+            self._outbox_task = asyncio.create_task(self._drain_outbox())
+
+    async def _drain_outbox(self):
+        redis = await self._redis()
+        try:
+            await redis.xgroup_create(self.outbox_stream, OUTBOX_GROUP, id="0", mkstream=True)
+        except Exception as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+        next_claim = 0.0
+        while True:
+            try:
+                entries = []
+                if time.monotonic() >= next_claim:
+                    next_claim = time.monotonic() + self.outbox_claim_idle_ms / 1000
+                    entries = await self._claim_stale(redis)
+                if not entries:
+                    result = await redis.xreadgroup(
+                        OUTBOX_GROUP, self._consumer, {self.outbox_stream: ">"},
+                        count=100, block=self.outbox_block_ms,
+                    )
+                    entries = result[0][1] if result else []
+                for entry_id, fields in entries:
+                    await self._deliver_outbox(redis, entry_id, fields)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ EventBus outbox 消费出错: {e}")
+                await asyncio.sleep(1)
+
+    async def _claim_stale(self, redis) -> list:
+        """认领空闲过久的未确认事件（消费者已崩溃）"""
+        _, entries, *_ = await redis.xautoclaim(
+            self.outbox_stream, OUTBOX_GROUP, self._consumer,
+            min_idle_time=self.outbox_claim_idle_ms, start_id="0-0", count=100,
+        )
+        entries = [(entry_id, fields) for entry_id, fields in entries if fields]
+        self.metrics["outbox_claimed"] += len(entries)
+        return entries
+
+    async def _deliver_outbox(self, redis, entry_id: str, fields: dict):
+        """publish 成功后 XACK + XDEL；失败则留在 pending 中等待认领重投"""
+        event_name = fields.get("event")
+        try:
+            await self.publish(event_name, json.loads(fields.get("data") or "{}"))
+        except Exception as e:
+            print(f"⚠️ EventBus outbox 投递失败 {event_name}: {e}")
+            return
+        pipe = redis.pipeline(transaction=False)
+        pipe.xack(self.outbox_stream, OUTBOX_GROUP, entry_id)
+        pipe.xdel(self.outbox_stream, entry_id)
+        await pipe.execute()
+        self.metrics["outbox_delivered"] += 1
+
+    # ======================================================
+    # 📊 指标 / 关闭
+    # ======================================================
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.metrics,
+            "queue_depth": sum(q.qsize() for q in self._queues),
+            "queue_size": self.queue_size,
+            "workers": len([w for w in self._workers if w is not None and not w.done()]),
+        }
+
+    async def close(self, timeout: float = 5.0):
+        """停止 outbox 消费（未投递的事件留在 Redis，下次启动继续），尽量处理完队列中的事件"""
+        if self._outbox_task is not None:
+            self._outbox_task.cancel()
+            self._outbox_task = None
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(q.join() for q in self._queues)), timeout=timeout
+            )
+        except asyncio.TimeoutError:
+            print(f"⚠️ EventBus 关闭时仍有未处理事件: {self.stats()}")
+        finally:
+            for task in self._workers:
+                if task is not None:
+                    task.cancel()
+            self._workers = [None] * len(self._queues)
 
 eventbus = EventBus()
@@ -4,3 +4,4 @@
 # @File    : __init__.py.py
 # @Software: PyCharm
 """
+from . import order_handlers, notify_handlers
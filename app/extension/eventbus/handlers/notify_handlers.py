@@ -0,0 +1,20 @@
+"""
+# @Time    : 2025/11/26 10:20
+# @Author  : Pedro
+# @File    : notify_handlers.py
+# @Software: PyCharm
+"""
+# app/extension/eventbus/handlers/notify_handlers.py
+from app.extension.eventbus import eventbus
+from app.extension.websocket.tasks.ws_user_notify import notify_user
+
+
+@eventbus.on("user.notify")
+async def push_user_notify(data):
+    """
+    订单 / 钱包路径的用户通知（publish_nowait 投递，翻译与 WS 推送不阻塞业务流程）
+    只在消费 outbox 的节点推送：其它节点中继来的副本（带 _src）跳过，跨节点送达由 NodeRouter 负责
+    """
+    if data.get("_src"):
+        return
+    await notify_user(data["user_id"], data["event"], lang=data.get("lang"))
@@ -4,7 +4,9 @@ from app.extension.websocket.wss import websocket_manager
 
 @eventbus.on("order.completed")
 async def push_order_to_user(data):
-    """订单完成事件推送"""
+    """订单完成事件推送（中继副本跳过，见 notify_handlers）"""
+    if data.get("_src"):
+        return
     order_id = data["order_id"]
     user_id = data["user_id"]  # ✅ 必须有用户ID
     payload = {
@@ -5,20 +5,23 @@ from app.extension.eventbus.base import eventbus
 from app.extension.eventbus.adapter_redis import RedisAdapter
 from app.extension.eventbus.adapter_ws import WebSocketAdapter
 from app.extension.eventbus.adapter_mq import MQAdapter
+from app.extension.eventbus import handlers  # noqa: F401  注册本地订阅者
 from app.pedro.service_manager import BaseService
 
 
 class EventBusService(BaseService):
     """统一事件总线服务"""
     name = "eventbus"
+    # 关闭时先于 redis / rabbitmq：handler 与 outbox 消费都还在使用这两个连接
+    depends_on = ("redis", "rabbitmq")
 
     def __init__(self):
-        self.redis_adapter = RedisAdapter()
+        self._source_id = str(uuid.uuid4())
+        self.redis_adapter = RedisAdapter(source_id=self._source_id)
         self.ws_adapter = WebSocketAdapter()
         self.mq_adapter = MQAdapter()
         self.tasks: list[asyncio.Task] = []
         self._initialized = False
-        self._source_id = str(uuid.uuid4())
 
     async def init(self):
         if self._initialized:
@@ -38,6 +41,9 @@ class EventBusService(BaseService):
         eventbus.register_adapter(self.ws_adapter)
         eventbus.register_adapter(self.mq_adapter)
 
+        # ✅ outbox 消费（接管重启前未投递的事件）
+        eventbus.start_outbox()
+
         # ✅ Start background listeners (non-blocking)
         self.tasks.append(asyncio.create_task(self._safe_subscribe(self.redis_adapter)))
         self.tasks.append(asyncio.create_task(self._safe_subscribe(self.mq_adapter)))
@@ -66,13 +72,18 @@ class EventBusService(BaseService):
         if src == self._source_id:
             return
 
-        data["_src"] = self._source_id
-        await eventbus.publish(event, data)
+        # 中继事件只触发本地订阅者，不再经过 adapter：
+        # 源节点已广播过一次，再转发会回环；WS 推送由源节点经 NodeRouter 送达
+        data["_src"] = src
+        await eventbus.publish(event, data, relay=False)
 
     async def close(self):
         for t in self.tasks:
             t.cancel()
 
+        # 先把 outbox / worker 队列中的事件投递完，再关闭 adapter
+        await eventbus.close()
+
         await asyncio.gather(
             self.redis_adapter.close(),
             self.mq_adapter.close(),
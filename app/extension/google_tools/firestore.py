@@ -5,10 +5,10 @@
 # @File    : firestore.py
 # @Software: PyCharm
 """
-import asyncio
 from datetime import datetime
 from typing import Any, Dict
-from firebase_admin import firestore
+from firebase_admin import firestore, firestore_async
+from google.api_core.exceptions import NotFound
 from app.extension.google_tools.firebase_admin_service import fs
 
 # ✅ 引入统一 ID 解析工具
@@ -16,8 +16,16 @@ from app.pedro.id_helper import IDHelper
 
 
 class FirestoreService:
-    def __init__(self):
-        self._db = None
+    """
+    Firestore 读写服务
+    - 服务方法全部走原生 AsyncClient，不占用线程池、不阻塞事件循环
+    - db 仍是同步 Client，保留给事务 / collection_group 等旧调用方
+    - 测试时可通过 client / async_client 注入内存实现
+    """
+
+    def __init__(self, client=None, async_client=None):
+        self._db = client
+        self._adb = async_client
 
     @property
     def db(self):
@@ -25,6 +33,12 @@ class FirestoreService:
             self._db = firestore.client()
         return self._db
 
+    @property
+    def adb(self):
+        if not self._adb:
+            self._adb = firestore_async.client()
+        return self._adb
+
     # =====================================================
     # 🧩 路径解析（自动识别 user / id / uuid）
     # =====================================================
@@ -50,9 +64,9 @@ class FirestoreService:
     # 🔧 路径 → DocumentReference
     # =====================================================
     def _doc(self, path: str):
-        """支持 users/123/kyc/review 这种 path 自动解析"""
+        """支持 users/123/kyc/review 这种 path 自动解析（AsyncDocumentReference）"""
         parts = path.split("/")
-        doc = self.db.collection(parts[0]).document(parts[1])
+        doc = self.adb.collection(parts[0]).document(parts[1])
         for i in range(2, len(parts), 2):
             doc = doc.collection(parts[i]).document(parts[i + 1])
         return doc
@@ -68,6 +82,18 @@ class FirestoreService:
         data["updated_at"] = now
         return data
 
+    @staticmethod
+    def _normalize_firestore_data(data):
+        """递归转换 Firestore 中的 DatetimeWithNanoseconds"""
+        if isinstance(data, dict):
+            return {k: FirestoreService._normalize_firestore_data(v) for k, v in data.items()}
+        elif isinstance(data, list):
+            return [FirestoreService._normalize_firestore_data(v) for v in data]
+        elif isinstance(data, datetime):
+            return data.isoformat()
+        else:
+            return data
+
     # =====================================================
     # ✅ 写入 (支持 user / id / path)
     # =====================================================
@@ -75,11 +101,7 @@ class FirestoreService:
         path = self._resolve_path(base, subpath)
         doc = self._doc(path)
         data = self._add_timestamps(data, create=not merge)
-
-        def _do_set():
-            doc.set(data, merge=merge)
-
-        return await asyncio.to_thread(_do_set)
+        return await doc.set(data, merge=merge)
 
     # =====================================================
     # ✅ 更新 (merge=True)
@@ -88,61 +110,38 @@ class FirestoreService:
         path = self._resolve_path(base, subpath)
         doc = self._doc(path)
         data = self._add_timestamps(data)
-
-        def _do_update():
-            doc.set(data, merge=merge)
-
-        return await asyncio.to_thread(_do_update)
+        return await doc.set(data, merge=merge)
 
     # =====================================================
     # ✅ 获取 (支持 user / id / uuid)
     # =====================================================
     async def get(self, base: Any, subpath: str | None = None):
         path = self._resolve_path(base, subpath)
-        doc = self._doc(path)
-
-        def _normalize_firestore_data(data):
-            """递归转换 Firestore 中的 DatetimeWithNanoseconds"""
-            if isinstance(data, dict):
-                return {k: _normalize_firestore_data(v) for k, v in data.items()}
-            elif isinstance(data, list):
-                return [_normalize_firestore_data(v) for v in data]
-            elif isinstance(data, datetime):
-                return data.isoformat()
-            else:
-                return data
-
-        def _do_get():
-            snap = doc.get()
-            if not snap.exists:
-                return None
-            return _normalize_firestore_data(snap.to_dict())
-
-        return await asyncio.to_thread(_do_get)
+        snap = await self._doc(path).get()
+        if not snap.exists:
+            return None
+        return self._normalize_firestore_data(snap.to_dict())
 
     # =====================================================
     # ✅ 删除文档
     # =====================================================
     async def delete(self, base: Any, subpath: str | None = None):
         path = self._resolve_path(base, subpath)
-        doc = self._doc(path)
-
-        def _do_delete():
-            doc.delete()
-
-        return await asyncio.to_thread(_do_delete)
+        return await self._doc(path).delete()
 
     # =====================================================
     # ✅ 安全更新 (若不存在自动 set)
     # =====================================================
     async def safe_update(self, base: Any, data: dict, subpath: str | None = None):
         path = self._resolve_path(base, subpath)
-        ref = self.db.document(path)
+        ref = self.adb.document(path)
         try:
-            ref.update(data)
+            await ref.update(data)
+        except NotFound:
+            await ref.set(data)
         except Exception as e:
             if "No document to update" in str(e):
-                ref.set(data)
+                await ref.set(data)
             else:
                 raise e
 
@@ -181,38 +180,35 @@ class FirestoreService:
             )
 
         # ✅ 自动时间戳
-        from firebase_admin import firestore
         now = firestore.firestore.SERVER_TIMESTAMP
         data = data or {}
         data.setdefault("create_time", now)
         data["update_time"] = now
 
         # ✅ 写入
-        ref = self.db.document(resolved_path)
-        ref.set(data, merge=merge)
+        ref = self.adb.document(resolved_path)
+        await ref.set(data, merge=merge)
 
         print(f"✅ [FirestoreService.safe_set] path={resolved_path}")
 
     # =====================================================
-    # ✅ 批量读取
+    # ✅ 批量读取（get_all 一次 RPC）
     # =====================================================
     async def get_multi(self, paths: list[str]):
-        async def fetch(path):
-            ref = self.db.document(path)
-            snap = await asyncio.get_event_loop().run_in_executor(None, ref.get)
-            return path.split("/")[-1], snap.exists
-
-        results = await asyncio.gather(*(fetch(p) for p in paths))
-        return {pid: exists for pid, exists in results}
+        if not paths:
+            return {}
+        refs = [self.adb.document(p) for p in paths]
+        result = {path.split("/")[-1]: False for path in paths}
+        async for snap in self.adb.get_all(refs):
+            result[snap.id] = snap.exists
+        return result
 
     # =====================================================
     # ✅ 列出集合文档
     # =====================================================
     async def list_documents(self, collection_path: str):
-        loop = asyncio.get_event_loop()
-        collection_ref = self.db.collection(collection_path)
-        docs = await loop.run_in_executor(None, lambda: list(collection_ref.stream()))
-        return [doc for doc in docs if doc.exists]
+        collection_ref = self.adb.collection(collection_path)
+        return [doc async for doc in collection_ref.stream() if doc.exists]
 
 
 # ✅ 单例实例
@@ -50,8 +50,8 @@ async def handle_cart_expire(data: dict):
     # ✅ Redis 标记状态
     await r.setex(cache_key, 86000, "EXPIRED")
 
-    # ✅ 通知前端
-    await eventbus.publish("order.expired", {
+    # ✅ 通知前端（outbox 异步投递，不等待各 adapter）
+    await eventbus.publish_nowait("order.expired", {
         "order_id": order_id,
         "user_id": user_id,
         "product_id": product_id,
@@ -21,6 +21,6 @@ async def handle_order_timeout(data: dict):
     await order.update(status="CANCELED", commit=True)
     await rds.set(f"order:{order_id}:status", "CANCELED", ex=3600)
 
-    # 发通知
-    await eventbus.publish("order.timeout", {"order_id": order_id, "user_id": order.user_id})
+    # 发通知（outbox 异步投递，不等待各 adapter）
+    await eventbus.publish_nowait("order.timeout", {"order_id": order_id, "user_id": order.user_id})
     print(f"✅ 订单 {order_id} 已自动取消 (未支付超时)")
@@ -0,0 +1,22 @@
+"""
+# @Time    : 2025/11/25 10:40
+# @Author  : Pedro
+# @File    : login_risk_service.py
+# @Software: PyCharm
+"""
+from app.pedro.login_risk import login_risk
+from app.pedro.service_manager import BaseService
+
+
+class LoginRiskService(BaseService):
+    """登录风控记录器的生命周期：关闭时停止后台任务并 flush 剩余队列（先于 Redis 关闭）"""
+    name = "login_risk"
+    depends_on = ("redis",)
+
+    async def init(self):
+        print("🛡️ LoginRiskRecorder 已就绪（指纹变化时后台批量写入）")
+
+    async def close(self):
+        pending = len(login_risk._pending)
+        await login_risk.close()
+        print(f"🛑 LoginRiskRecorder 已关闭，flush {pending} 条待写入记录")
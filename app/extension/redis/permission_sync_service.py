@@ -0,0 +1,79 @@
+"""
+# @Time    : 2025/11/20 11:05
+# @Author  : Pedro
+# @File    : permission_sync_service.py
+# @Software: PyCharm
+"""
+import asyncio
+
+from app.extension.redis.redis_client import rds
+from app.pedro.permission_snapshot import permission_snapshot
+from app.pedro.service_manager import BaseService
+
+
+class PermissionSyncService(BaseService):
+    """订阅权限变更广播，丢弃本 worker 的权限快照（断线后退避重连）"""
+    name = "permission_sync"
+    depends_on = ("redis",)
+
+    retry_delay = 1.0
+    max_retry_delay = 30.0
+
+    def __init__(self):
+        self.redis = None
+        self._pubsub = None
+        self._task = None
+
+    async def init(self):
+        self.redis = await rds.instance()
+        self._task = asyncio.create_task(self._listen())
+        print(f"📡 Permission Sync Listener Ready: {permission_snapshot.channel}")
+
+    async def _subscribe(self):
+        self._pubsub = self.redis.pubsub()
+        await self._pubsub.subscribe(permission_snapshot.channel)
+
+    async def _close_pubsub(self):
+        if self._pubsub:
+            try:
+                await self._pubsub.unsubscribe(permission_snapshot.channel)
+                await self._pubsub.aclose()
+            except Exception:
+                pass
+            self._pubsub = None
+
+    async def _listen(self):
+        delay = self.retry_delay
+        reconnecting = False
+        while True:
+            try:
+                await self._subscribe()
+                if reconnecting:
+                    # 断线期间可能漏掉变更通知 → 重连后先丢弃快照
+                    permission_snapshot.invalidate()
+                    print(f"🔁 Permission Sync 已重连: {permission_snapshot.channel}")
+                delay = self.retry_delay
+                async for msg in self._pubsub.listen():
+                    if msg.get("type") != "message":
+                        continue
+                    permission_snapshot.invalidate()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Permission Sync 订阅断开: {e}，{delay:.0f}s 后重连")
+
+            await self._close_pubsub()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_retry_delay)
+            reconnecting = True
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._close_pubsub()
+        print("🛑 PermissionSyncService closed")
@@ -9,6 +9,7 @@ from . import dispatch_ttl_event
 
 class RedisKeyspaceService(BaseService):
     name = "redis_keyspace"
+    depends_on = ("redis",)
 
     async def init(self):
         self.redis_svc = ServiceManager.get("redis")
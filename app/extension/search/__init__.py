@@ -0,0 +1,6 @@
+"""
+# @Time    : 2025/11/24 11:05
+# @Author  : Pedro
+# @File    : __init__.py
+# @Software: PyCharm
+"""
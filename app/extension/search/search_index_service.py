@@ -0,0 +1,36 @@
+"""
+# @Time    : 2025/11/24 11:05
+# @Author  : Pedro
+# @File    : search_index_service.py
+# @Software: PyCharm
+"""
+import asyncio
+from typing import Optional
+
+from app.pedro.db import get_engine
+from app.pedro.search import search_index
+from app.pedro.service_manager import BaseService
+
+
+class SearchIndexService(BaseService):
+    """
+    启动时为声明了 __search_fields__ 的已有表补建检索索引（新建表由 after_create 钩子处理）
+    在后台执行：大表上 CREATE INDEX CONCURRENTLY 可能很久，不阻塞启动；就绪前查询回退 ILIKE
+    """
+    name = "search_index"
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    async def init(self):
+        self._task = asyncio.create_task(self._ensure())
+
+    @staticmethod
+    async def _ensure():
+        tables = await search_index.ensure_all(get_engine())
+        print(f"🔍 检索索引就绪: {', '.join(tables) or '无'}")
+
+    async def close(self):
+        if self._task and not self._task.done():
+            # 中断的 CONCURRENTLY 会留下无效索引，下次启动时删除重建
+            self._task.cancel()
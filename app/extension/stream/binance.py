@@ -10,9 +10,14 @@ import ssl
 import time
 import traceback
 import websockets
-from typing import List
+from typing import Dict, List, Optional, Tuple
 from redis import asyncio as aioredis
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson 为可选依赖
+    orjson = None
+
 from app.api.v1.model.crypto_assets import CryptoAsset
 from app.pedro.config import get_current_settings
 from app.extension.websocket.wss import websocket_manager
@@ -24,56 +29,167 @@ REDIS_LAST_KEY = "market:last_push:{symbol}:{interval}"
 REDIS_SNAPSHOT = "market:snapshot:{symbol}:{interval}"
 REDIS_SWITCH_KEY = "binance:push:enabled"  # redis flag
 
+BINANCE_STREAM_BASE = "wss://stream.binance.com:9443"
+
+# 可选订阅：所有热门币的合并快照（每 SUMMARY_INTERVAL 秒一帧，替代逐币推送）
+TICKER_SUMMARY_CHANNEL = "ticker:summary"
+SUMMARY_INTERVAL = 1.0
+
 STREAM_HEARTBEAT = {}
 
 settings = get_current_settings()
 
 
+def _loads(msg):
+    return orjson.loads(msg) if orjson is not None else json.loads(msg)
+
+
+def kline_stream_name(symbol: str, interval: str) -> str:
+    """Binance stream 名称，如 btcusdt@kline_1m"""
+    return f"{symbol.lower()}@kline_{interval}"
+
+
+def _ssl_kwargs(url: str) -> dict:
+    return {"ssl": ssl.SSLContext()} if url.startswith("wss://") else {}
+
+
+# =========================================================
+# 行情进程内状态（推送开关 / 最后推送时间 / 快照批量落盘）
+# =========================================================
+class MarketState:
+    """
+    handle_message 的每帧处理只读写内存：
+    - 推送开关：后台每 poll_interval 秒 GET 一次 binance:push:enabled
+    - 最后推送时间：进程内 dict
+    - 快照：只保留每个 symbol/interval 的最新一帧，每 flush_interval 秒一次 pipeline MSET
+    """
+
+    def __init__(self, redis: aioredis.Redis, poll_interval: float = 1.0,
+                 flush_interval: float = 1.0, ttl: int = 600):
+        self.redis = redis
+        self.poll_interval = poll_interval
+        self.flush_interval = flush_interval
+        self.ttl = ttl
+        self.push_enabled = True
+        # (symbol, interval) -> 最后推送时间(ms)
+        self.last_push: Dict[Tuple[str, str], int] = {}
+        # (symbol, interval) -> 最新快照 payload（待落盘）
+        self._pending: Dict[Tuple[str, str], dict] = {}
+        # (symbol, interval) -> 最新快照 payload（ticker summary 使用）
+        self.latest: Dict[Tuple[str, str], dict] = {}
+        self.tasks: List[asyncio.Task] = []
+
+    def record(self, symbol: str, interval: str, payload: dict, now_ms: int):
+        key = (symbol, interval)
+        self._pending[key] = payload
+        self.latest[key] = payload
+        self.last_push[key] = now_ms
+
+    async def start(self):
+        if self.tasks:
+            return
+        await self.refresh_switch()
+        self.tasks.append(asyncio.create_task(self._loop(self.refresh_switch, self.poll_interval)))
+        self.tasks.append(asyncio.create_task(self._loop(self.flush, self.flush_interval)))
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        self.tasks.clear()
+        try:
+            await self.flush()
+        except Exception as e:
+            print(f"⚠️ 行情快照落盘失败: {e}")
+
+    @staticmethod
+    async def _loop(fn, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await fn()
+            except Exception as e:
+                print(f"⚠️ 行情后台任务 {fn.__name__} 出错: {e}")
+
+    async def refresh_switch(self):
+        flag = await self.redis.get(REDIS_SWITCH_KEY)
+        # flag 为 None 时默认开启
+        self.push_enabled = flag != "0"
+
+    async def flush(self):
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+
+        mapping = {}
+        for (symbol, interval), payload in pending.items():
+            mapping[REDIS_SNAPSHOT.format(symbol=symbol, interval=interval)] = json.dumps(payload)
+            mapping[REDIS_LAST_KEY.format(symbol=symbol, interval=interval)] = self.last_push[(symbol, interval)]
+
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.mset(mapping)
+        for key in mapping:
+            pipe.expire(key, self.ttl)
+        await pipe.execute()
+
+
 # =========================================================
 # Binance 单币监听器
 # =========================================================
 class BinanceKlineStream:
     """异步监听单币种实时 K线"""
 
-    def __init__(self, symbol: str, interval: str, redis: aioredis.Redis):
+    def __init__(self, symbol: str, interval: str, redis: aioredis.Redis, state: Optional[MarketState] = None):
         self.symbol = symbol.lower()
         self.interval = interval
         self.redis = redis
-        self.url = f"wss://stream.binance.com:9443/ws/{self.symbol}@kline_{self.interval}"
+        # KlineHub 传入共享的 MarketState 并负责启停；单独使用时由 connect 自己启停
+        self._owns_state = state is None
+        self.state = state or MarketState(redis)
+        self.url = f"{BINANCE_STREAM_BASE}/ws/{kline_stream_name(self.symbol, self.interval)}"
         self.last_emit_ts = 0
         self.coalesce_ms = 800  # 聚合时间阈值（防止高频推送）
 
     async def connect(self):
         """主循环：保持长连，自动重连"""
-        backoff = 1
-        while True:
-            try:
-                async with websockets.connect(self.url, ssl=ssl.SSLContext()) as ws:
-                    STREAM_HEARTBEAT[f"{self.symbol}-{self.interval}"] = time.strftime("%H:%M:%S")
-                    # print(f"🔌 [{self.symbol}-{self.interval}] 已连接 Binance Stream")
-                    while True:
-                        msg = await ws.recv()
-                        await self.handle_message(msg)
-            except Exception as e:
-                print(f"⚠️ [{self.symbol}-{self.interval}] 连接断开，重试中: {e}")
-                await asyncio.sleep(backoff)
-                backoff = min(backoff * 2, 30)
+        if self._owns_state:
+            await self.state.start()
+        try:
+            backoff = 1
+            while True:
+                try:
+                    async with websockets.connect(self.url, **_ssl_kwargs(self.url)) as ws:
+                        STREAM_HEARTBEAT[f"{self.symbol}-{self.interval}"] = time.strftime("%H:%M:%S")
+                        # print(f"🔌 [{self.symbol}-{self.interval}] 已连接 Binance Stream")
+                        while True:
+                            msg = await ws.recv()
+                            await self.handle_message(msg)
+                except Exception as e:
+                    print(f"⚠️ [{self.symbol}-{self.interval}] 连接断开，重试中: {e}")
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, 30)
+        finally:
+            if self._owns_state:
+                await self.state.stop()
 
     async def handle_message(self, msg: str):
-        """处理实时 K线消息"""
+        """处理实时 K线消息（纯内存 + CPU，不访问 Redis）"""
+        # ✅ 动态推送开关（MarketState 后台轮询）
+        if not self.state.push_enabled:
+            return
+
         try:
-            # ✅ 动态 Redis 推送开关
-            flag = await self.redis.get(REDIS_SWITCH_KEY)
-            # print(f"[Binance Switch] => {flag}")
+            data = _loads(msg)
+        except Exception as e:
+            print(f"⚠️ [{self.symbol}] 解析异常: {e}")
+            return
+        await self.handle_kline(data)
 
-            # flag 为 None 时默认开启
-            if flag == "0":
-                return
-        except Exception:
-            pass  # 出错也不阻塞行情接收
+    async def handle_kline(self, data: dict):
+        """处理已解析的 kline 事件（combined-stream 由 KlineHub 解包后直接调用）"""
+        if not self.state.push_enabled:
+            return
 
         try:
-            data = json.loads(msg)
             if data.get("e") != "kline":
                 return
 
@@ -97,17 +213,8 @@ class BinanceKlineStream:
                 "closed": k["x"],
             }
 
-            # ✅ 写缓存
-            await self.redis.set(
-                REDIS_SNAPSHOT.format(symbol=symbol, interval=interval),
-                json.dumps(payload),
-                ex=600,
-            )
-            await self.redis.set(
-                REDIS_LAST_KEY.format(symbol=symbol, interval=interval),
-                now_ms,
-                ex=600,
-            )
+            # ✅ 写缓存（内存，MarketState 定时批量落盘）
+            self.state.record(symbol, interval, payload, now_ms)
 
             # ✅ 限频（减少 WS 推送压力）
             if not k["x"] and (now_ms - self.last_emit_ts < self.coalesce_ms):
@@ -115,26 +222,149 @@ class BinanceKlineStream:
 
             self.last_emit_ts = now_ms
 
-            # ✅ 只推送订阅该频道的客户端
-            await websocket_manager.broadcast(channel, payload)
-
-            # ✅ 同时推送全局 (如果你希望所有用户默认看到最新数据)
-            await websocket_manager.broadcast_all(payload)
+            # ✅ 只推送订阅该频道的客户端（market_handler subscribe/unsubscribe 登记）
+            # 每个 worker 都有自己的行情流，只投递本地连接，避免跨节点重复推送
+            # 需要全部币种的客户端订阅 TICKER_SUMMARY_CHANNEL，由 KlineHub 合并推送
+            await websocket_manager.broadcast(channel, payload, local_only=True)
 
         except Exception as e:
             print(f"⚠️ [{self.symbol}] 解析异常: {e}")
             traceback.print_exc()
 
 
+# =========================================================
+# Binance combined-stream 连接（一条连接承载多路流）
+# =========================================================
+class BinanceCombinedStream:
+    """
+    /stream?streams=a/b/c 组合流连接
+    - 连接时按当前 streams 拼 URL；连接期间的增减通过 SUBSCRIBE / UNSUBSCRIBE 动态下发
+    - 断线重连时 URL 自动带上最新的 streams
+    """
+
+    control_batch = 50  # 单条 SUBSCRIBE 携带的 stream 数
+    control_interval = 0.25  # Binance 限制每连接每秒 5 条控制消息
+
+    def __init__(self, hub: "KlineHub", streams, base_url: str = BINANCE_STREAM_BASE):
+        self.hub = hub
+        self.base_url = base_url.rstrip("/")
+        self.streams: set = set(streams)
+        self.ws = None
+        self.task: Optional[asyncio.Task] = None
+        self._request_id = 0
+
+    @property
+    def url(self) -> str:
+        return f"{self.base_url}/stream?streams={'/'.join(sorted(self.streams))}"
+
+    def start(self):
+        self.task = asyncio.create_task(self.connect())
+
+    async def connect(self):
+        """主循环：保持长连，自动重连"""
+        backoff = 1
+        while self.streams:
+            url, connected_with = self.url, set(self.streams)
+            try:
+                async with websockets.connect(url, **_ssl_kwargs(url)) as ws:
+                    self.ws = ws
+                    backoff = 1
+                    now = time.strftime("%H:%M:%S")
+                    for name in connected_with:
+                        STREAM_HEARTBEAT[name] = now
+
+                    # 建连期间发生的订阅变化
+                    await self._send("SUBSCRIBE", self.streams - connected_with)
+                    await self._send("UNSUBSCRIBE", connected_with - self.streams)
+
+                    async for msg in ws:
+                        await self.hub.dispatch(msg)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ [Binance combined x{len(self.streams)}] 连接断开，重试中: {e}")
+            finally:
+                self.ws = None
+
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30)
+
+    async def _send(self, method: str, names):
+        names = sorted(names)
+        if not names or self.ws is None:
+            return
+        for i in range(0, len(names), self.control_batch):
+            self._request_id += 1
+            await self.ws.send(json.dumps({
+                "method": method,
+                "params": names[i:i + self.control_batch],
+                "id": self._request_id,
+            }))
+            await asyncio.sleep(self.control_interval)
+
+    async def subscribe(self, names):
+        new = set(names) - self.streams
+        if not new:
+            return
+        self.streams |= new
+        if self.task is None or self.task.done():
+            self.start()
+            return
+        try:
+            await self._send("SUBSCRIBE", new)
+        except Exception as e:
+            # 发送失败会触发重连，重连 URL 已包含新 streams
+            print(f"⚠️ Binance SUBSCRIBE 失败: {e}")
+
+    async def unsubscribe(self, names):
+        gone = set(names) & self.streams
+        if not gone:
+            return
+        self.streams -= gone
+        for name in gone:
+            STREAM_HEARTBEAT.pop(name, None)
+        if not self.streams:
+            await self.stop()
+            return
+        try:
+            await self._send("UNSUBSCRIBE", gone)
+        except Exception as e:
+            print(f"⚠️ Binance UNSUBSCRIBE 失败: {e}")
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            self.task = None
+        if self.ws is not None:
+            try:
+                await self.ws.close()
+            except Exception:
+                pass
+            self.ws = None
+
+
 # =========================================================
 # Binance 多币监听管理器
 # =========================================================
 class KlineHub:
-    """多币种统一监听管理"""
-
-    def __init__(self, pairs: List[List[str]]):
+    """多币种统一监听管理（combined-stream 多路复用）"""
+
+    def __init__(
+            self,
+            pairs: List[List[str]],
+            base_url: str = BINANCE_STREAM_BASE,
+            streams_per_connection: int = 200,
+            hot_refresh_interval: Optional[float] = None,
+    ):
         self.pairs = pairs
+        self.base_url = base_url
+        self.streams_per_connection = streams_per_connection  # Binance 上限 1024
+        self.hot_refresh_interval = hot_refresh_interval
         self.redis = None
+        self.state: Optional[MarketState] = None
+        # stream 名称 -> 单币处理器（聚合 / 推送）
+        self.handlers: Dict[str, BinanceKlineStream] = {}
+        self.connections: List[BinanceCombinedStream] = []
         self.tasks = []
 
     async def start(self):
@@ -142,32 +372,117 @@ class KlineHub:
         self.redis = await aioredis.from_url(
             settings.redis.redis_url, decode_responses=True
         )
+        self.state = MarketState(self.redis)
+        await self.state.start()
+
         total = sum(len(i[1]) for i in self.pairs)
         print(f"🌐 [Binance] 正在启动 {total} 条实时行情流 ...")
         start_time = time.time()
 
-        connected = 0
-        for symbol, intervals in self.pairs:
-            for itv in intervals:
-                try:
-                    stream = BinanceKlineStream(symbol, itv, self.redis)
-                    task = asyncio.create_task(stream.connect())
-                    self.tasks.append(task)
-                    connected += 1
-                except Exception as e:
-                    print(f"⚠️ 启动 {symbol}-{itv} 失败: {e}")
+        await self.update_pairs(self.pairs)
 
         elapsed = time.time() - start_time
-        print(f"✅ Binance Stream 启动完成，共监听 {connected}/{total} 条流，用时 {elapsed:.2f}s")
+        print(
+            f"✅ Binance Stream 启动完成，共监听 {len(self.handlers)}/{total} 条流，"
+            f"{len(self.connections)} 条连接，用时 {elapsed:.2f}s"
+        )
 
         # 启动心跳
-        asyncio.create_task(self._heartbeat())
+        self.tasks.append(asyncio.create_task(self._heartbeat()))
+        self.tasks.append(asyncio.create_task(self._ticker_summary()))
+        if self.hot_refresh_interval:
+            self.tasks.append(asyncio.create_task(self._refresh_hot_pairs()))
+
+    # ------------------------------------------------------
+    # 🔀 订阅变更（热门币列表变化时增量 SUBSCRIBE / UNSUBSCRIBE）
+    # ------------------------------------------------------
+    async def update_pairs(self, pairs: List[List[str]]):
+        self.pairs = pairs
+        wanted = {
+            kline_stream_name(symbol, itv): (symbol, itv)
+            for symbol, intervals in pairs
+            for itv in intervals
+        }
+        removed = set(self.handlers) - set(wanted)
+        added = [name for name in wanted if name not in self.handlers]
+        added_count = len(added)
+
+        if removed:
+            for conn in self.connections:
+                await conn.unsubscribe(conn.streams & removed)
+            self.connections = [c for c in self.connections if c.streams]
+            for name in removed:
+                self.handlers.pop(name, None)
+
+        for name in added:
+            symbol, itv = wanted[name]
+            self.handlers[name] = BinanceKlineStream(symbol, itv, self.redis, self.state)
+
+        # 先填满已有连接，剩余的开新连接
+        for conn in self.connections:
+            room = self.streams_per_connection - len(conn.streams)
+            if room > 0 and added:
+                chunk, added = added[:room], added[room:]
+                await conn.subscribe(chunk)
+        for i in range(0, len(added), self.streams_per_connection):
+            conn = BinanceCombinedStream(self, added[i:i + self.streams_per_connection], self.base_url)
+            conn.start()
+            self.connections.append(conn)
+
+        if removed or added_count:
+            print(f"🔁 [Binance] 订阅更新: +{added_count} / -{len(removed)}，当前 {len(self.handlers)} 条流")
+
+    async def dispatch(self, msg):
+        """combined-stream 消息解包：{"stream": "...", "data": {...}}"""
+        try:
+            frame = _loads(msg)
+        except Exception as e:
+            print(f"⚠️ Binance 消息解析异常: {e}")
+            return
+
+        # SUBSCRIBE / UNSUBSCRIBE 的回执：{"result": null, "id": 1}
+        if "stream" not in frame:
+            return
+        handler = self.handlers.get(frame["stream"])
+        if handler:
+            await handler.handle_kline(frame.get("data") or {})
+
+    async def _ticker_summary(self):
+        """有人订阅 ticker:summary 时，每个周期推送一帧全部热门币的最新快照"""
+        while True:
+            await asyncio.sleep(SUMMARY_INTERVAL)
+            try:
+                await self.push_summary()
+            except Exception as e:
+                print(f"⚠️ ticker summary 推送失败: {e}")
+
+    async def push_summary(self):
+        if not websocket_manager.channels.get(TICKER_SUMMARY_CHANNEL):
+            return
+        if not self.state or not self.state.push_enabled or not self.state.latest:
+            return
+
+        items = [
+            self.state.latest[key]
+            for key in sorted(self.state.latest)
+            if kline_stream_name(*key) in self.handlers
+        ]
+        payload = {"type": "ticker_summary", "timestamp": int(time.time() * 1000), "data": items}
+        await websocket_manager.broadcast(TICKER_SUMMARY_CHANNEL, payload, local_only=True)
+
+    async def _refresh_hot_pairs(self):
+        while True:
+            await asyncio.sleep(self.hot_refresh_interval)
+            try:
+                await self.update_pairs(await load_hot_pairs())
+            except Exception as e:
+                print(f"⚠️ 热门币列表刷新失败: {e}")
 
     async def _heartbeat(self):
         """输出当前活跃流状态"""
         while True:
             active = len(STREAM_HEARTBEAT)
-            print(f"💗 Binance Stream Heartbeat: {active} active streams")
+            print(f"💗 Binance Stream Heartbeat: {active} active streams / {len(self.connections)} connections")
             await asyncio.sleep(60)
 
     async def stop(self):
@@ -175,6 +490,11 @@ class KlineHub:
         for task in self.tasks:
             task.cancel()
         self.tasks.clear()
+        for conn in self.connections:
+            await conn.stop()
+        self.connections.clear()
+        if self.state:
+            await self.state.stop()
         print("🧹 Binance 行情流全部停止")
 
 
@@ -182,16 +502,24 @@ class KlineHub:
 # 启动入口
 # =========================================================
 kline_hub = None
+HOT_PAIRS_REFRESH = 300  # 秒：热门币列表刷新间隔
+
+
+async def load_hot_pairs(limit: int = 20) -> List[List[str]]:
+    """从数据库加载前 limit 个热门币"""
+    result = await CryptoAsset.get(one=False, is_hot=True)
+    return [[f"{a.symbol.upper()}USDT", ["1m"]] for a in result[:limit]]
 
 
 async def start_realtime_market(pairs: List[List[str]] = None):
     """FastAPI 启动时运行（热门币自动采集）"""
     global kline_hub
+    refresh = None
     if not pairs:
-        # 从数据库加载前20个热门币
-        result = await CryptoAsset.get(one=False, is_hot=True)
-        pairs = [[f"{a.symbol.upper()}USDT", ["1m"]] for a in result[:20]]
+        # 从数据库加载前20个热门币，并定期刷新
+        pairs = await load_hot_pairs()
+        refresh = HOT_PAIRS_REFRESH
 
-    kline_hub = KlineHub(pairs)
+    kline_hub = KlineHub(pairs, hot_refresh_interval=refresh)
     await kline_hub.start()
     print("✅ Binance 实时行情后台任务已启动")
@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""
+# @Time    : 2025/11/21 14:20
+# @Author  : Pedro
+# @File    : node_router.py
+# @Software: PyCharm
+
+WebSocket 跨进程路由（多 worker / 多机部署）
+---------------------------------------------
+✅ 每个 worker 是一个节点（node_id），订阅自己的 Redis 频道 ws:node:{node_id}
+✅ 节点把本地在线 uid / 已订阅频道登记到 Redis：
+     ws:route:user:{uid}        -> SET(node_id)
+     ws:route:channel:{channel} -> SET(node_id)
+     ws:nodes                   -> SET(node_id)
+✅ 推送时只 PUBLISH 给真正持有接收者的节点，收到后仅做本地投递（不会再转发）
+✅ 节点心跳：ws:node:{node_id}:alive 带 TTL，定时续期
+✅ PUBLISH 返回 0 时只剔除心跳已过期的节点（订阅连接短暂重连不会被误删）
+✅ 订阅连接重连 / 心跳过期后重新登记全部本地 uid / 频道（被剔除的路由自动恢复）
+"""
+import asyncio
+import json
+import time
+import uuid
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+NODES_KEY = "ws:nodes"
+USER_ROUTE_KEY = "ws:route:user:{uid}"
+CHANNEL_ROUTE_KEY = "ws:route:channel:{channel}"
+NODE_CHANNEL = "ws:node:{node_id}"
+NODE_ALIVE_KEY = "ws:node:{node_id}:alive"
+
+
+class NodeRouter:
+    """WebSocketManager 的跨节点投递层"""
+
+    def __init__(self, manager, redis, node_id: Optional[str] = None, route_cache_ttl: float = 1.0,
+                 heartbeat_interval: float = 10.0, reconnect_delay: float = 1.0):
+        self.manager = manager
+        self.redis = redis
+        self.node_id = node_id or uuid.uuid4().hex
+        self.inbox = NODE_CHANNEL.format(node_id=self.node_id)
+        self.alive_key = NODE_ALIVE_KEY.format(node_id=self.node_id)
+        # 心跳 TTL 取 3 个周期，偶发一次续期失败不会被判定下线
+        self.heartbeat_interval = heartbeat_interval
+        self.alive_ttl = max(int(heartbeat_interval * 3), 1)
+        self.reconnect_delay = reconnect_delay
+        # 频道路由短缓存（行情类高频广播不必每次查 Redis）；用户路由不缓存，保证实时
+        self.route_cache_ttl = route_cache_ttl
+        self._channel_routes: Dict[str, Tuple[float, Set[str]]] = {}
+        self._pubsub = None
+        self._task: Optional[asyncio.Task] = None
+        self._heartbeat_task: Optional[asyncio.Task] = None
+
+    # ======================================================
+    # 🚀 生命周期
+    # ======================================================
+    async def start(self, users: Iterable[str] = (), channels: Iterable[str] = ()):
+        """先订阅自己的收件频道，再登记节点与已有的本地路由"""
+        await self._subscribe()
+        await self._register(users, channels)
+        self._task = asyncio.create_task(self._listen())
+        self._heartbeat_task = asyncio.create_task(self._heartbeat())
+        print(f"📡 WS NodeRouter Ready: {self.inbox}")
+
+    async def stop(self, users: Iterable[str] = (), channels: Iterable[str] = ()):
+        for task in (self._task, self._heartbeat_task):
+            if task:
+                task.cancel()
+        self._task = self._heartbeat_task = None
+        await self._close_pubsub()
+
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.delete(self.alive_key)
+        pipe.srem(NODES_KEY, self.node_id)
+        for uid in users:
+            pipe.srem(USER_ROUTE_KEY.format(uid=uid), self.node_id)
+        for channel in channels:
+            pipe.srem(CHANNEL_ROUTE_KEY.format(channel=channel), self.node_id)
+        await pipe.execute()
+        print(f"🛑 WS NodeRouter closed: {self.node_id}")
+
+    async def _subscribe(self):
+        self._pubsub = self.redis.pubsub()
+        await self._pubsub.subscribe(self.inbox)
+
+    async def _close_pubsub(self):
+        if self._pubsub:
+            try:
+                await self._pubsub.unsubscribe(self.inbox)
+                await self._pubsub.aclose()
+            except Exception:
+                pass
+            self._pubsub = None
+
+    async def _register(self, users: Iterable[str] = (), channels: Iterable[str] = ()):
+        """登记心跳、节点与本地路由（SADD 幂等，重连后重复登记无副作用）"""
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.set(self.alive_key, "1", ex=self.alive_ttl)
+        pipe.sadd(NODES_KEY, self.node_id)
+        for uid in users:
+            pipe.sadd(USER_ROUTE_KEY.format(uid=uid), self.node_id)
+        for channel in channels:
+            pipe.sadd(CHANNEL_ROUTE_KEY.format(channel=channel), self.node_id)
+        await pipe.execute()
+
+    async def _reconnect(self):
+        """重建订阅并重新登记当前全部本地 uid / 频道"""
+        await self._close_pubsub()
+        await self._subscribe()
+        await self._register(list(self.manager.user_clients), self.manager._local_channels())
+        print(f"🔁 WS NodeRouter 已重连: {self.inbox}")
+
+    # ======================================================
+    # 💓 节点心跳
+    # ======================================================
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                # EXPIRE 返回 False = 心跳已过期（可能已被其它节点剔除）→ 整体重新登记
+                if not await self.redis.expire(self.alive_key, self.alive_ttl):
+                    await self._register(list(self.manager.user_clients), self.manager._local_channels())
+            except Exception as e:
+                print(f"⚠️ WS NodeRouter 心跳续期失败: {e}")
+
+    # ======================================================
+    # 🗂️ 路由登记（本地首个 / 最后一个连接时调用）
+    # ======================================================
+    async def add_user(self, uid: str):
+        await self.redis.sadd(USER_ROUTE_KEY.format(uid=uid), self.node_id)
+
+    async def remove_user(self, uid: str):
+        await self.redis.srem(USER_ROUTE_KEY.format(uid=uid), self.node_id)
+
+    async def add_channel(self, channel: str):
+        await self.redis.sadd(CHANNEL_ROUTE_KEY.format(channel=channel), self.node_id)
+
+    async def remove_channel(self, channel: str):
+        await self.redis.srem(CHANNEL_ROUTE_KEY.format(channel=channel), self.node_id)
+
+    # ======================================================
+    # 📤 跨节点投递
+    # ======================================================
+    async def send_to_user(self, uid: str, msg: str):
+        key = USER_ROUTE_KEY.format(uid=uid)
+        nodes = await self.redis.smembers(key)
+        await self._publish(nodes, {"op": "user", "to": uid, "msg": msg}, key)
+
+    async def broadcast(self, channel: str, msg: str):
+        key = CHANNEL_ROUTE_KEY.format(channel=channel)
+        cached = self._channel_routes.get(channel)
+        now = time.monotonic()
+        if cached and cached[0] > now:
+            nodes = cached[1]
+        else:
+            nodes = await self.redis.smembers(key)
+            self._channel_routes[channel] = (now + self.route_cache_ttl, nodes)
+        await self._publish(nodes, {"op": "channel", "to": channel, "msg": msg}, key)
+
+    async def broadcast_all(self, msg: str):
+        nodes = await self.redis.smembers(NODES_KEY)
+        await self._publish(nodes, {"op": "all", "msg": msg}, NODES_KEY)
+
+    async def _publish(self, nodes: Set[str], envelope: dict, route_key: str):
+        targets = [n for n in nodes if n != self.node_id]
+        if not targets:
+            return
+
+        data = json.dumps(envelope, ensure_ascii=False)
+        pipe = self.redis.pipeline(transaction=False)
+        for node in targets:
+            pipe.publish(NODE_CHANNEL.format(node_id=node), data)
+        results = await pipe.execute()
+
+        # 没有订阅者：可能是进程崩溃未清理，也可能只是对方订阅连接正在重连
+        # 只剔除心跳 key 已过期的节点；存活节点重连后会重新登记
+        missed = [n for n, receivers in zip(targets, results) if not receivers]
+        if not missed:
+            return
+        pipe = self.redis.pipeline(transaction=False)
+        for node in missed:
+            pipe.exists(NODE_ALIVE_KEY.format(node_id=node))
+        alive = await pipe.execute()
+        dead = [n for n, ok in zip(missed, alive) if not ok]
+        if dead:
+            await self.redis.srem(route_key, *dead)
+            for cached in self._channel_routes.values():
+                cached[1].difference_update(dead)
+
+    # ======================================================
+    # 📥 接收其它节点的投递（只做本地投递）
+    # ======================================================
+    async def _listen(self):
+        while True:
+            try:
+                async for message in self._pubsub.listen():
+                    if message.get("type") == "message":
+                        await self._dispatch(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ WS NodeRouter 订阅断开: {e}")
+
+            # 订阅断开期间其它节点可能已把本节点剔除 → 重连后重新登记
+            await asyncio.sleep(self.reconnect_delay)
+            try:
+                await self._reconnect()
+            except Exception as e:
+                print(f"⚠️ WS NodeRouter 重连失败: {e}")
+
+    async def _dispatch(self, data: str):
+        try:
+            envelope = json.loads(data)
+            op = envelope.get("op")
+            if op == "user":
+                await self.manager._deliver_user(envelope["to"], envelope["msg"])
+            elif op == "channel":
+                await self.manager._deliver_channel(envelope["to"], envelope["msg"])
+            elif op == "all":
+                await self.manager._deliver_all(envelope["msg"])
+        except Exception as e:
+            print(f"⚠️ WS NodeRouter 投递失败: {e}")
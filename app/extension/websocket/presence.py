@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+# @Time    : 2025/11/22 15:40
+# @Author  : Pedro
+# @File    : presence.py
+# @Software: PyCharm
+
+WebSocket 在线状态（批量写版）
+---------------------------------------------
+✅ 单一 ZSET：ws:online  member=uid  score=last_seen（秒）
+✅ 连接 / ping 只更新进程内存，后台每 flush_interval 秒一次 pipeline：
+     ZADD（活跃 uid） + ZREM（已下线 uid） + ZREMRANGEBYSCORE（过期清理）
+✅ 读取方（CMS 在线数 / 用户列表在线状态）按 score >= now - stale_after 判断在线
+"""
+import asyncio
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app.extension.redis.redis_client import rds
+
+ONLINE_KEY = "ws:online"
+
+
+class PresenceTracker:
+    """ws_entry 使用的在线状态记录器"""
+
+    def __init__(self, flush_interval: float = 5.0, stale_after: int = 90):
+        self.flush_interval = flush_interval
+        # 超过 stale_after 秒没有任何心跳视为离线（> 客户端心跳 30s + 空闲超时 60s）
+        self.stale_after = stale_after
+        # uid -> last_seen（待写入）
+        self._seen: Dict[str, int] = {}
+        # 待 ZREM 的 uid
+        self._offline: Set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    # ------------------------------------------------------
+    # 🧩 请求路径（同步、无 IO）
+    # ------------------------------------------------------
+    def touch(self, uid) -> None:
+        uid = str(uid)
+        self._seen[uid] = int(time.time())
+        self._offline.discard(uid)
+        self._ensure_task()
+
+    def offline(self, uid) -> None:
+        uid = str(uid)
+        self._seen.pop(uid, None)
+        self._offline.add(uid)
+        self._ensure_task()
+
+    def _ensure_task(self) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._task = loop.create_task(self._run())
+
+    # ------------------------------------------------------
+    # 🔁 后台 flush
+    # ------------------------------------------------------
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"⚠️ 在线状态批量写入失败: {e}")
+
+    async def flush(self) -> None:
+        seen, self._seen = self._seen, {}
+        offline, self._offline = self._offline, set()
+
+        try:
+            r = await rds.instance()
+            pipe = r.pipeline(transaction=False)
+            if seen:
+                pipe.zadd(ONLINE_KEY, seen)
+            if offline:
+                pipe.zrem(ONLINE_KEY, *offline)
+            pipe.zremrangebyscore(ONLINE_KEY, "-inf", int(time.time()) - self.stale_after)
+            await pipe.execute()
+        except Exception:
+            self._requeue(seen, offline)
+            raise
+
+    def _requeue(self, seen: Dict[str, int], offline: Set[str]) -> None:
+        """写入失败：把这一批放回待写队列（flush 期间产生的新状态更新，优先保留）"""
+        for uid, ts in seen.items():
+            if uid not in self._seen and uid not in self._offline:
+                self._seen[uid] = ts
+        for uid in offline:
+            if uid not in self._seen:
+                self._offline.add(uid)
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+    # ------------------------------------------------------
+    # 🔍 读取（CMS）
+    # ------------------------------------------------------
+    def _min_score(self) -> int:
+        return int(time.time()) - self.stale_after
+
+    async def count(self) -> int:
+        r = await rds.instance()
+        return await r.zcount(ONLINE_KEY, self._min_score(), "+inf")
+
+    async def last_seen_many(self, uids: Iterable) -> List[Tuple[bool, Optional[int]]]:
+        """批量查询 [(is_online, last_seen)]，一次 ZMSCORE"""
+        uids = [str(u) for u in uids]
+        if not uids:
+            return []
+        r = await rds.instance()
+        scores = await r.zmscore(ONLINE_KEY, uids)
+        min_score = self._min_score()
+        return [
+            (score is not None and score >= min_score, int(score) if score is not None else None)
+            for score in scores
+        ]
+
+
+presence = PresenceTracker()
@@ -0,0 +1,22 @@
+"""
+# @Time    : 2025/11/26 16:20
+# @Author  : Pedro
+# @File    : presence_service.py
+# @Software: PyCharm
+"""
+from app.extension.websocket.presence import presence
+from app.pedro.service_manager import BaseService
+
+
+class PresenceService(BaseService):
+    """在线状态记录器的生命周期：关闭时停止后台任务并 flush 尚未写入的 touch / offline（先于 Redis 关闭）"""
+    name = "presence"
+    depends_on = ("redis",)
+
+    async def init(self):
+        print("🟢 PresenceTracker 已就绪（在线状态后台批量写入）")
+
+    async def close(self):
+        pending = len(presence._seen) + len(presence._offline)
+        await presence.close()
+        print(f"🛑 PresenceTracker 已关闭，flush {pending} 条在线状态")
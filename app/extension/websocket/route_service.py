@@ -0,0 +1,22 @@
+"""
+# @Time    : 2025/11/21 14:50
+# @Author  : Pedro
+# @File    : route_service.py
+# @Software: PyCharm
+"""
+from app.extension.redis.redis_client import rds
+from app.extension.websocket.wss import websocket_manager
+from app.pedro.service_manager import BaseService
+
+
+class WebSocketRouteService(BaseService):
+    """启用 WebSocket 跨进程路由（多 worker 下 send_to_user / broadcast 可达所有节点）"""
+    name = "ws_route"
+    depends_on = ("redis",)
+
+    async def init(self):
+        redis = await rds.instance()
+        await websocket_manager.enable_routing(redis)
+
+    async def close(self):
+        await websocket_manager.disable_routing()
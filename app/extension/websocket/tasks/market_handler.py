@@ -7,6 +7,8 @@ async def market_handler(ws: WebSocket, uid: int):
     """
     业务层仅处理“非控制类”消息（控制类已在 ws_entry 处理：ping/pong、refresh）
     下面是示例：订阅/退订/回显
+    - 单币 K线：channel = "btcusdt-1m"
+    - 全部热门币合并快照：channel = "ticker:summary"（每秒一帧）
     """
     data = await ws.receive_text()
     try:
@@ -18,10 +20,10 @@ async def market_handler(ws: WebSocket, uid: int):
     if act == "subscribe":
         ch = msg.get("channel")
         await websocket_manager.subscribe(ws, ch)
-        await ws.send_json({"type": "system", "msg": f"subscribed:{ch}"})
+        await websocket_manager.send(ws, {"type": "system", "msg": f"subscribed:{ch}"}, priority=True)
     elif act == "unsubscribe":
         ch = msg.get("channel")
         await websocket_manager.unsubscribe(ws, ch)
-        await ws.send_json({"type": "system", "msg": f"unsubscribed:{ch}"})
+        await websocket_manager.send(ws, {"type": "system", "msg": f"unsubscribed:{ch}"}, priority=True)
     else:
-        await ws.send_json({"type": "echo", "data": msg})
\ No newline at end of file
+        await websocket_manager.send(ws, {"type": "echo", "data": msg})
\ No newline at end of file
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+# @Time    : 2025/11/22 10:05
+# @Author  : Pedro
+# @File    : timers.py
+# @Software: PyCharm
+
+WebSocket 连接定时器（全局一个协程，替代每连接 watchdog + 全量心跳轮询）
+---------------------------------------------
+✅ 最小堆保存 (deadline, 连接, 类型)，只在最近的 deadline 到期时唤醒
+✅ touch() 只更新内存中的 last_seen（O(1)），到期时再按真实 last_seen 重新排期
+✅ 同一时间片（resolution）内到期的 ping / 空闲断开合并批量处理
+✅ 断开的连接懒删除：堆里的旧条目出堆时直接丢弃
+✅ 每次登记分配新 generation：同一连接重复登记后，上一次登记留在堆里的条目出堆即丢弃
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Dict, List, Optional
+
+
+class ConnectionTimers:
+    """WebSocketManager 使用的心跳 / 空闲超时调度器"""
+
+    PING = "ping"
+    IDLE = "idle"
+
+    def __init__(self, manager, heartbeat_interval: float = 30, resolution: float = 0.5):
+        self.manager = manager
+        self.heartbeat_interval = heartbeat_interval
+        self.resolution = resolution  # 合并批处理的时间粒度（秒）
+        # (deadline, seq, ws, kind, generation)
+        self._heap: list = []
+        self._seq = itertools.count()
+        self._generation = itertools.count()
+        # ws -> {"last_seen": float, "idle_timeout": float | None, "gen": int}
+        self._state: Dict[object, dict] = {}
+        self._wakeup = asyncio.Event()
+        self._next_deadline: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    # ======================================================
+    # 🧩 连接登记
+    # ======================================================
+    def add(self, ws, idle_timeout: Optional[float] = None):
+        now = time.monotonic()
+        gen = next(self._generation)
+        self._state[ws] = {"last_seen": now, "idle_timeout": idle_timeout, "gen": gen}
+        if self.heartbeat_interval:
+            self._push(now + self.heartbeat_interval, ws, self.PING, gen)
+        if idle_timeout:
+            self._push(now + idle_timeout, ws, self.IDLE, gen)
+
+    def set_idle_timeout(self, ws, idle_timeout: Optional[float]):
+        state = self._state.get(ws)
+        if state is None:
+            return
+        had_timer = state["idle_timeout"] is not None
+        state["idle_timeout"] = idle_timeout
+        if idle_timeout and not had_timer:
+            self._push(state["last_seen"] + idle_timeout, ws, self.IDLE, state["gen"])
+
+    def touch(self, ws):
+        state = self._state.get(ws)
+        if state is not None:
+            state["last_seen"] = time.monotonic()
+
+    def remove(self, ws):
+        self._state.pop(ws, None)
+
+    def _push(self, deadline: float, ws, kind: str, gen: int):
+        heapq.heappush(self._heap, (deadline, next(self._seq), ws, kind, gen))
+        self._ensure_task()
+        if self._next_deadline is None or deadline < self._next_deadline:
+            self._wakeup.set()
+
+    def _ensure_task(self):
+        if self._task is not None and not self._task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._task = loop.create_task(self._run())
+
+    # ======================================================
+    # ⏱️ 调度循环
+    # ======================================================
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            if not self._heap:
+                self._next_deadline = None
+                await self._wakeup.wait()
+                continue
+
+            self._next_deadline = self._heap[0][0]
+            delay = self._next_deadline - time.monotonic()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                    continue  # 有更早的 deadline 插入，重新计算
+                except asyncio.TimeoutError:
+                    pass
+
+            try:
+                pings, idle = self._collect(time.monotonic())
+                if pings:
+                    self.manager._ping_batch(pings)
+                if idle:
+                    await self.manager._close_idle_batch(idle)
+            except Exception as e:
+                print(f"⚠️ WS 定时器处理失败: {e}")
+
+    def _collect(self, now: float):
+        horizon = now + self.resolution
+        pings: List = []
+        idle: List = []
+        while self._heap and self._heap[0][0] <= horizon:
+            _, _, ws, kind, gen = heapq.heappop(self._heap)
+            state = self._state.get(ws)
+            if state is None or state["gen"] != gen:
+                continue  # 已断开 / 上一次登记遗留的条目
+
+            if kind == self.PING:
+                due = state["last_seen"] + self.heartbeat_interval
+                if due <= horizon:
+                    pings.append(ws)
+                    due = now + self.heartbeat_interval
+                heapq.heappush(self._heap, (due, next(self._seq), ws, kind, gen))
+            else:
+                timeout = state["idle_timeout"]
+                if not timeout:
+                    continue
+                due = state["last_seen"] + timeout
+                if due <= horizon:
+                    idle.append(ws)
+                    self._state.pop(ws, None)
+                else:
+                    heapq.heappush(self._heap, (due, next(self._seq), ws, kind, gen))
+        return pings, idle
+
+    def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._heap.clear()
+        self._state.clear()
+
+    def __len__(self):
+        return len(self._state)
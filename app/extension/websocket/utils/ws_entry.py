@@ -1,10 +1,9 @@
-import asyncio
 import json
 import time
 from typing import Callable, Awaitable, Optional
 from fastapi import WebSocket
 from starlette.websockets import WebSocketDisconnect
-from app.extension.redis.redis_client import rds
+from app.extension.websocket.presence import presence
 from app.extension.websocket.wss import websocket_manager
 from app.extension.websocket.utils.ws_utils import ws_auth
 from app.pedro.pedro_jwt import jwt_service
@@ -15,25 +14,8 @@ IDLE_TIMEOUT = 60  # 超时踢下线（无心跳/无任何收发）
 TOKEN_REFRESH_THRESHOLD = 5 * 60  # token 距离过期 < 5m，提示续期
 
 
-async def _set_online(uid: int, ws_id: str):
-    r = await rds.instance()
-    # 在线集合 + 详情信息（可扩展 ip/ua）
-    await r.sadd("ws:online:uids", uid)
-    await r.hset(f"ws:online:detail:{uid}", mapping={
-        "ws_id": ws_id,
-        "last_seen": int(time.time())
-    })
-
-
-async def _set_offline(uid: int):
-    r = await rds.instance()
-    await r.srem("ws:online:uids", uid)
-    await r.delete(f"ws:online:detail:{uid}")
-
-
 async def _online_count() -> int:
-    r = await rds.instance()
-    return await r.scard("ws:online:uids")
+    return await presence.count()
 
 
 def _now() -> int:
@@ -58,9 +40,9 @@ async def ws_entry(
         return
     uid, payload, token = auth
 
-    # 记录连接（你已有的 manager）
+    # 记录连接（你已有的 manager）；此后该连接的所有下行帧都经由其 Outbox 发送
     await websocket_manager.connect(ws, uid)
-    await _set_online(uid, ws_id=str(id(ws)))
+    presence.touch(uid)
     await websocket_manager.subscribe(ws, f"user:{uid}")
     print(f"🟢 WS connected: uid={uid}")
 
@@ -69,25 +51,10 @@ async def ws_entry(
         channels = websocket_manager.get_all_channels()
         for ch in channels:
             await websocket_manager.subscribe(ws, ch)
-        await ws.send_json({"type": "system", "msg": "subscribed_all", "channels": channels})
-
-    last_seen = _now()
-
-    # 心跳 + 超时监视器（后台协程）
-    async def watchdog():
-        nonlocal last_seen
-        try:
-            while True:
-                await asyncio.sleep(1)
-                if _now() - last_seen > idle_timeout:
-                    await ws.send_json({"type": "system", "error": "idle_timeout"})
-                    await ws.close(code=4004, reason="Idle timeout")
-                    return
-        except Exception:
-            # 监视器结束即可
-            return
-
-    watchdog_task = asyncio.create_task(watchdog())
+        await websocket_manager.send(ws, {"type": "system", "msg": "subscribed_all", "channels": channels}, priority=True)
+
+    # 空闲超时交给 websocket_manager 的全局定时器（不再每连接起 watchdog）
+    websocket_manager.set_idle_timeout(ws, idle_timeout)
 
     # Token 即将过期提醒（只提醒一次）
     refresh_notified = False
@@ -96,7 +63,9 @@ async def ws_entry(
         # 主循环：同时处理心跳、token 续期请求、业务消息
         while True:
             raw = await ws.receive_text()
-            last_seen = _now()
+            websocket_manager.touch(ws)
+            # 在线状态只记内存，后台批量写 Redis
+            presence.touch(uid)
 
             # 尝试解析为 JSON；允许纯文本
             try:
@@ -108,20 +77,18 @@ async def ws_entry(
 
             # --- 心跳：client -> { "type": "ping", "t": 123456 } ---
             if mtype == "ping":
-                await ws.send_json({"type": "pong", "t": msg.get("t", _now())})
-                # 更新 Redis 最后在线时间
-                await _set_online(uid, ws_id=str(id(ws)))
+                await websocket_manager.send(ws, {"type": "pong", "t": msg.get("t", _now())}, priority=True)
                 continue
 
             # --- Token 刷新：client -> { "action": "refresh", "refresh_token": "..." } ---
             if mtype == "refresh":
                 try:
                     new_tokens = await jwt_service.verify_refresh_token(msg["refresh_token"])
-                    await ws.send_json({"type": "token", "event": "refreshed", **new_tokens})
+                    await websocket_manager.send(ws, {"type": "token", "event": "refreshed", **new_tokens}, priority=True)
                     # 刷新后可以重置 refresh_notified
                     refresh_notified = False
                 except Exception as e:
-                    await ws.send_json({"type": "token", "event": "refresh_failed", "error": str(e)})
+                    await websocket_manager.send(ws, {"type": "token", "event": "refresh_failed", "error": str(e)}, priority=True)
                 continue
 
             # --- 业务：交给 handler ---
@@ -134,14 +101,17 @@ async def ws_entry(
                 exp = payload.get("exp")  # JWT exp (epoch seconds)
                 if exp and (exp - _now()) < TOKEN_REFRESH_THRESHOLD and not refresh_notified:
                     refresh_notified = True
-                    await ws.send_json({"type": "token", "event": "refresh_required", "remain_sec": exp - _now()})
+                    await websocket_manager.send(
+                        ws, {"type": "token", "event": "refresh_required", "remain_sec": exp - _now()}, priority=True
+                    )
 
     except WebSocketDisconnect:
         pass
     except Exception as e:
         print(f"❌ WS error uid={uid}: {e}")
     finally:
-        watchdog_task.cancel()
         await websocket_manager.disconnect(ws)
-        await _set_offline(uid)
+        # 本进程该用户已无其它连接才标记离线（其它节点的连接会在下次心跳重新写入）
+        if not websocket_manager.is_online(uid):
+            presence.offline(uid)
         print(f"🔴 WS disconnected: uid={uid}")
@@ -1,9 +1,100 @@
 import json
 import asyncio
 import traceback
+from collections import deque
 from typing import Dict, Set
 from fastapi import WebSocket
 
+from app.extension.websocket.timers import ConnectionTimers
+
+
+class Outbox:
+    """
+    单连接的有界发送队列 + 独立写协程（该连接所有帧都经由这里，同一时刻只有一个协程写 socket）
+    - 生产方（broadcast / send_to_user）只做 put，不等待网络
+    - 慢客户端只会堆积自己的队列，不拖慢其它订阅者
+    - 队列满时按策略处理：drop_oldest 丢最旧消息 / disconnect 直接断开
+    - 控制帧（pong / token / 系统提示）走优先通道，先于业务消息发送，不受丢弃策略影响
+    - shutdown：发完最后一条控制帧后由写协程关闭连接（空闲断开）
+    """
+
+    control_maxsize = 16  # 控制帧积压上限（超出丢最旧，如过期的 pong）
+
+    def __init__(self, ws: WebSocket, on_dead, maxsize: int = 256,
+                 policy: str = "drop_oldest", send_timeout: float = 10):
+        self.ws = ws
+        self.maxsize = maxsize
+        self.policy = policy
+        self.send_timeout = send_timeout
+        self.queue: deque[str] = deque()
+        self.control: deque[str] = deque(maxlen=self.control_maxsize)
+        self.dropped = 0
+        self.closed = False
+        self._close_frame: tuple[int, str] | None = None
+        self._on_dead = on_dead
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._writer())
+
+    def put(self, msg: str, priority: bool = False) -> bool:
+        """入队；返回 False 表示连接已失效（调用方应当断开）"""
+        if self.closed:
+            return False
+        if self._close_frame is not None:
+            return True  # 正在关闭：不再接受新消息，也不算失效
+        if priority:
+            self.control.append(msg)
+            self._wakeup.set()
+            return True
+        if len(self.queue) >= self.maxsize:
+            if self.policy == "disconnect":
+                return False
+            self.queue.popleft()
+            self.dropped += 1
+        self.queue.append(msg)
+        self._wakeup.set()
+        return True
+
+    def shutdown(self, code: int, reason: str, final: str | None = None):
+        """丢弃未发送的业务消息，发出 final（若有）后关闭连接"""
+        if self.closed or self._close_frame is not None:
+            return
+        self.queue.clear()
+        if final is not None:
+            self.control.append(final)
+        self._close_frame = (code, reason)
+        self._wakeup.set()
+
+    async def _writer(self):
+        try:
+            while True:
+                if self.control:
+                    msg = self.control.popleft()
+                elif self._close_frame is not None:
+                    code, reason = self._close_frame
+                    await asyncio.wait_for(self.ws.close(code=code, reason=reason), timeout=self.send_timeout)
+                    break
+                elif self.queue:
+                    msg = self.queue.popleft()
+                else:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+                await asyncio.wait_for(self.ws.send_text(msg), timeout=self.send_timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            pass  # 发送失败 / 超时
+        # 连接已关闭或失效 → 交给 manager 清理
+        self.closed = True
+        await self._on_dead(self.ws)
+
+    def close(self):
+        self.closed = True
+        self.queue.clear()
+        self.control.clear()
+        if self._task is not asyncio.current_task():
+            self._task.cancel()
+
 
 class WebSocketManager:
     """统一管理所有 WebSocket 连接与频道"""
@@ -11,8 +102,10 @@ class WebSocketManager:
     def __init__(self):
         # { channel: {WebSocket, WebSocket, ...} }
         self.channels: Dict[str, Set[WebSocket]] = {}
-        # { WebSocket: {"channels": set(), "uid": str} }
+        # { WebSocket: {"channels": set(), "uid": str, "outbox": Outbox} }
         self.clients: Dict[WebSocket, dict] = {}
+        # { uid: {WebSocket, ...} } 多端登录索引，与 clients 同步维护
+        self.user_clients: Dict[str, Set[WebSocket]] = {}
         # 异常统计
         self.channel_failures: Dict[str, int] = {}
         self.heartbeat_interval = 30
@@ -22,12 +115,66 @@ class WebSocketManager:
         # {symbol: timestamp_until_skip_end}
         self.skip_until: Dict[str, float] = {}
 
+        # 单连接发送队列
+        self.outbox_size = 256  # 每个连接最多积压的消息数
+        self.slow_policy = "drop_oldest"  # drop_oldest / disconnect
+        self.send_timeout = 10  # 单条消息发送超时（秒），超时视为失效连接
+
+        # 跨进程路由（WebSocketRouteService 启用后生效，见 node_router.py）
+        self.router = None
+
+        # 心跳 ping + 空闲断开：全局一个定时器协程
+        self.timers = ConnectionTimers(self, heartbeat_interval=self.heartbeat_interval)
+
+    # ==========================================================
+    # 🌐 跨进程路由
+    # ==========================================================
+    async def enable_routing(self, redis, node_id: str | None = None):
+        """启用 Redis 节点路由，并登记当前已有的本地 uid / 频道"""
+        from app.extension.websocket.node_router import NodeRouter
+
+        router = NodeRouter(self, redis, node_id=node_id)
+        await router.start(users=list(self.user_clients), channels=self._local_channels())
+        self.router = router
+        return router
+
+    async def disable_routing(self):
+        router, self.router = self.router, None
+        if router:
+            await router.stop(users=list(self.user_clients), channels=self._local_channels())
+
+    def _local_channels(self) -> list:
+        return [ch for ch, receivers in self.channels.items() if receivers]
+
+    async def _route(self, method: str, *args):
+        """调用路由层；Redis 异常不影响本地连接与投递"""
+        if not self.router:
+            return
+        try:
+            await getattr(self.router, method)(*args)
+        except Exception as e:
+            print(f"⚠️ WS 路由 {method} 失败: {e}")
+
     # ==========================================================
     # ✅ 连接与订阅管理
     # ==========================================================
     async def connect(self, ws: WebSocket, uid: str):
         """注册连接（不在此 accept）"""
-        self.clients[ws] = {"channels": set(), "uid": uid}
+        if ws in self.clients:
+            # 同一连接重复注册：先清掉旧的 uid 索引与发送队列
+            await self.disconnect(ws)
+        outbox = Outbox(
+            ws, self.disconnect,
+            maxsize=self.outbox_size,
+            policy=self.slow_policy,
+            send_timeout=self.send_timeout,
+        )
+        self.clients[ws] = {"channels": set(), "uid": uid, "outbox": outbox}
+        self.timers.add(ws)
+        devices = self.user_clients.setdefault(self._uid_key(uid), set())
+        devices.add(ws)
+        if len(devices) == 1:
+            await self._route("add_user", self._uid_key(uid))
         print(f"✅ Client[{uid}] connected. 当前连接数: {len(self.clients)}")
 
     async def subscribe(self, ws: WebSocket, channel: str):
@@ -40,11 +187,15 @@ class WebSocketManager:
 
         self.channels[channel].add(ws)
         self.clients[ws]["channels"].add(channel)
+        if len(self.channels[channel]) == 1:
+            await self._route("add_channel", channel)
         print(f"➕ Client[{self.clients[ws]['uid']}] 订阅频道 {channel}")
 
     async def unsubscribe(self, ws: WebSocket, channel: str):
-        if channel in self.channels:
+        if channel in self.channels and ws in self.channels[channel]:
             self.channels[channel].discard(ws)
+            if not self.channels[channel]:
+                await self._route("remove_channel", channel)
         self.clients[ws]["channels"].discard(channel)
         print(f"➖ Client[{self.clients[ws]['uid']}] 取消订阅 {channel}")
 
@@ -53,18 +204,76 @@ class WebSocketManager:
         info = self.clients.pop(ws, None)
         if not info:
             return
+        info["outbox"].close()
+        self.timers.remove(ws)
         for ch in info["channels"]:
             self.channels[ch].discard(ws)
+            if not self.channels[ch]:
+                await self._route("remove_channel", ch)
+
+        key = self._uid_key(info["uid"])
+        devices = self.user_clients.get(key)
+        if devices is not None:
+            devices.discard(ws)
+            if not devices:
+                self.user_clients.pop(key, None)
+                await self._route("remove_user", key)
         print(f"🧹 Client[{info['uid']}] disconnected")
 
+    @staticmethod
+    def _uid_key(uid) -> str:
+        """uid 统一转成 str 作为索引键（调用方有的传 int 有的传 str）"""
+        return str(uid)
+
+    def user_connections(self, uid) -> Set[WebSocket]:
+        """该用户在本进程的全部连接（多端）"""
+        return set(self.user_clients.get(self._uid_key(uid), ()))
+
+    def is_online(self, uid) -> bool:
+        return self._uid_key(uid) in self.user_clients
+
+    def _enqueue(self, ws: WebSocket, msg: str, priority: bool = False) -> bool:
+        """非阻塞入队；连接已失效时返回 False"""
+        info = self.clients.get(ws)
+        if not info:
+            return False
+        return info["outbox"].put(msg, priority=priority)
+
+    async def _drop(self, dead_ws: list):
+        for ws in dead_ws:
+            await self.disconnect(ws)
+
     # ==========================================================
     # 📢 广播 / 点对点推送
     # ==========================================================
-    async def broadcast(self, channel: str, payload: dict):
+    async def broadcast(self, channel: str, payload: dict, local_only: bool = False):
         """
         向订阅该频道的客户端推送行情
-        带有错误计数与容错机制
+        只编码一次并放入各连接的发送队列，不等待任何客户端
+        启用路由时同时投递到持有该频道订阅者的其它节点
         """
+        msg = json.dumps(payload, ensure_ascii=False)
+        if not local_only:
+            await self._route("broadcast", channel, msg)
+        await self._deliver_channel(channel, msg)
+
+    async def broadcast_all(self, payload: dict, local_only: bool = False):
+        """广播给所有在线用户"""
+        msg = json.dumps(payload, ensure_ascii=False)
+        if not local_only:
+            await self._route("broadcast_all", msg)
+        await self._deliver_all(msg)
+
+    async def send_to_user(self, uid: str, payload: dict, local_only: bool = False):
+        """通过 uid 推送给特定用户（所有设备，O(设备数)）"""
+        msg = json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
+        if not local_only:
+            await self._route("send_to_user", self._uid_key(uid), msg)
+        await self._deliver_user(uid, msg)
+
+    # ---------- 本地投递（路由层收到的消息也走这里） ----------
+    async def _deliver_channel(self, channel: str, msg: str):
+        """带有错误计数与容错机制"""
         # 如果该币种在“跳过列表”中，暂不推送
         now = asyncio.get_event_loop().time()
         if channel in self.skip_until and now < self.skip_until[channel]:
@@ -74,18 +283,10 @@ class WebSocketManager:
         if not receivers:
             return
 
-        msg = json.dumps(payload, ensure_ascii=False)
-        dead_ws = []
-
-        for ws in list(receivers):
-            try:
-                await ws.send_text(msg)
-            except Exception:
-                dead_ws.append(ws)
+        dead_ws = [ws for ws in list(receivers) if not self._enqueue(ws, msg)]
 
         # 移除失效连接
-        for ws in dead_ws:
-            await self.disconnect(ws)
+        await self._drop(dead_ws)
 
         # 记录失败次数（便于跳过）
         if dead_ws:
@@ -103,39 +304,58 @@ class WebSocketManager:
             if channel in self.channel_failures:
                 self.channel_failures[channel] = 0
 
-    async def broadcast_all(self, payload: dict):
-        """广播给所有在线用户"""
-        msg = json.dumps(payload, ensure_ascii=False)
-        for ws in list(self.clients.keys()):
-            try:
-                await ws.send_text(msg)
-            except Exception:
-                await self.disconnect(ws)
-
-
-    async def send_to_user(self, uid: str, payload: dict):
-        """通过 uid 推送给特定用户"""
-        for ws, info in list(self.clients.items()):
-            if info["uid"] == uid:
-                try:
-                    await ws.send_json(payload)
-                except Exception:
-                    await self.disconnect(ws)
+    async def _deliver_all(self, msg: str):
+        dead_ws = [ws for ws in list(self.clients.keys()) if not self._enqueue(ws, msg)]
+        await self._drop(dead_ws)
+
+    async def _deliver_user(self, uid: str, msg: str):
+        devices = self.user_clients.get(self._uid_key(uid))
+        if not devices:
+            return
+        dead_ws = [ws for ws in list(devices) if not self._enqueue(ws, msg)]
+        await self._drop(dead_ws)
+
+    async def send(self, ws: WebSocket, payload: dict, priority: bool = False):
+        """单连接推送（同样走发送队列）；priority=True 为控制帧（pong / token / 系统提示），插队发送"""
+        msg = json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
+        if not self._enqueue(ws, msg, priority=priority):
+            await self.disconnect(ws)
 
     # ==========================================================
-    # 💓 心跳检测任务
+    # 💓 心跳 / 空闲超时（由 ConnectionTimers 调度）
     # ==========================================================
+    def touch(self, ws: WebSocket):
+        """收到客户端任意消息时调用，刷新 last_seen"""
+        self.timers.touch(ws)
+
+    def set_idle_timeout(self, ws: WebSocket, idle_timeout: float | None):
+        """开启空闲超时：idle_timeout 秒内无任何消息则断开"""
+        self.timers.set_idle_timeout(ws, idle_timeout)
+
+    def _ping_batch(self, sockets: list):
+        ping = json.dumps({"type": "ping"}, separators=(",", ":"))
+        dead_ws = [ws for ws in sockets if not self._enqueue(ws, ping)]
+        if dead_ws:
+            asyncio.create_task(self._drop(dead_ws))
+
+    def _close_idle(self, ws: WebSocket):
+        """提示 + 关闭都交给该连接的写协程，不与正在发送的消息并发写 socket"""
+        info = self.clients.get(ws)
+        if not info:
+            return
+        final = json.dumps({"type": "system", "error": "idle_timeout"}, separators=(",", ":"))
+        info["outbox"].shutdown(4004, "Idle timeout", final)
+
+    async def _close_idle_batch(self, sockets: list):
+        for ws in sockets:
+            self._close_idle(ws)
+
     async def start_heartbeat(self):
+        """心跳 ping 已由 ConnectionTimers 调度，这里只定期输出状态"""
         while True:
             await asyncio.sleep(self.heartbeat_interval)
-            for ws in list(self.clients.keys()):
-                try:
-                    await ws.send_json({"type": "ping"})
-                except Exception:
-                    await self.disconnect(ws)
-
             print(
-                f"💓 Heartbeat 完成 | 在线用户: {len(self.clients)} | "
+                f"💓 Heartbeat 完成 | 在线用户: {len(self.user_clients)} | 连接数: {len(self.clients)} | "
                 f"频道数: {len(self.channels)} | 跳过币种: {len(self.skip_until)}"
             )
 
@@ -4,7 +4,7 @@
 # @File    : __init__.py.py
 # @Software: PyCharm
 """
-from .db import async_session_factory
+from .db import async_session_factory, unit_of_work, uow_session
 from .exception import APIException, HTTPException, InternalServerError
 from .pedro_jwt import jwt
 from .manager import Manager
@@ -54,10 +54,25 @@ class AppConfig(BaseModel):
     port: int = 8080
     server_domain: str = None
     oss_domain: str = None
+    json_renderer: str = "json"  # json / orjson（orjson 需额外安装）
 
 
 class DatabaseConfig(BaseModel):
     url: str = "sqlite+aiosqlite:///./app.db"
+    echo: bool = False
+    auto_create: bool = True
+    # 连接池（SQLite 只使用 pool_pre_ping / pool_recycle）
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_timeout: float = 30            # 等待空闲连接的最长秒数
+    pool_recycle: int = 1800            # 连接最长存活秒数，-1 = 不回收
+    pool_pre_ping: bool = True
+    # asyncpg 预编译语句缓存（PgBouncer transaction 模式需设为 0）
+    statement_cache_size: int = 100
+    prepared_statement_cache_size: int = 500
+    # 连接池指标：等待超过该毫秒数 / 使用率超过该比例时打印告警
+    pool_slow_checkout_ms: int = 100
+    pool_saturation_warn: float = 0.9
 
 
 class ExtraConfig(BaseModel):
@@ -68,6 +83,9 @@ class AuthConfig(BaseModel):
     secret: str = Field(default="3MqaL/AJgdaAfP2m+jUp4RQbr7lksY9kAZLQwUaX09c=")
     access_expires_in: str = Field(default="1h")
     refresh_expires_in: str = Field(default="7d")
+    user_cache_ttl: int = Field(default=30)          # 认证用户缓存秒数，0 = 关闭
+    user_cache_size: int = Field(default=10000)      # 进程内缓存上限
+    user_cache_redis: bool = Field(default=False)    # 是否启用 Redis Hash 二级缓存
 
     @property
     def access_timedelta(self):
@@ -151,13 +169,16 @@ def deep_merge(base: dict, override: dict) -> dict:
 
 
 def substitute_env_vars(value: Any) -> Any:
-    """解析 ${VAR} 变量"""
+    """解析 ${VAR} / ${VAR:-默认值} 变量"""
     if isinstance(value, str):
         matches = re.findall(r"\$\{([^}^{]+)\}", value)
-        for var in matches:
+        for expr in matches:
+            var, sep, default = expr.partition(":-")
             env_val = os.getenv(var)
             if env_val:
-                value = value.replace(f"${{{var}}}", env_val)
+                value = value.replace(f"${{{expr}}}", env_val)
+            elif sep:
+                value = value.replace(f"${{{expr}}}", default)
     elif isinstance(value, dict):
         return {k: substitute_env_vars(v) for k, v in value.items()}
     elif isinstance(value, list):
@@ -23,10 +23,14 @@ from sqlalchemy.ext.asyncio import (
     create_async_engine,
     async_sessionmaker,
 )
+from sqlalchemy.exc import TimeoutError as SQLATimeoutError
 from sqlalchemy.orm import declarative_base, declared_attr
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from fastapi import HTTPException, status
 from contextlib import asynccontextmanager
+from contextvars import ContextVar
 import json
+import time
 
 # ======================================================
 # ⚙️ ORM Base 定义
@@ -70,13 +74,15 @@ class BaseModel(Base):
         def _convert(value: Any):
             if isinstance(value, datetime):
                 return value.isoformat()
-            if isinstance(value, (dict, list)):
+            if isinstance(value, (dict, list, str, int, float, bool)) or value is None:
                 return value
-            try:
-                json.dumps(value)
-                return value
-            except Exception:
-                return str(value)
+            if isinstance(value, tuple):
+                try:
+                    json.dumps(value)
+                    return value
+                except Exception:
+                    pass
+            return str(value)
 
         return {
             k: _convert(v)
@@ -190,6 +196,116 @@ class BaseModel(Base):
 # ⚙️ 异步引擎 & Session 工厂
 # ======================================================
 
+# ------------------------------------------------------
+# 🧮 连接池指标（checkout 等待时间 / 使用率）
+# ------------------------------------------------------
+class PoolMetrics:
+    """MeteredPool 写入，pool_stats() 读取"""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+        self.slow_checkouts = 0
+        self.slow_checkout_ms = 100
+        self.saturation_warn = 0.9
+        self._last_warn = 0.0
+
+    def observe(self, pool, wait_ms: float, timed_out: bool = False):
+        self.checkouts += 1
+        self.total_wait_ms += wait_ms
+        self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+        if timed_out:
+            self.timeouts += 1
+        if wait_ms >= self.slow_checkout_ms:
+            self.slow_checkouts += 1
+
+        # 告警限频：每 10 秒最多一条
+        saturation = pool_saturation(pool)
+        if (wait_ms >= self.slow_checkout_ms or saturation >= self.saturation_warn or timed_out) \
+                and time.monotonic() - self._last_warn > 10:
+            self._last_warn = time.monotonic()
+            print(
+                f"⚠️ DB 连接池紧张: 等待 {wait_ms:.1f}ms | 使用率 {saturation:.0%} | "
+                f"{pool.status()} | 超时 {self.timeouts}"
+            )
+
+
+pool_metrics = PoolMetrics()
+
+
+def pool_saturation(pool) -> float:
+    capacity = pool.size() + max(getattr(pool, "_max_overflow", 0), 0)
+    return pool.checkedout() / capacity if capacity else 0.0
+
+
+class MeteredPool(AsyncAdaptedQueuePool):
+    """记录每次 checkout 等待时间的连接池"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except SQLATimeoutError:
+            pool_metrics.observe(self, (time.perf_counter() - start) * 1000, timed_out=True)
+            raise
+        pool_metrics.observe(self, (time.perf_counter() - start) * 1000)
+        return conn
+
+
+def pool_stats() -> Dict[str, Any]:
+    """当前连接池状态 + 累计指标"""
+    pool = get_engine().pool
+    stats: Dict[str, Any] = {"pool": pool.status()}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "saturation": round(pool_saturation(pool), 3),
+        })
+    m = pool_metrics
+    stats.update({
+        "checkouts": m.checkouts,
+        "timeouts": m.timeouts,
+        "slow_checkouts": m.slow_checkouts,
+        "avg_wait_ms": round(m.total_wait_ms / m.checkouts, 3) if m.checkouts else 0.0,
+        "max_wait_ms": round(m.max_wait_ms, 3),
+    })
+    return stats
+
+
+def engine_options(db) -> Dict[str, Any]:
+    """DatabaseConfig → create_async_engine 参数"""
+    options: Dict[str, Any] = {
+        "echo": db.echo,
+        "future": True,
+        "pool_pre_ping": db.pool_pre_ping,
+        "pool_recycle": db.pool_recycle,
+    }
+    if db.url.startswith("sqlite"):
+        # SQLite 使用 SQLAlchemy 默认池（文件库 / 内存库各不相同）
+        return options
+
+    options.update({
+        "poolclass": MeteredPool,
+        "pool_size": db.pool_size,
+        "max_overflow": db.max_overflow,
+        "pool_timeout": db.pool_timeout,
+    })
+    if "+asyncpg" in db.url:
+        options["connect_args"] = {
+            # asyncpg 连接级预编译语句缓存
+            "statement_cache_size": db.statement_cache_size,
+            # SQLAlchemy asyncpg 方言的预编译语句 LRU
+            "prepared_statement_cache_size": db.prepared_statement_cache_size,
+        }
+    pool_metrics.slow_checkout_ms = db.pool_slow_checkout_ms
+    pool_metrics.saturation_warn = db.pool_saturation_warn
+    return options
+
+
 # ✅ 自动适配异步数据库URL (sqlite / postgres / mysql)
 @lru_cache()
 def get_engine():
@@ -200,11 +316,7 @@ def get_engine():
     import importlib
     settings_manager = importlib.import_module("app.config.settings_manager")
     settings = settings_manager.get_current_settings()
-    return create_async_engine(
-        settings.database.url,
-        echo=False,
-        future=True,
-    )
+    return create_async_engine(settings.database.url, **engine_options(settings.database))
 
 @lru_cache()
 def get_session_factory():
@@ -226,3 +338,54 @@ async def get_session() -> AsyncGenerator[AsyncSession, None]:
             yield session
         finally:
             await session.close()
+
+
+# ======================================================
+# 🧾 请求级 Unit of Work（BaseCrud 自动复用同一个 Session）
+# ======================================================
+_uow_session: ContextVar[Optional[AsyncSession]] = ContextVar("pedro_uow_session", default=None)
+
+
+def current_session() -> Optional[AsyncSession]:
+    """当前 unit_of_work 绑定的 Session（没有则为 None）"""
+    return _uow_session.get()
+
+
+@asynccontextmanager
+async def unit_of_work() -> AsyncGenerator[AsyncSession, None]:
+    """
+    一个连接 + 一个事务：块内所有 BaseCrud 调用共用该 Session，结束时统一 commit
+    - 异常时整体 rollback
+    - 嵌套调用直接加入外层事务
+    ⚠️ 块内共用一个 AsyncSession，不支持并发：不要在块内 asyncio.gather 多个 BaseCrud 调用
+       （SQLAlchemy 会报 concurrent operations are not permitted），需要并发时放到块外各自开 Session
+    用法：
+        async with unit_of_work():
+            order = await ShopOrders.create(...)
+            await product.update(stock=product.stock - 1)
+    """
+    session = _uow_session.get()
+    if session is not None:
+        yield session
+        return
+
+    async with async_session_factory() as session:
+        token = _uow_session.set(session)
+        try:
+            yield session
+            await session.commit()
+        except BaseException:
+            await session.rollback()
+            raise
+        finally:
+            try:
+                _uow_session.reset(token)
+            except ValueError:
+                # 在其它 Context 中退出（如 FastAPI 依赖清理），直接解绑
+                _uow_session.set(None)
+
+
+async def uow_session() -> AsyncGenerator[AsyncSession, None]:
+    """FastAPI 依赖：Depends(uow_session)，整个请求共用一个事务"""
+    async with unit_of_work() as session:
+        yield session
@@ -2,7 +2,6 @@
 """
 Pedro exception system - enhanced ExceptionGroup support
 """
-import json
 import traceback
 import uuid
 import re
@@ -11,8 +10,8 @@ from fastapi import Request, logger
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from pydantic import BaseModel
-from app.extension.i18n.i18n_exception import translate_message
-from starlette.responses import Response
+from app.pedro.request_path import parse_accept_language
+from app.pedro.response import PedroJSONResponse
 
 try:
     ExceptionGroup  # noqa
@@ -79,8 +78,6 @@ class UnAuthentication(APIException):
 
 
 async def build_error_response(request: Request, msg: str, error_code: int, http_code: int, trace_id=None):
-    lang = request.headers.get("Accept-Language", "zh").split(",")[0].strip().lower()
-    msg = await translate_message(msg, lang[:2])
     trace_id = trace_id or uuid.uuid4().hex[:8]
 
     model = APIExceptionModel(
@@ -90,7 +87,9 @@ async def build_error_response(request: Request, msg: str, error_code: int, http
         trace_id=trace_id,
     )
     content = model.model_dump() if hasattr(model, "model_dump") else model.dict()
-    return JSONResponse(status_code=http_code, content=content)
+    # 兜底异常处理器运行在中间件之外（请求上下文已重置），语言显式传入；msg 由响应发送前翻译
+    lang = parse_accept_language(request.headers.get("Accept-Language"))
+    return PedroJSONResponse(status_code=http_code, content=content, lang=lang)
 
 
 def _safe_err_msg(exc: Exception) -> str:
@@ -178,69 +177,3 @@ def register_exception_handlers(app):
         if request.headers.get("upgrade", "").lower() == "websocket":
             return await call_next(request)
         return await call_next(request)
-
-    @app.middleware("http")
-    async def inject_request_path_middleware(request: Request, call_next):
-        response = await call_next(request)
-        if "application/json" in response.headers.get("content-type", ""):
-            try:
-                body = b""
-                async for chunk in response.body_iterator:
-                    body += chunk
-
-                data = json.loads(body)
-                if isinstance(data, dict) and "request" in data:
-                    data["request"] = request.url.path
-                    new_body = json.dumps(data).encode()
-                    return Response(
-                        content=new_body,
-                        status_code=response.status_code,
-                        headers=dict(response.headers),
-                        media_type="application/json"
-                    )
-                else:
-                    return Response(
-                        content=body,
-                        status_code=response.status_code,
-                        headers=dict(response.headers),
-                        media_type="application/json"
-                    )
-            except:
-                pass
-        return response
-
-    # ---------------------------
-    # 🧩 全局响应翻译中间件（新增）
-    # ---------------------------
-    @app.middleware("http")
-    async def global_i18n_response(request: Request, call_next):
-        # 🧩 跳过 WebSocket
-        if request.headers.get("upgrade", "").lower() == "websocket":
-            return await call_next(request)
-
-        response = await call_next(request)
-
-        if "application/json" in response.headers.get("content-type", ""):
-            try:
-                body = b""
-                async for chunk in response.body_iterator:
-                    body += chunk
-                data = json.loads(body)
-
-                # 检测是否存在 msg 字段
-                if isinstance(data, dict) and "msg" in data:
-                    lang_header = (request.headers.get("Accept-Language") or "zh").split(",")[0].strip().lower()
-                    lang = lang_header.replace("_", "-").split("-")[0]
-                    data["msg"] = await translate_message(data["msg"], lang)
-
-                new_body = json.dumps(data).encode()
-                return Response(
-                    content=new_body,
-                    status_code=response.status_code,
-                    headers=dict(response.headers),
-                    media_type="application/json"
-                )
-            except Exception as e:
-                logger.logger.warning(f"[global_i18n_response] Failed: {e}")
-
-        return response
@@ -9,7 +9,14 @@ Pedro-Core 接口定义层（Interface Layer）
 """
 
 from __future__ import annotations
-from datetime import datetime, timezone
+import base64
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from contextlib import asynccontextmanager
 from typing import Any, Dict, List, Optional, Type, TypeVar, Union
 
 from sqlalchemy import (
@@ -24,28 +31,191 @@ from sqlalchemy import (
     text,
     asc,
     desc,
-    BigInteger
+    BigInteger,
+    UniqueConstraint,
+    and_,
+    event,
+    inspect,
+    or_,
 )
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.dialects.mysql import BIGINT
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.ext.mutable import MutableDict
 from sqlalchemy.orm import declarative_mixin
 
-from app.pedro.db import BaseModel, async_session_factory
+from app.pedro.db import BaseModel, async_session_factory, current_session, unit_of_work
+from app.pedro.search import search_index
 from .enums import GroupLevelEnum
 
 T = TypeVar("T", bound="BaseCrud")
 
 
+# ======================================================
+# 🧩 分页工具
+# ======================================================
+def _normalize_filter_value(v):
+    """🔧 通用类型转换（布尔安全）"""
+    if v is None:
+        return None
+    if isinstance(v, str):
+        lv = v.lower().strip()
+        if lv in ("1", "true", "t", "yes", "y"):
+            return True
+        if lv in ("0", "false", "f", "no", "n"):
+            return False
+        # 尝试转数字
+        try:
+            if "." in lv:
+                return float(lv)
+            return int(lv)
+        except ValueError:
+            return lv
+    return v
+
+
+def encode_cursor(value: Any, last_id: int) -> str:
+    """(排序值, id) → 不透明游标"""
+    if isinstance(value, datetime):
+        tagged = ["dt", value.isoformat()]
+    elif isinstance(value, date):
+        tagged = ["d", value.isoformat()]
+    elif isinstance(value, Decimal):
+        tagged = ["dec", str(value)]
+    else:
+        tagged = ["v", value]
+    raw = json.dumps([tagged, last_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[Any, int]:
+    """不透明游标 → (排序值, id)"""
+    from app.pedro.exception import ParameterError
+
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        (tag, value), last_id = json.loads(raw)
+        if tag == "dt":
+            value = datetime.fromisoformat(value)
+        elif tag == "d":
+            value = date.fromisoformat(value)
+        elif tag == "dec":
+            value = Decimal(value)
+        elif tag != "v":
+            raise ValueError(tag)
+        return value, int(last_id)
+    except Exception:
+        raise ParameterError("分页游标无效")
+
+
+# 原生 upsert（INSERT ... ON CONFLICT DO UPDATE ... RETURNING）支持的方言
+UPSERT_DIALECTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+# 批量 upsert：单条语句的绑定参数上限（asyncpg 为 32767）
+BULK_MAX_PARAMS = 30000
+# 批量 upsert 的行内容哈希列：模型声明该列后，内容未变化的行由 DO UPDATE ... WHERE 在库内跳过
+CONTENT_HASH_COLUMN = "content_hash"
+
+
+def _row_hash(row: dict, exclude=()) -> str:
+    """行内容哈希（排除 exclude 中的易变字段，如采集时间）"""
+    content = {k: v for k, v in row.items() if k not in exclude}
+    raw = json.dumps(content, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+
+def _reset_content_hash(mapper, connection, target):
+    """ORM 修改了业务字段但没带新哈希 → 清空哈希，下次采集必然重写（避免内容与哈希漂移）"""
+    if CONTENT_HASH_COLUMN not in mapper.columns:
+        return
+    state = inspect(target)
+    if state.attrs[CONTENT_HASH_COLUMN].history.has_changes():
+        return
+    if any(
+            state.attrs[attr.key].history.has_changes()
+            for attr in mapper.column_attrs
+            if attr.key != CONTENT_HASH_COLUMN
+    ):
+        setattr(target, CONTENT_HASH_COLUMN, None)
+
+
+event.listen(BaseModel, "before_update", _reset_content_hash, propagate=True)
+
+
+COUNT_CACHE_TTL = 60
+COUNT_CACHE_SIZE = 1024
+
+
+class CountCache:
+    """
+    estimate 模式的 count 短时缓存（进程内，有界）
+    ✅ TTL 固定，OrderedDict 的写入顺序即过期顺序
+    ✅ 写入时从队头淘汰已过期项，再按容量上限淘汰最早写入的项
+    """
+
+    def __init__(self, maxsize: int = COUNT_CACHE_SIZE, ttl: float = COUNT_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # key -> (过期时间, total)
+        self._store: "OrderedDict[str, tuple[float, int]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[int]:
+        entry = self._store.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            self._store.pop(key, None)
+            return None
+        return entry[1]
+
+    def set(self, key: str, total: int) -> None:
+        now = time.monotonic()
+        self._store.pop(key, None)
+        self._store[key] = (now + self.ttl, total)
+        while self._store:
+            expire_at, _ = next(iter(self._store.values()))
+            if expire_at > now and len(self._store) <= self.maxsize:
+                break
+            self._store.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    def clear(self) -> None:
+        self._store.clear()
+
+
+_count_cache = CountCache()
+
+
 # ======================================================
 # 🧩 通用抽象基类
 # ======================================================
+@asynccontextmanager
+async def _session_scope():
+    """
+    BaseCrud 的 Session 来源：
+    处于 unit_of_work 中时复用其 Session（commit 交给外层统一提交），否则开新 Session
+    返回 (session, shared)
+    复用的 Session 不能并发使用：unit_of_work 内的 BaseCrud 调用需逐个 await
+    """
+    session = current_session()
+    if session is not None:
+        yield session, True
+        return
+    async with async_session_factory() as session:
+        yield session, False
+
+
 class BaseCrud(BaseModel):
     """基础 CRUD 抽象类，不绑定表名"""
     __abstract__ = True
 
     id = Column(Integer, primary_key=True, autoincrement=True)
 
+    # upsert 冲突目标（唯一键列名）；不声明时按 where 的字段匹配主键 / 唯一约束 / 唯一索引
+    __upsert_key__: tuple = ()
+
     # ======================================================
     # 🔍 通用查询（兼容 query / filters）
     # ======================================================
@@ -67,7 +237,7 @@ class BaseCrud(BaseModel):
         ✅ 支持 filter_by(**filters)
         ✅ 支持排序、分页
         """
-        async with async_session_factory() as session:
+        async with _session_scope() as (session, shared):
             # 🔸 兼容外部传入完整查询
             if query is not None:
                 stmt = query.where(getattr(cls, "is_deleted", False) == False)
@@ -93,12 +263,51 @@ class BaseCrud(BaseModel):
                 return result.scalars().first()
             return list(result.scalars().all())
 
-    # ======================================================
-    # 📄 通用分页查询（含模糊搜索 + 排序）
-    # ======================================================
     # ======================================================
     # 📄 通用分页查询（含模糊搜索 + 排序 + 布尔识别增强）
     # ======================================================
+    @classmethod
+    def _list_criteria(
+            cls,
+            filters: Optional[dict] = None,
+            keyword: Optional[str] = None,
+            keyword_fields: Optional[list[str]] = None,
+            hits=None,
+    ) -> list:
+        """paginate / paginate_cursor 共用的 where 条件（hits 不为空时关键词走全文索引，由调用方 join）"""
+        criteria = [getattr(cls, "is_deleted", False) == False]
+
+        # 🔹 等值过滤（布尔安全 + 兼容多数据库）
+        if filters:
+            for k, v in filters.items():
+                if hasattr(cls, k):
+                    v = _normalize_filter_value(v)
+                    if v is not None:
+                        criteria.append(getattr(cls, k) == v)
+
+        # 🔹 模糊搜索（多字段匹配，无全文索引时）
+        if keyword and keyword_fields and hits is None:
+            like_pattern = f"%{keyword}%"
+            criteria.append(
+                or_(
+                    *[
+                        getattr(cls, f).ilike(like_pattern)
+                        if hasattr(cls, f) and hasattr(getattr(cls, f), "ilike")
+                        else getattr(cls, f).like(like_pattern)
+                        for f in keyword_fields
+                        if hasattr(cls, f)
+                    ]
+                )
+            )
+        return criteria
+
+    @classmethod
+    def _search_hits(cls, session, keyword: Optional[str], keyword_fields):
+        """全文索引命中子查询 (id, rank)；不可用时为 None（回退 ILIKE）"""
+        if not keyword or not keyword_fields:
+            return None
+        return search_index.hits(cls, keyword, keyword_fields, session.get_bind().dialect.name)
+
     @classmethod
     async def paginate(
             cls: Type[T],
@@ -110,74 +319,38 @@ class BaseCrud(BaseModel):
             keyword_fields: Optional[list[str]] = None,
             order_by: Optional[str] = None,
             sort: str = "desc",
-    ) -> tuple[list[T], int]:
+            count_mode: str = "exact",
+    ) -> tuple[list[T], Optional[int]]:
         """
         📄 Pedro-Core 通用分页查询（安全版）
         -------------------------------------------------
         ✅ 支持 filters 等值查询（布尔/数值/字符串自动识别）
-        ✅ 支持 keyword 模糊搜索（多字段）
-        ✅ 支持排序与分页
+        ✅ 支持 keyword 模糊搜索（多字段；模型声明 __search_fields__ 时走全文索引）
+        ✅ 支持排序与分页；全文检索且 order_by 为空 / "rank" 时按相关度排序
         ✅ 自动统计总数，复用同样的过滤条件
+        ✅ count_mode: exact（默认）/ estimate（近似或缓存）/ none（跳过，total=None）
+           estimate 在 PostgreSQL 且无过滤条件时读 pg_class.reltuples：整表统计值，
+           包含软删除（is_deleted=True）的行，且只在 ANALYZE / autovacuum 后更新；需要精确总数用 exact
         ✅ 兼容 PostgreSQL / MySQL / SQLite
         -------------------------------------------------
         返回: (items, total)
+        深分页请改用 paginate_cursor()
         """
-
-        def normalize_value(v):
-            """🔧 通用类型转换（布尔安全）"""
-            if v is None:
-                return None
-            if isinstance(v, str):
-                lv = v.lower().strip()
-                if lv in ("1", "true", "t", "yes", "y"):
-                    return True
-                if lv in ("0", "false", "f", "no", "n"):
-                    return False
-                # 尝试转数字
-                try:
-                    if "." in lv:
-                        return float(lv)
-                    return int(lv)
-                except ValueError:
-                    return lv
-            return v
-
-        async with async_session_factory() as session:
-            stmt = select(cls)
-            stmt = stmt.where(getattr(cls, "is_deleted", False) == False)
-
-            # ======================================================
-            # 🔹 等值过滤（布尔安全 + 兼容多数据库）
-            # ======================================================
-            if filters:
-                for k, v in filters.items():
-                    if hasattr(cls, k):
-                        v = normalize_value(v)
-                        if v is not None:
-                            stmt = stmt.where(getattr(cls, k) == v)
-
-            # ======================================================
-            # 🔹 模糊搜索（多字段匹配）
-            # ======================================================
-            if keyword and keyword_fields:
-                from sqlalchemy import or_
-                like_pattern = f"%{keyword}%"
-                stmt = stmt.where(
-                    or_(
-                        *[
-                            getattr(cls, f).ilike(like_pattern)
-                            if hasattr(cls, f) and hasattr(getattr(cls, f), "ilike")
-                            else getattr(cls, f).like(like_pattern)
-                            for f in keyword_fields
-                            if hasattr(cls, f)
-                        ]
-                    )
-                )
+        async with _session_scope() as (session, shared):
+            hits = cls._search_hits(session, keyword, keyword_fields)
+            criteria = cls._list_criteria(filters, keyword, keyword_fields, hits=hits)
+            stmt = select(cls).where(*criteria)
+            count_criteria = criteria
+            if hits is not None:
+                stmt = stmt.join(hits, hits.c.id == cls.id)
+                count_criteria = [*criteria, cls.id.in_(select(hits.c.id))]
 
             # ======================================================
             # 🔹 排序
             # ======================================================
-            if order_by and hasattr(cls, order_by):
+            if hits is not None and order_by in (None, "rank"):
+                stmt = stmt.order_by(desc(hits.c.rank), desc(cls.id))
+            elif order_by and hasattr(cls, order_by):
                 order_col = getattr(cls, order_by)
                 stmt = stmt.order_by(
                     desc(order_col) if sort.lower() == "desc" else asc(order_col)
@@ -200,24 +373,123 @@ class BaseCrud(BaseModel):
             items = list(result.scalars().all())
 
             # ======================================================
-            # 🔹 构造 count 查询（复用 where 条件）
+            # 🔹 统计总数（复用 where 条件）
             # ======================================================
-            count_stmt = select(func.count(cls.id))
-            count_stmt = count_stmt.where(getattr(cls, "is_deleted", False) == False)
+            total = await cls._paginate_total(
+                session, count_criteria, count_mode, filtered=len(count_criteria) > 1
+            )
+            return items, total
 
-            for w in stmt._where_criteria:
-                count_stmt = count_stmt.where(w)
+    @classmethod
+    async def _paginate_total(
+            cls,
+            session: AsyncSession,
+            criteria: list,
+            count_mode: str,
+            filtered: bool,
+    ) -> Optional[int]:
+        if count_mode == "none":
+            return None
+
+        count_stmt = select(func.count(cls.id)).where(*criteria)
+        if count_mode != "estimate":
+            return int((await session.execute(count_stmt)).scalar() or 0)
+
+        # 🔹 PostgreSQL 无过滤条件时直接读统计信息（近似值，含软删除行）
+        if not filtered and session.bind.dialect.name == "postgresql":
+            result = await session.execute(
+                text("SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:t AS regclass)"),
+                {"t": cls.__tablename__},
+            )
+            estimate = result.scalar()
+            if estimate is not None and estimate >= 0:
+                return int(estimate)
 
-            total = (await session.execute(count_stmt)).scalar() or 0
+        # 🔹 其它情况：短时缓存的精确 count
+        compiled = count_stmt.compile(session.bind)
+        cache_key = f"{compiled}|{compiled.params!r}"
+        cached = _count_cache.get(cache_key)
+        if cached is not None:
+            return cached
 
-            return items, int(total)
+        total = int((await session.execute(count_stmt)).scalar() or 0)
+        _count_cache.set(cache_key, total)
+        return total
+
+    # ======================================================
+    # 📄 游标分页（keyset，按 (order_by, id) 定位）
+    # ======================================================
+    @classmethod
+    async def paginate_cursor(
+            cls: Type[T],
+            *,
+            size: int = 10,
+            cursor: Optional[str] = None,
+            filters: Optional[dict] = None,
+            keyword: Optional[str] = None,
+            keyword_fields: Optional[list[str]] = None,
+            order_by: Optional[str] = None,
+            sort: str = "desc",
+    ) -> tuple[list[T], Optional[str]]:
+        """
+        📄 游标分页（深分页不再扫描并丢弃前缀）
+        -------------------------------------------------
+        ✅ 过滤 / 模糊搜索与 paginate 一致
+        ✅ 排序键为 (order_by, id)，order_by 列需非空
+        ✅ 不统计总数
+        -------------------------------------------------
+        返回: (items, next_cursor)，next_cursor 为 None 表示没有下一页
+        """
+        descending = sort.lower() == "desc"
+        id_col = cls.id
+        order_col = getattr(cls, order_by) if order_by and hasattr(cls, order_by) else id_col
+        keyed_on_id = order_col is id_col
+
+        async with _session_scope() as (session, shared):
+            hits = cls._search_hits(session, keyword, keyword_fields)
+            criteria = cls._list_criteria(filters, keyword, keyword_fields, hits=hits)
+
+            if cursor:
+                last_value, last_id = decode_cursor(cursor)
+                if keyed_on_id:
+                    criteria.append(id_col < last_id if descending else id_col > last_id)
+                elif descending:
+                    criteria.append(or_(
+                        order_col < last_value,
+                        and_(order_col == last_value, id_col < last_id),
+                    ))
+                else:
+                    criteria.append(or_(
+                        order_col > last_value,
+                        and_(order_col == last_value, id_col > last_id),
+                    ))
+
+            direction = desc if descending else asc
+            stmt = select(cls).where(*criteria)
+            if hits is not None:
+                stmt = stmt.join(hits, hits.c.id == cls.id)
+            stmt = stmt.order_by(direction(id_col)) if keyed_on_id else stmt.order_by(
+                direction(order_col), direction(id_col)
+            )
+            stmt = stmt.limit(size + 1)
+
+            result = await session.execute(stmt)
+            items = list(result.scalars().all())
+
+        next_cursor = None
+        if len(items) > size:
+            items = items[:size]
+            last = items[-1]
+            last_value = last.id if keyed_on_id else getattr(last, order_col.key)
+            next_cursor = encode_cursor(last_value, last.id)
+        return items, next_cursor
 
     # ======================================================
     # 🔢 计数查询（支持 query / filters）
     # ======================================================
     @classmethod
     async def count(cls, query=None, **filters: Any) -> int:
-        async with async_session_factory() as session:
+        async with _session_scope() as (session, shared):
             if query is not None:
                 count_stmt = query.with_only_columns(func.count(cls.id))
             else:
@@ -230,12 +502,12 @@ class BaseCrud(BaseModel):
     # ======================================================
     @classmethod
     async def create(cls: Type[T], commit: bool = True, **data: Any) -> T:
-        async with async_session_factory() as session:
+        async with _session_scope() as (session, shared):
             obj = cls(**data)
             session.add(obj)
             await session.flush()
             await session.refresh(obj)
-            if commit:
+            if commit and not shared:
                 await session.commit()
             return obj
 
@@ -244,7 +516,23 @@ class BaseCrud(BaseModel):
     # ======================================================
     @classmethod
     async def upsert(cls: Type[T], where: dict, data: dict, commit: bool = True) -> T:
-        async with async_session_factory() as session:
+        """
+        存在则更新，否则创建
+        - PostgreSQL / SQLite：单条 INSERT ... ON CONFLICT DO UPDATE ... RETURNING（一次往返、无并发竞争）
+        - 其它方言或 where 对不上唯一键：回退为 SELECT + INSERT / UPDATE
+        """
+        async with _session_scope() as (session, shared):
+            dialect = session.get_bind().dialect.name
+            key = cls._upsert_key(where)
+            if key and dialect in UPSERT_DIALECTS:
+                values = {k: v for k, v in {**where, **data}.items() if k in cls.__table__.c}
+                stmt = cls._upsert_stmt(dialect, key, list(values)).values(values).returning(cls)
+                result = await session.scalars(stmt, execution_options={"populate_existing": True})
+                instance = result.one()
+                if commit and not shared:
+                    await session.commit()
+                return instance
+
             stmt = select(cls).filter_by(**where).limit(1)
             result = await session.execute(stmt)
             instance = result.scalars().first()
@@ -260,22 +548,157 @@ class BaseCrud(BaseModel):
 
             await session.flush()
             if commit:
-                await session.commit()
+                if not shared:
+                    await session.commit()
                 await session.refresh(instance)
             return instance
 
+    @classmethod
+    def _upsert_key(cls, where: dict) -> Optional[tuple]:
+        """冲突目标：优先 __upsert_key__，其次与 where 字段完全一致的主键 / 唯一约束 / 唯一索引"""
+        table = cls.__table__
+        if cls.__upsert_key__:
+            key = tuple(cls.__upsert_key__)
+            return key if set(key) <= set(where) else None
+
+        candidates = [tuple(c.name for c in table.primary_key.columns)]
+        candidates += [
+            tuple(c.name for c in con.columns)
+            for con in table.constraints
+            if isinstance(con, UniqueConstraint)
+        ]
+        candidates += [tuple(c.name for c in idx.columns) for idx in table.indexes if idx.unique]
+        for key in candidates:
+            if key and set(key) == set(where):
+                return key
+        return None
+
+    @classmethod
+    def _upsert_stmt(cls, dialect: str, key: tuple, columns: List[str], update_fields=None, target=None,
+                     only_changed: bool = False):
+        """
+        构造 INSERT ... ON CONFLICT (key) DO UPDATE SET ...（不带 VALUES）
+        - 单行：.values(row)；批量：executemany 传参，由 SQLAlchemy 按页拼成多行 VALUES
+        - update_fields 默认取 columns 中除 key 外的所有列；onupdate 列（如 update_time）一并更新
+        - only_changed：DO UPDATE ... WHERE content_hash IS DISTINCT FROM excluded.content_hash
+          （哈希相同的行不更新，也不会出现在 RETURNING 中）
+        """
+        table = cls.__table__
+        if update_fields is None:
+            update_fields = columns
+
+        stmt = UPSERT_DIALECTS[dialect](cls if target is None else target)
+        set_ = {k: stmt.excluded[k] for k in update_fields if k not in key}
+        for column in table.columns:
+            if column.onupdate is not None and column.name not in set_ and column.name not in key:
+                default = column.onupdate
+                if default.is_callable:
+                    set_[column.name] = default.arg(None)
+                elif default.is_clause_element or default.is_scalar:
+                    set_[column.name] = default.arg
+        if not set_:
+            # 没有可更新的列时做一次 no-op 更新，保证 RETURNING 能拿到已存在的行
+            set_ = {k: stmt.excluded[k] for k in key}
+        elif CONTENT_HASH_COLUMN in table.c and CONTENT_HASH_COLUMN not in set_:
+            # 不带哈希的更新：清空哈希，下次批量采集重新比对
+            set_[CONTENT_HASH_COLUMN] = None
+
+        where = None
+        if only_changed:
+            where = table.c[CONTENT_HASH_COLUMN].is_distinct_from(stmt.excluded[CONTENT_HASH_COLUMN])
+        return stmt.on_conflict_do_update(index_elements=list(key), set_=set_, where=where)
+
+    # ======================================================
+    # 📦 批量 Upsert（采集 / 同步入库）
+    # ======================================================
+    @classmethod
+    async def bulk_upsert(
+            cls,
+            rows: List[dict],
+            key: Optional[tuple] = None,
+            update_fields: Optional[List[str]] = None,
+            chunk_size: int = 500,
+            skip_unchanged: bool = True,
+            hash_exclude: tuple = (),
+    ) -> Dict[str, int]:
+        """
+        批量 upsert：
+        - 按唯一键去重（后出现的覆盖前面的），每 chunk_size 行一条多行 INSERT ... ON CONFLICT DO UPDATE
+          （语句只编译一次，executemany + insertmanyvalues 分页拼成多行 VALUES）
+        - skip_unchanged：模型有 content_hash 列时，行内容哈希随行写入，
+          DO UPDATE ... WHERE 在库内比对，哈希相同的行不更新（哈希与数据同事务提交，不会漂移）
+        - 所有 chunk 在同一事务内，结束时提交一次（处于 unit_of_work 中则交给外层提交）
+        返回 {"rows", "written", "skipped", "chunks"}
+        """
+        key = tuple(key or cls.__upsert_key__)
+        if not key:
+            raise ValueError(f"{cls.__name__} 未声明 __upsert_key__")
+
+        table = cls.__table__
+        names = set(table.c.keys())
+        staged: Dict[str, dict] = {}
+        for row in rows:
+            row = {k: v for k, v in row.items() if k in names}
+            if any(row.get(k) is None for k in key):
+                continue
+            staged["|".join(str(row[k]) for k in key)] = row
+
+        stats = {"rows": len(staged), "written": 0, "skipped": 0, "chunks": 0}
+        if not staged:
+            return stats
+
+        # 🔍 内容哈希（不含哈希列本身与 hash_exclude 中的易变字段）
+        only_changed = skip_unchanged and CONTENT_HASH_COLUMN in names
+        pending = list(staged.values())
+        if only_changed:
+            if update_fields is not None and CONTENT_HASH_COLUMN not in update_fields:
+                update_fields = [*update_fields, CONTENT_HASH_COLUMN]
+            for row in pending:
+                row.pop(CONTENT_HASH_COLUMN, None)
+                row[CONTENT_HASH_COLUMN] = _row_hash(row, hash_exclude)
+
+        # 列集合相同的行才能放进同一条多行 VALUES
+        groups: Dict[tuple, List[dict]] = {}
+        for row in pending:
+            groups.setdefault(tuple(sorted(row)), []).append(row)
+
+        size = max(1, min(chunk_size, BULK_MAX_PARAMS // len(table.columns)))
+        async with unit_of_work() as session:
+            dialect = session.get_bind().dialect.name
+            for columns, group in groups.items():
+                if dialect in UPSERT_DIALECTS:
+                    # RETURNING 才会走 insertmanyvalues（每页一条多行语句）
+                    stmt = cls._upsert_stmt(
+                        dialect, key, list(columns), update_fields, target=table, only_changed=only_changed
+                    )
+                    result = await session.execute(
+                        stmt.returning(table.c.id),
+                        group,
+                        execution_options={"insertmanyvalues_page_size": size},
+                    )
+                    written = len(result.all())
+                else:
+                    for row in group:
+                        await cls.upsert(where={k: row[k] for k in key}, data=row)
+                    written = len(group)
+                stats["chunks"] += -(-len(group) // size)
+                stats["written"] += written
+                stats["skipped"] += len(group) - written
+        return stats
+
     # ======================================================
     # ✏️ 更新当前实例
     # ======================================================
     async def update(self: T, commit: bool = False, **data: Any) -> T:
-        async with async_session_factory() as session:
+        async with _session_scope() as (session, shared):
             for k, v in data.items():
                 if hasattr(self, k):
                     setattr(self, k, v)
             session.add(self)
             await session.flush()
             if commit:
-                await session.commit()
+                if not shared:
+                    await session.commit()
                 await session.refresh(self)
             return self
 
@@ -283,9 +706,11 @@ class BaseCrud(BaseModel):
     # ❌ 删除当前实例
     # ======================================================
     async def delete(self: T, commit: bool = False) -> None:
-        async with async_session_factory() as session:
+        async with _session_scope() as (session, shared):
             await session.delete(self)
-            if commit:
+            if shared:
+                await session.flush()
+            elif commit:
                 await session.commit()
 
     # ======================================================
@@ -308,6 +733,7 @@ class BaseCrud(BaseModel):
         ✅ 传入关键字与字段列表，返回匹配结果
         ✅ 可同时叠加等值过滤条件
         ✅ 自动识别 PostgreSQL / SQLite 的 ilike / like
+        ✅ 模型声明 __search_fields__ 时走全文索引（子串匹配 + 相关度排序）
         ✅ 内部自动处理排序与 limit
         -------------------------------------------------
         用法示例：
@@ -317,12 +743,10 @@ class BaseCrud(BaseModel):
                 limit=10
             )
         """
-        from sqlalchemy import or_
-
         if not keyword or not fields:
             return []
 
-        async with async_session_factory() as session:
+        async with _session_scope() as (session, shared):
             stmt = select(cls)
 
             # 🔹 等值过滤
@@ -331,22 +755,30 @@ class BaseCrud(BaseModel):
                     if hasattr(cls, k) and v is not None:
                         stmt = stmt.where(getattr(cls, k) == v)
 
-            # 🔹 多字段模糊匹配
-            like_pattern = f"%{keyword}%"
-            conditions = []
-            for f in fields:
-                if not hasattr(cls, f):
-                    continue
-                col = getattr(cls, f)
-                if hasattr(col, "ilike"):  # PostgreSQL
-                    conditions.append(col.ilike(like_pattern))
-                else:  # SQLite / MySQL
-                    conditions.append(col.like(like_pattern))
-            if conditions:
-                stmt = stmt.where(or_(*conditions))
+            # 🔹 全文索引（模型声明了 __search_fields__ 且字段一致）
+            hits = cls._search_hits(session, keyword, fields)
+            if hits is not None:
+                stmt = stmt.join(hits, hits.c.id == cls.id)
 
-            # 🔹 排序
-            if order_by and hasattr(cls, order_by):
+            # 🔹 多字段模糊匹配
+            else:
+                like_pattern = f"%{keyword}%"
+                conditions = []
+                for f in fields:
+                    if not hasattr(cls, f):
+                        continue
+                    col = getattr(cls, f)
+                    if hasattr(col, "ilike"):  # PostgreSQL
+                        conditions.append(col.ilike(like_pattern))
+                    else:  # SQLite / MySQL
+                        conditions.append(col.like(like_pattern))
+                if conditions:
+                    stmt = stmt.where(or_(*conditions))
+
+            # 🔹 排序（全文检索默认按相关度）
+            if hits is not None and order_by in (None, "rank"):
+                stmt = stmt.order_by(desc(hits.c.rank), desc(cls.id))
+            elif order_by and hasattr(cls, order_by):
                 order_col = getattr(cls, order_by)
                 stmt = stmt.order_by(
                     desc(order_col) if sort.lower() == "desc" else asc(order_col)
@@ -382,14 +814,15 @@ class InfoCrud(BaseCrud):
     is_deleted = Column(Boolean, nullable=False, default=False)
 
     async def soft_delete(self: T, commit: bool = False) -> T:
-        async with async_session_factory() as session:
+        async with _session_scope() as (session, shared):
             self.is_deleted = True
             self.delete_time = datetime.utcnow()
             session.add(self)
             await session.flush()
 
             if commit:
-                await session.commit()
+                if not shared:
+                    await session.commit()
                 await session.refresh(self)
 
             return self
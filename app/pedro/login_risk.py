@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+Pedro-Core 登录风控记录器（异步批量版）
+---------------------------------------------
+✅ 请求路径只做内存比较：指纹（IP + UA）与本进程上次所见一致则直接跳过
+✅ 指纹变化才入队，后台任务定时批量 flush
+✅ flush 使用两轮 pipeline：LRANGE/EXISTS 读取 → LPUSH/LTRIM 写入
+✅ 请求永远不等待风控写入；写入失败的一批放回队列，下一轮重试
+"""
+
+import asyncio
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from app.extension.redis.redis_client import rds
+
+
+class LoginRiskRecorder:
+    """verify 使用的变更触发式风控记录器"""
+
+    def __init__(
+            self,
+            maxsize: int = 50000,
+            flush_interval: float = 1.0,
+            batch_size: int = 500,
+            max_pending: int = 10000,
+            keep_devices: int = 5,
+    ):
+        self.maxsize = maxsize
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.keep_devices = keep_devices
+
+        # uid -> 最近一次见到的指纹
+        self._last_seen: "OrderedDict[int, str]" = OrderedDict()
+        # (uid, fingerprint) -> ip
+        self._pending: Dict[Tuple[int, str], str] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.dropped = 0
+
+    # ------------------------------------------------------
+    # 🧩 请求路径（同步、无 IO）
+    # ------------------------------------------------------
+    def observe(self, uid: int, fingerprint: str, ip: str) -> None:
+        if self._last_seen.get(uid) == fingerprint:
+            self._last_seen.move_to_end(uid)
+            return
+
+        self._last_seen[uid] = fingerprint
+        self._last_seen.move_to_end(uid)
+        while len(self._last_seen) > self.maxsize:
+            self._last_seen.popitem(last=False)
+
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return
+
+        self._pending[(uid, fingerprint)] = ip
+        self._ensure_task()
+
+    def _ensure_task(self) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._task = loop.create_task(self._run())
+
+    # ------------------------------------------------------
+    # 🔁 后台 flush
+    # ------------------------------------------------------
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"⚠️ 登录风控批量写入失败: {e}")
+
+    async def flush(self) -> None:
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, {}
+        items = list(batch.items())
+
+        i = 0
+        try:
+            r = await rds.instance()
+            for i in range(0, len(items), self.batch_size):
+                chunk = items[i:i + self.batch_size]
+
+                pipe = r.pipeline(transaction=False)
+                for (uid, fingerprint), _ in chunk:
+                    pipe.lrange(f"user:devices:{uid}", 0, -1)
+                    pipe.exists(f"user:trusted:{uid}:{fingerprint}")
+                results = await pipe.execute()
+
+                pipe = r.pipeline(transaction=False)
+                writes = 0
+                for idx, ((uid, fingerprint), ip) in enumerate(chunk):
+                    existing = results[idx * 2] or []
+                    trusted = results[idx * 2 + 1]
+                    existing = [v.decode() if isinstance(v, bytes) else v for v in existing]
+                    if fingerprint in existing:
+                        continue
+
+                    key = f"user:devices:{uid}"
+                    pipe.lpush(key, fingerprint)
+                    pipe.ltrim(key, 0, self.keep_devices - 1)
+                    writes += 1
+
+                    if not trusted:
+                        print(f"⚠️ 风险提示: 用户 {uid} 新设备登录, IP={ip}")
+
+                if writes:
+                    await pipe.execute()
+        except Exception:
+            self._requeue(items[i:])
+            raise
+
+    def _requeue(self, items: List[Tuple[Tuple[int, str], str]]) -> None:
+        """写入失败：未写完的条目放回待写队列（flush 期间新入队的优先保留，超出 max_pending 的计入 dropped）"""
+        dropped = 0
+        for key, ip in items:
+            if key in self._pending:
+                continue
+            if len(self._pending) >= self.max_pending:
+                dropped += 1
+                continue
+            self._pending[key] = ip
+        if dropped:
+            self.dropped += dropped
+            print(f"⚠️ 登录风控队列已满，丢弃 {dropped} 条待写记录")
+
+    async def close(self) -> None:
+        """停止后台任务并把剩余队列写完（应用关闭时由 LoginRiskService 调用）"""
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        await self.flush()
+
+
+login_risk = LoginRiskRecorder()
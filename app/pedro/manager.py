@@ -6,7 +6,7 @@ Pedro-Core Manager (FastAPI版)
 ✅ 异步查询与权限同步
 ✅ 自动挂载到 app.state.manager
 ✅ 保留 meta / plugin / model / services 管理接口
-✅ 支持权限检查 (is_user_allowed)
+✅ 支持权限检查 (is_user_allowed，基于权限快照，不访问数据库)
 """
 
 import asyncio
@@ -19,6 +19,7 @@ from app.pedro.exception import AuthFailed, NotFound
 from app.pedro.model import (User, UserGroup,Group,
                              UserIdentity, Permission,
                              GroupPermission)
+from app.pedro.permission_snapshot import permission_snapshot
 
 
 class Manager:
@@ -45,6 +46,7 @@ class Manager:
         self.user_group_model = UserGroup
 
         self.loader: Loader = Loader(self.plugin_path)
+        self.permissions = permission_snapshot
         print("✅ Pedro-Core Manager 已初始化")
 
     # -------------------------------------------------------
@@ -111,17 +113,8 @@ class Manager:
         if not meta:
             return False
 
-        group_ids = await self.find_group_ids_by_user_id(session, user_id)
-        GP, P = self.group_permission_model, self.permission_model
-
-        subq = select(GP.permission_id).where(GP.group_id.in_(group_ids))
-        stmt = (
-            select(P)
-            .filter_by(module=meta.module, name=meta.name, mount=True)
-            .where(P.id.in_(subq))
-        )
-        result = await session.execute(stmt)
-        return bool(result.scalar_one_or_none())
+        group_ids = await self.permissions.group_ids_of(user_id)
+        return await self.permissions.is_allowed(group_ids, meta.module, meta.name)
 
     # -------------------------------------------------------
     # 🧩 插件 / 模型 / 服务注册
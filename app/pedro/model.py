@@ -27,6 +27,7 @@ from app.pedro.interface import (
 )
 from app.pedro.exception import ParameterError, NotFound, UnAuthentication
 from app.config.settings_manager import get_current_settings
+from app.pedro.user_cache import user_cache
 
 # ======================================================
 # 🧩 User Model
@@ -94,17 +95,13 @@ class User(AbstractUser, BaseModel):
         return not getattr(self, "is_deleted", False)
 
     async def is_admin(self) -> bool:
-        """异步判断是否超级管理员（安全版 + 可扩展）"""
-        from app.api.cms.model.user_group import UserGroup
-        from app.pedro.enums import GroupLevelEnum
+        """异步判断是否超级管理员（走权限快照，命中时不查库）"""
+        from app.pedro.permission_snapshot import permission_snapshot
 
-        async with async_session_factory() as session:
-            stmt = select(UserGroup.group_id).where(UserGroup.user_id == self.id)
-            result = await session.execute(stmt)
-            group_ids = [gid for gid, in result.all()]  # ✅ 一次性取出所有 group_id
+        group_ids = await permission_snapshot.group_ids_of(self.id)
 
-            # 🚀 判断是否包含 ROOT 管理员组
-            return GroupLevelEnum.ROOT.value in group_ids
+        # 🚀 判断是否包含 ROOT 管理员组
+        return GroupLevelEnum.ROOT.value in group_ids
 
     # ======================================================
     # 🖼️ 头像拼接
@@ -213,3 +210,7 @@ class UserGroup(AbstractUserGroup, BaseModel):
 
 class UserIdentity(AbstractUserIdentity, BaseModel):
     __tablename__ = "user_identity"
+
+
+# ✅ 用户行的 ORM 更新 / 删除提交后自动清理认证用户缓存
+user_cache.watch(User)
@@ -4,6 +4,7 @@ from zoneinfo import ZoneInfo
 import hashlib
 import jwt
 from jwt import ExpiredSignatureError, InvalidTokenError
+from redis.exceptions import WatchError
 from fastapi import Depends, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy import select
@@ -14,6 +15,8 @@ from app.config.settings_manager import get_current_settings
 from app.pedro.exception import UnAuthentication, Forbidden
 from app.pedro.db import async_session_factory
 from app.pedro.manager import manager as User, manager
+from app.pedro.login_risk import login_risk
+from app.pedro.user_cache import user_cache
 from firebase_admin import auth
 
 
@@ -27,6 +30,7 @@ class JWTService:
         self.algorithm = "HS256"
         self.access_exp = self.settings.auth.access_timedelta
         self.refresh_exp = self.settings.auth.refresh_timedelta
+        self.max_sessions = 2  # 同一用户最多在线设备数
         tz_name = getattr(self.settings.app, "timezone", "UTC")
         try:
             self.timezone = ZoneInfo(tz_name)
@@ -115,7 +119,7 @@ class JWTService:
     # 🧩 创建 Token（含 version + fingerprint）
     # ======================================================
     async def create_pair(self, user: User) -> Dict[str, Union[str, List[str]]]:
-        """根据用户身份自动生成 Access / Refresh Token（最多 2 个在线）"""
+        """根据用户身份自动生成 Access / Refresh Token（最多 max_sessions 个在线）"""
         now = datetime.now(self.timezone)
         scopes = ["admin"] if await user.is_admin() else ["user"]
 
@@ -161,28 +165,8 @@ class JWTService:
         access_token = jwt.encode(access_payload, self.secret, algorithm=self.algorithm)
         refresh_token = jwt.encode(refresh_payload, self.secret, algorithm=self.algorithm)
 
-        # ✅ Redis Key 模式
-        access_key = f"token:{user.id}:access:{access_token}"
-        refresh_key = f"token:{user.id}:refresh:{refresh_token}"
-
-        # ✅ 检查现有 token 数量
-        access_keys = await r.keys(f"token:{user.id}:access:*")
-
-        if len(access_keys) >= 2:
-            tokens_with_ttl = []
-            for key in access_keys:
-                ttl = await r.ttl(key)
-                tokens_with_ttl.append((key, ttl if ttl > 0 else 0))
-
-            # 按 TTL 从低到高排序 → 清掉最老的设备
-            tokens_with_ttl.sort(key=lambda x: x[1])
-            old_key = tokens_with_ttl[0][0]
-            await r.delete(old_key)
-            print(f"🧹 已清理旧 access token：{old_key}")
-
-        # ✅ 存入 Redis（200 = 有效）
-        await r.setex(access_key, int(self.access_exp.total_seconds()), "200")
-        await r.setex(refresh_key, int(self.refresh_exp.total_seconds()), "200")
+        # ✅ 写入 Redis + 用户索引（超出在线上限时踢掉最老的设备）
+        await self._store_pair(r, user.id, access_token, refresh_token, now.timestamp())
 
         return {
             "access_token": access_token,
@@ -190,6 +174,59 @@ class JWTService:
             "scopes": scopes,
         }
 
+    async def _store_pair(self, r, uid: int, access_token: str, refresh_token: str, now_ts: float) -> List[str]:
+        """
+        登记一对 Token，返回被踢下线的 access token
+        - 读在线数 → 踢人 → 写入 放在同一个 WATCH/MULTI 事务里：
+          并发登录时只有一个事务成功，其余重读后重试，在线数不会超过 max_sessions
+        - 被踢设备的 refresh token 一并删除（token:{uid}:index:pairs 记录 access → refresh）
+        """
+        access_index = self.token_index_key(uid, "access")
+        refresh_index = self.token_index_key(uid, "refresh")
+        pairs_key = self.token_index_key(uid, "pairs")
+        access_ttl = int(self.access_exp.total_seconds())
+        refresh_ttl = int(self.refresh_exp.total_seconds())
+
+        async with r.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    await pipe.watch(access_index)
+                    # 按过期时间升序：已过期的只清索引，在线的超出上限时从最老的开始踢
+                    expired = await pipe.zrangebyscore(access_index, "-inf", now_ts)
+                    live = await pipe.zrangebyscore(access_index, f"({now_ts}", "+inf")
+                    evicted = live[:max(len(live) - (self.max_sessions - 1), 0)]
+                    paired = await pipe.hmget(pairs_key, evicted) if evicted else []
+
+                    pipe.multi()
+                    pipe.zremrangebyscore(access_index, "-inf", now_ts)
+                    pipe.zremrangebyscore(refresh_index, "-inf", now_ts)
+                    if expired or evicted:
+                        pipe.hdel(pairs_key, *expired, *evicted)
+                    for old_access, old_refresh in zip(evicted, paired):
+                        pipe.unlink(f"token:{uid}:access:{old_access}")
+                        pipe.zrem(access_index, old_access)
+                        if old_refresh:
+                            pipe.unlink(f"token:{uid}:refresh:{old_refresh}")
+                            pipe.zrem(refresh_index, old_refresh)
+
+                    # ✅ 存入 Redis（200 = 有效）+ 写入索引（score = 过期时间）
+                    pipe.setex(f"token:{uid}:access:{access_token}", access_ttl, "200")
+                    pipe.setex(f"token:{uid}:refresh:{refresh_token}", refresh_ttl, "200")
+                    pipe.zadd(access_index, {access_token: now_ts + access_ttl})
+                    pipe.zadd(refresh_index, {refresh_token: now_ts + refresh_ttl})
+                    pipe.hset(pairs_key, access_token, refresh_token)
+                    pipe.expire(access_index, access_ttl)
+                    pipe.expire(refresh_index, refresh_ttl)
+                    pipe.expire(pairs_key, refresh_ttl)
+                    await pipe.execute()
+                    break
+                except WatchError:
+                    continue  # 其它登录先提交 → 重读在线列表
+
+        for old_access in evicted:
+            print(f"🧹 已清理旧设备 token：token:{uid}:access:{old_access}")
+        return evicted
+
     # ------------------------------------------------------
     # 🧩 生成新的 Token
     # ------------------------------------------------------
@@ -223,12 +260,11 @@ class JWTService:
         # 3️⃣ 检查 Redis 令牌是否还有效（防止伪造）
         r = await rds.instance()
         redis_key = f"token:{uid}:refresh:{refresh_token}"
-        exists = await r.get(redis_key)
+        exists, redis_version = await r.mget(redis_key, f"user:{uid}:version")
         if not exists:
             raise UnAuthentication("Refresh Token 已失效，请重新登录")
 
         # 4️⃣ 检查 Token 版本是否一致（后台强制下线机制）
-        redis_version = await r.get(f"user:{uid}:version")
         if str(redis_version) != str(version):
             raise UnAuthentication("登录状态已变更，请重新登录")
 
@@ -236,7 +272,10 @@ class JWTService:
         new = await self.create_pair(user)
 
         # 🧹 删除旧 Refresh Token（Token Rotation 安全策略）
-        await r.delete(redis_key)
+        pipe = r.pipeline(transaction=False)
+        pipe.delete(redis_key)
+        pipe.zrem(self.token_index_key(uid, "refresh"), refresh_token)
+        await pipe.execute()
 
         return new
 
@@ -267,35 +306,25 @@ class JWTService:
 
         r = await rds.instance()
 
-        # ✅ 兼容 access / refresh 前缀查找
-        access_key = f"token:{uid}:access:{token}"
-        refresh_key = f"token:{uid}:refresh:{token}"
-
-        status_value = await r.get(access_key)
-        if not status_value:
-            status_value = await r.get(refresh_key)
+        # ✅ 一次 MGET 取回 access / refresh 状态、版本号、设备锁（单次 RTT）
+        access_value, refresh_value, redis_ver, raw = await r.mget(
+            f"token:{uid}:access:{token}",
+            f"token:{uid}:refresh:{token}",
+            f"user:{uid}:version",
+            f"user:{uid}:device_lock",
+        )
 
+        # ✅ 兼容 access / refresh 前缀查找
+        status_value = access_value or refresh_value
         if status_value != "200":
             raise UnAuthentication("Token 已失效或被撤销")
 
         # ✅ 版本号校验
-        redis_ver = await r.get(f"user:{uid}:version")
         if redis_ver and int(redis_ver) != ver:
             raise UnAuthentication("Token 已失效（版本不匹配）")
 
         # ✅ 用户是否要求设备锁
-        # ✅ 读取设备锁开关
-        raw = await r.get(f"user:{uid}:device_lock")
-        require_lock = raw == b"1"
-
-        if require_lock:
-            token_fp = payload.get("fp")
-            ua = request.headers.get("User-Agent", "")
-            ip = request.client.host
-            current_fp = self.make_fingerprint(ua, ip)
-
-            if token_fp != current_fp:
-                raise UnAuthentication("⚠️ 设备变更，需要验证设备")
+        require_lock = raw == "1"
 
         if require_lock:
             token_fp = payload.get("fp")
@@ -312,11 +341,8 @@ class JWTService:
             ua = request.headers.get("User-Agent", "")
             fingerprint = self.make_fingerprint(ua, ip)
 
-            # 调用登录风控（不会报错，只做通知）
-            try:
-                await self.check_login_risk(uid, fingerprint, ip)
-            except Exception as e:
-                print("⚠️ 登录风控检测异常: ", e)
+            # 仅指纹变化时入队，由后台批量写入（不阻塞请求）
+            login_risk.observe(uid, fingerprint, ip)
 
         # ✅ 权限校验
         if required_scopes:
@@ -342,17 +368,77 @@ class JWTService:
 
     async def revoke_all(self, uid: int) -> Dict[str, str]:
         r = await rds.instance()
-        keys = await r.keys(f"token:{uid}:*")
-        for k in keys:
-            await r.setex(k, 3600, "403")
+        access_index = self.token_index_key(uid, "access")
+        refresh_index = self.token_index_key(uid, "refresh")
+
+        pipe = r.pipeline(transaction=False)
+        pipe.zrange(access_index, 0, -1)
+        pipe.zrange(refresh_index, 0, -1)
+        access_tokens, refresh_tokens = await pipe.execute()
+
+        keys = [f"token:{uid}:access:{t}" for t in access_tokens]
+        keys += [f"token:{uid}:refresh:{t}" for t in refresh_tokens]
+        keys += [access_index, refresh_index, self.token_index_key(uid, "pairs")]
+        await r.unlink(*keys)
         return {"msg": "用户所有 Token 已失效"}
 
+    # ======================================================
+    # 🗂️ 用户 Token 索引（ZSET，score = 过期时间戳）
+    # ======================================================
+    @staticmethod
+    def token_index_key(uid: int, kind: str) -> str:
+        return f"token:{uid}:index:{kind}"
+
+    async def migrate_token_index(self, batch: int = 1000) -> int:
+        """
+        一次性迁移：用 SCAN 把旧版本签发的 token key 补录进用户索引
+        （仅部署切换时执行，见 app/cli/scripts/migrate_token_index.py）
+        旧 token 没有 access → refresh 配对记录：被踢下线时只删 access，refresh 到期自然失效
+        """
+        r = await rds.instance()
+        now_ts = datetime.now(self.timezone).timestamp()
+        migrated = 0
+
+        for kind in ("access", "refresh"):
+            keys = []
+            async for key in r.scan_iter(match=f"token:*:{kind}:*", count=batch):
+                keys.append(key)
+                if len(keys) >= batch:
+                    migrated += await self._index_keys(r, kind, keys, now_ts)
+                    keys = []
+            if keys:
+                migrated += await self._index_keys(r, kind, keys, now_ts)
+
+        return migrated
+
+    async def _index_keys(self, r, kind: str, keys: List[str], now_ts: float) -> int:
+        pipe = r.pipeline(transaction=False)
+        for key in keys:
+            pipe.ttl(key)
+        ttls = await pipe.execute()
+
+        index_ttl = int(self.refresh_exp.total_seconds())
+        pipe = r.pipeline(transaction=False)
+        count = 0
+        for key, ttl in zip(keys, ttls):
+            _, uid, _, token = key.split(":", 3)
+            if not uid.isdigit() or ttl is None or ttl <= 0:
+                continue
+            index_key = self.token_index_key(int(uid), kind)
+            pipe.zadd(index_key, {token: now_ts + ttl})
+            pipe.expire(index_key, index_ttl)
+            count += 1
+        if count:
+            await pipe.execute()
+        return count
+
     # ======================================================
     # 🚀 版本号控制（强制登出）
     # ======================================================
     async def bump_version(self, uid: int) -> Dict[str, str]:
         r = await rds.instance()
         new_ver = await r.incr(f"user:{uid}:version")
+        await user_cache.invalidate(uid)
         return {"msg": f"用户 {uid} Token 版本号已更新为 {new_ver}，旧 Token 全部失效"}
 
 
@@ -374,11 +460,18 @@ async def get_current_user(
     payload = await jwt_service.verify(credentials.credentials, request=request)
 
     uid = payload.get("uid")
+    ver = int(payload.get("ver", 0))
+
+    # ✅ 先查缓存（按 token 版本号隔离），未命中再查库
+    user = await user_cache.get(manager.user_model, uid, ver)
+    if user is not None:
+        return user
 
     async with async_session_factory() as session:
         user = await manager.find_user(session=session, id=uid)
         if not user or user.is_deleted:
             raise UnAuthentication("用户不存在或已被停用")
+        await user_cache.set(user, ver)
         return user
 
 
@@ -408,12 +501,18 @@ async def optional_login(request: Request) -> Optional[User]:
         uid = payload.get("uid")
         if not uid:
             return None
+        ver = int(payload.get("ver", 0))
+
+        user = await user_cache.get(manager.user_model, uid, ver)
+        if user is not None:
+            return user
 
         # ✅ 异步获取用户信息
         async with async_session_factory() as session:
             user = await manager.find_user(session=session, id=uid)
             if not user or user.is_deleted:
                 return None
+            await user_cache.set(user, ver)
             return user
 
     except Exception as e:
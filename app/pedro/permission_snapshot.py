@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+Pedro-Core 权限快照
+---------------------------------------------
+✅ group_id -> frozenset((module, name)) 全量映射（仅 mount=True 的权限）
+✅ user_id  -> frozenset(group_id) 按需加载（LRU）
+✅ 懒加载 + TTL，过期后整体重建
+✅ UserGroup / GroupPermission / Permission / Group 提交后自动失效，
+   并通过 Redis pub/sub 通知其它 worker（见 PermissionSyncService）
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Iterable, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app.extension.redis.redis_client import rds
+from app.pedro.db import async_session_factory
+from app.pedro.interface import (
+    AbstractGroup,
+    AbstractGroupPermission,
+    AbstractPermission,
+    AbstractUserGroup,
+)
+from app.pedro.model import Group, GroupPermission, Permission, User, UserGroup
+
+PermissionKey = Tuple[str, str]  # (module, name)
+
+_WATCHED = (AbstractUserGroup, AbstractGroupPermission, AbstractPermission, AbstractGroup)
+_SESSION_FLAG = "pedro_permissions_changed"
+
+
+class PermissionSnapshot:
+    """Manager.is_user_allowed / User.is_admin 使用的编译权限快照"""
+
+    channel = "pedro:permissions:changed"
+
+    def __init__(self, ttl: int = 60, max_users: int = 50000):
+        self.ttl = ttl
+        self.max_users = max_users
+        self._generation = 0
+        self._expires_at = 0.0
+        self._group_permissions: Dict[int, FrozenSet[PermissionKey]] | None = None
+        self._user_groups: "OrderedDict[int, FrozenSet[int]]" = OrderedDict()
+
+    # ------------------------------------------------------
+    # 🔍 查询
+    # ------------------------------------------------------
+    async def group_ids_of(self, user_id: int) -> FrozenSet[int]:
+        self._check_ttl()
+        cached = self._user_groups.get(user_id)
+        if cached is not None:
+            self._user_groups.move_to_end(user_id)
+            return cached
+
+        generation = self._generation
+        group_ids = await self._load_user_groups(user_id)
+        if generation == self._generation:
+            self._user_groups[user_id] = group_ids
+            while len(self._user_groups) > self.max_users:
+                self._user_groups.popitem(last=False)
+        return group_ids
+
+    async def group_permissions(self) -> Dict[int, FrozenSet[PermissionKey]]:
+        self._check_ttl()
+        if self._group_permissions is not None:
+            return self._group_permissions
+
+        generation = self._generation
+        data = await self._load_group_permissions()
+        if generation == self._generation:
+            self._group_permissions = data
+        return data
+
+    async def is_allowed(self, group_ids: Iterable[int], module: str, name: str) -> bool:
+        mapping = await self.group_permissions()
+        key = (module, name)
+        return any(key in mapping.get(gid, ()) for gid in group_ids)
+
+    # ------------------------------------------------------
+    # 🗃️ 加载
+    # ------------------------------------------------------
+    @staticmethod
+    async def _load_user_groups(user_id: int) -> FrozenSet[int]:
+        stmt = (
+            select(UserGroup.group_id)
+            .join(Group, Group.id == UserGroup.group_id)
+            .join(User, User.id == UserGroup.user_id)
+            .where(User.is_deleted == False, User.id == user_id)
+        )
+        async with async_session_factory() as session:
+            result = await session.execute(stmt)
+            return frozenset(gid for gid, in result.all())
+
+    @staticmethod
+    async def _load_group_permissions() -> Dict[int, FrozenSet[PermissionKey]]:
+        stmt = (
+            select(GroupPermission.group_id, Permission.module, Permission.name)
+            .join(Permission, Permission.id == GroupPermission.permission_id)
+            .where(Permission.mount == True)
+        )
+        async with async_session_factory() as session:
+            result = await session.execute(stmt)
+            mapping: Dict[int, set] = {}
+            for group_id, module, name in result.all():
+                mapping.setdefault(group_id, set()).add((module, name))
+        return {gid: frozenset(keys) for gid, keys in mapping.items()}
+
+    # ------------------------------------------------------
+    # 🧹 失效
+    # ------------------------------------------------------
+    def _check_ttl(self) -> None:
+        if time.monotonic() >= self._expires_at:
+            self.invalidate()
+
+    def invalidate(self) -> None:
+        self._generation += 1
+        self._expires_at = time.monotonic() + self.ttl
+        self._group_permissions = None
+        self._user_groups.clear()
+
+    async def publish(self) -> None:
+        """通知所有 worker 丢弃本地快照"""
+        try:
+            r = await rds.instance()
+            await r.publish(self.channel, "1")
+        except Exception as e:
+            print(f"⚠️ 权限变更广播失败: {e}")
+
+    def changed(self) -> None:
+        """本地立即失效 + 异步广播"""
+        self.invalidate()
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        loop.create_task(self.publish())
+
+
+permission_snapshot = PermissionSnapshot()
+
+
+# ======================================================
+# 🔔 ORM 事件：权限相关表提交后失效快照
+# ======================================================
+def _mark_changed(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is not None:
+        session.info[_SESSION_FLAG] = True
+
+
+for _cls in _WATCHED:
+    for _evt in ("after_insert", "after_update", "after_delete"):
+        event.listen(_cls, _evt, _mark_changed, propagate=True)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _mark_bulk_changed(state):
+    if not (state.is_insert or state.is_update or state.is_delete):
+        return
+    mapper = state.bind_mapper
+    if mapper is not None and issubclass(mapper.class_, _WATCHED):
+        state.session.info[_SESSION_FLAG] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _flush_changed(session):
+    if session.info.pop(_SESSION_FLAG, False):
+        permission_snapshot.changed()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed(session):
+    session.info.pop(_SESSION_FLAG, None)
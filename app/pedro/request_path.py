@@ -1,66 +1,48 @@
-import json
-from starlette.types import ASGIApp, Receive, Scope, Send
+from contextvars import ContextVar
+from typing import Optional
 
-class InjectRequestPathMiddleware:
-    def __init__(self, app: ASGIApp):
-        self.app = app
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
 
-    async def __call__(self, scope: Scope, receive: Receive, send: Send):
-        if scope["type"] != "http":
-            return await self.app(scope, receive, send)
+# 当前请求路径（由 InjectRequestPathMiddleware 写入，PedroJSONResponse 渲染时读取）
+request_path_ctx: ContextVar[Optional[str]] = ContextVar("pedro_request_path", default=None)
+# 当前请求语言（Accept-Language 首选项的主语言，如 zh / en；PedroJSONResponse 翻译 msg 时读取）
+request_lang_ctx: ContextVar[Optional[str]] = ContextVar("pedro_request_lang", default=None)
 
-        request_path = scope["path"]
-        status = None
-        headers = None
-        body_chunks = []
 
-        async def send_wrapper(message):
-            nonlocal status, headers
+def get_request_path() -> Optional[str]:
+    return request_path_ctx.get()
 
-            # Capture headers and status
-            if message["type"] == "http.response.start":
-                status = message["status"]
-                headers = message.get("headers", [])
-                return  # DO NOT send yet
 
-            # Capture body chunks
-            if message["type"] == "http.response.body":
-                chunk = message.get("body", b"")
-                if chunk:
-                    body_chunks.append(chunk)
+def get_request_lang() -> Optional[str]:
+    return request_lang_ctx.get()
 
-                # If this is the last chunk, rewrite response
-                if not message.get("more_body", False):
-                    body = b"".join(body_chunks)
 
-                    try:
-                        data = json.loads(body)
-                        if isinstance(data, dict) and "request" in data:
-                            data["request"] = request_path
-                            body = json.dumps(data).encode()
-                    except:
-                        pass  # not json, return raw
+def parse_accept_language(header: Optional[str]) -> Optional[str]:
+    """zh-CN,ja;q=0.9 → zh；未携带时返回 None（不翻译）"""
+    if not header:
+        return None
+    lang = header.split(",")[0].split(";")[0].strip().lower()
+    return lang.replace("_", "-").split("-")[0] or None
 
-                    # Rewrite headers: remove old content-length
-                    new_headers = [
-                        (k, v) for (k, v) in headers
-                        if k.lower() != b"content-length"
-                    ]
-                    new_headers.append((b"content-length", str(len(body)).encode()))
 
-                    await send({
-                        "type": "http.response.start",
-                        "status": status,
-                        "headers": new_headers,
-                    })
+class InjectRequestPathMiddleware:
+    """
+    纯 ASGI 中间件：只把请求路径 / 请求语言放进 contextvar
+    响应体不缓冲、不重新解析，流式 / 非 JSON 响应原样透传
+    """
 
-                    await send({
-                        "type": "http.response.body",
-                        "body": body,
-                        "more_body": False,
-                    })
-                return  # DON'T fall through
+    def __init__(self, app: ASGIApp):
+        self.app = app
 
-            await send(message)
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
 
-        await self.app(scope, receive, send_wrapper)
+        path_token = request_path_ctx.set(scope["path"])
+        lang_token = request_lang_ctx.set(parse_accept_language(Headers(scope=scope).get("accept-language")))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            request_lang_ctx.reset(lang_token)
+            request_path_ctx.reset(path_token)
@@ -13,14 +13,19 @@ Pedro-Core 通用响应模型（自动过滤 + ORM兼容 + 分页支持 + Decima
 
 import json
 import datetime
+import uuid
 from decimal import Decimal
+from enum import Enum
+from functools import lru_cache
 from fastapi import Request
 from typing import Any, Generic, Optional, Type, TypeVar, Iterable
 from pydantic import BaseModel, Field, ConfigDict
 from pydantic.generics import GenericModel
 from starlette.responses import JSONResponse
+from starlette.types import Receive, Scope, Send
 
 from app.extension.i18n.i18n_exception import translate_message
+from app.pedro.request_path import get_request_lang, get_request_path
 
 T = TypeVar("T")
 
@@ -32,6 +37,14 @@ try:
 except ImportError:
     DatetimeWithNanoseconds = None
 
+# =========================================================
+# 🔰 orjson 导入（已列入依赖；settings.app.json_renderer = orjson 时启用，缺失时回退 json）
+# =========================================================
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 
 # =========================================================
 # ✅ 通用序列化函数
@@ -41,12 +54,18 @@ def serialize(data: Any) -> Any:
     if DatetimeWithNanoseconds and isinstance(data, DatetimeWithNanoseconds):
         return data.isoformat()
 
-    if isinstance(data, (datetime.datetime, datetime.date)):
+    if isinstance(data, (datetime.datetime, datetime.date, datetime.time)):
         return data.isoformat()
 
     if isinstance(data, Decimal):
         return float(data)
 
+    if isinstance(data, uuid.UUID):
+        return str(data)
+
+    if isinstance(data, Enum):
+        return serialize(data.value)
+
     if isinstance(data, (bytes, bytearray)):
         return data.decode("utf-8", errors="ignore")
 
@@ -62,6 +81,9 @@ def serialize(data: Any) -> Any:
         except Exception:
             return str(data)
 
+    if hasattr(data, "_mapping"):  # SQLAlchemy Row → {列名: 值}（与 orjson_default 一致）
+        return {k: serialize(v) for k, v in data._mapping.items()}
+
     if isinstance(data, (list, tuple)):
         return [serialize(i) for i in data]
 
@@ -71,6 +93,54 @@ def serialize(data: Any) -> Any:
     return data
 
 
+# =========================================================
+# ⚡ orjson 快速通道
+# =========================================================
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS if orjson else 0
+
+
+@lru_cache()
+def orjson_enabled() -> bool:
+    """settings.app.json_renderer == "orjson" 且已安装 orjson"""
+    from app.config.settings_manager import get_current_settings
+    renderer = getattr(get_current_settings().app, "json_renderer", "json")
+    if renderer != "orjson":
+        return False
+    if orjson is None:
+        print("⚠️ json_renderer=orjson 但未安装 orjson，回退标准库 json")
+        return False
+    return True
+
+
+def orjson_default(obj: Any) -> Any:
+    """
+    orjson 无法原生编码的类型（与 serialize 输出保持一致）
+    datetime / date / time / UUID / Enum 由 orjson 原生编码，格式与 isoformat() / str() / .value 相同
+    """
+    if isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
+        return obj.isoformat()  # 含 Firestore DatetimeWithNanoseconds
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (bytes, bytearray)):
+        return obj.decode("utf-8", errors="ignore")
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    if hasattr(obj, "__table__"):  # SQLAlchemy ORM
+        return {c.key: getattr(obj, c.key) for c in obj.__table__.columns}
+    if hasattr(obj, "_mapping"):  # SQLAlchemy Row
+        return dict(obj._mapping)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def jsonable(data: Any) -> Any:
+    """orjson 模式下原样交给 render（default 钩子处理），否则走 serialize 预处理"""
+    if orjson_enabled():
+        return data
+    return serialize(data)
+
+
 # =========================================================
 # ✅ Schema 过滤工具（含 Decimal 自动兼容）
 # =========================================================
@@ -98,8 +168,30 @@ def _filter_with_schema(schema: Type[BaseModel], value: Any) -> Any:
 # ✅ Pedro JSON Response
 # =========================================================
 class PedroJSONResponse(JSONResponse):
-    """统一 JSONResponse 编码（UTF-8 + 禁止 ASCII 转义）"""
+    """
+    统一 JSONResponse 编码（UTF-8 + 禁止 ASCII 转义）
+    msg 按请求语言翻译：翻译是异步的（Redis 缓存 / 腾讯 TMT），在发送前完成并重新 render，
+    默认语言或未携带 Accept-Language 时不做任何额外工作
+    """
+
+    def __init__(self, content: Any = None, *args, lang: Optional[str] = None, **kwargs):
+        self.payload = content
+        self.lang = lang  # 显式指定（如请求上下文之外的异常处理器），否则取请求上下文
+        super().__init__(content, *args, **kwargs)
+
     def render(self, content: Any) -> bytes:
+        # ✅ 构建时直接写入请求路径（替代中间件二次解析响应体）
+        if isinstance(content, dict) and "request" in content:
+            path = get_request_path()
+            if path is not None:
+                content["request"] = path
+
+        if orjson_enabled():
+            try:
+                return orjson.dumps(content, default=orjson_default, option=ORJSON_OPTIONS)
+            except Exception:
+                content = serialize(content)  # 回退标准库（如超 64 位整数）
+
         try:
             return json.dumps(
                 content,
@@ -113,6 +205,30 @@ class PedroJSONResponse(JSONResponse):
                 ensure_ascii=False
             ).encode("utf-8")
 
+    async def translate(self) -> None:
+        """翻译 payload["msg"]，有变化时重新 render 并更新 Content-Length"""
+        lang = self.lang or get_request_lang()
+        content = self.payload
+        if not lang or not isinstance(content, dict) or not isinstance(content.get("msg"), str):
+            return
+
+        msg = content["msg"]
+        try:
+            translated = await translate_message(msg, lang)
+        except Exception as e:
+            print(f"⚠️ 响应消息翻译失败: {e}")
+            return
+        if not translated or translated == msg:
+            return
+
+        content["msg"] = translated
+        self.body = self.render(content)
+        self.headers["content-length"] = str(len(self.body))
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.translate()
+        await super().__call__(scope, receive, send)
+
 
 # =========================================================
 # ✅ PedroResponse 泛型模型（主类）
@@ -142,12 +258,9 @@ class PedroResponse(GenericModel, Generic[T]):
                 return obj.model_dump()
 
             if hasattr(obj, "__table__"):
-                return {c.key: serialize(getattr(obj, c.key)) for c in obj.__table__.columns}
+                return {c.key: jsonable(getattr(obj, c.key)) for c in obj.__table__.columns}
 
-            if isinstance(obj, (dict, list, tuple, set)):
-                return serialize(obj)
-
-            return serialize(obj)
+            return jsonable(obj)
         except Exception:
             return serialize(obj)
 
@@ -161,16 +274,10 @@ class PedroResponse(GenericModel, Generic[T]):
         msg: str = "success",
         code: int = 0,
         schema: Optional[Type[BaseModel]] = None,
-        request: Optional[Request] = None,  # ✅ 新增 request 以获取语言
+        request: Optional[Request] = None,  # 兼容旧调用；msg 由 PedroJSONResponse 按请求语言翻译
     ):
         """统一成功响应"""
         try:
-            # ✨ 自动翻译消息
-            if request:
-                lang_header = (request.headers.get("Accept-Language") or "zh").split(",")[0].strip().lower()
-                lang = lang_header.replace("_", "-").split("-")[0]
-                msg = translate_message(msg, lang)
-
             if schema is not None and data is not None:
                 data = _filter_with_schema(schema, data)
             elif isinstance(data, list):
@@ -180,7 +287,7 @@ class PedroResponse(GenericModel, Generic[T]):
 
             payload = {"code": code, "msg": msg}
             if data not in (None, [], {}):
-                payload["data"] = serialize(data)
+                payload["data"] = jsonable(data)
 
         except Exception as e:
             payload = {"code": 500, "msg": f"响应构建失败: {e}", "data": None}
@@ -196,7 +303,7 @@ class PedroResponse(GenericModel, Generic[T]):
         try:
             payload = {"code": code, "msg": msg}
             if data is not None:
-                payload["data"] = serialize(data)
+                payload["data"] = jsonable(data)
         except Exception:
             payload = {"code": 500, "msg": "错误响应构建失败", "data": None}
 
@@ -229,7 +336,7 @@ class PedroResponse(GenericModel, Generic[T]):
                 items = []
 
             data = {
-                "items": serialize(items),
+                "items": jsonable(items),
                 "total": total,
                 "page": page,
                 "size": size,
@@ -18,7 +18,7 @@ from decimal import Decimal
 from typing import Any
 from starlette.responses import JSONResponse
 from google.cloud.firestore_v1 import _helpers
-from app.pedro.response import PedroJSONResponse, serialize, PedroResponse
+from app.pedro.response import PedroJSONResponse, serialize, PedroResponse, orjson_enabled
 
 
 class PedroResponseAdapter:
@@ -112,7 +112,10 @@ class PedroResponseAdapter:
         page_items = items[start:end]
 
         # 5️⃣ 序列化 + Firestore/Decimal 兼容
-        normalized_items = [cls.normalize(serialize(i)) for i in page_items]
+        if orjson_enabled():
+            normalized_items = page_items  # 交给 PedroJSONResponse.render 编码
+        else:
+            normalized_items = [cls.normalize(serialize(i)) for i in page_items]
 
         # 6️⃣ 返回 PedroResponse.page（自动 JSON 序列化）
         return PedroResponse.page(
@@ -129,6 +132,6 @@ class PedroResponseAdapter:
     @classmethod
     def success(cls, result, msg="success"):
         """返回统一成功响应（PedroJSONResponse）"""
-        normalized = cls.normalize(serialize(result))
+        normalized = result if orjson_enabled() else cls.normalize(serialize(result))
         payload = {"code": 0, "msg": msg, "data": normalized}
         return PedroJSONResponse(content=payload)
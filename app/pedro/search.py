@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+"""
+# @Time    : 2025/11/24 10:20
+# @Author  : Pedro
+# @File    : search.py
+# @Software: PyCharm
+
+全文检索索引（替代 ILIKE '%kw%' 全表扫描）
+---------------------------------------------
+✅ 模型声明 __search_fields__ = ("title", "description", "brand") 即接入
+✅ 子串语义（与 ILIKE 一致，中文无需分词）："面膜" 能搜到 "补水面膜套装"
+✅ PostgreSQL：pg_trgm 表达式 GIN 索引（gin_trgm_ops），ILIKE '%kw%' 走索引，word_similarity 排序
+   - 不加列、不重写表；启动时 pg_try_advisory_lock 下 CREATE INDEX CONCURRENTLY IF NOT EXISTS（不锁写）
+   - 中文需数据库 LC_CTYPE 为 UTF-8 区域，否则 pg_trgm 不抽取汉字 trigram（结果仍正确，只是不走索引）
+✅ SQLite：FTS5 外部内容表（tokenize='trigram'）+ 触发器；≥3 字的词 MATCH，<3 字的词 LIKE 兜底
+✅ 同步在数据库内完成（表达式索引 / 触发器）：ORM、批量 upsert、原生 SQL 写入都不会漏
+✅ 未建索引 / 方言不支持 / 关键词没有可检索的词时，BaseCrud 回退 ILIKE
+"""
+import re
+from typing import Dict, List, Optional, Set, Type
+
+from sqlalchemy import and_, column, event, func, literal, literal_column, or_, select, table, text
+
+from app.pedro.db import BaseModel
+
+_TERM = re.compile(r"\w+", re.UNICODE)
+MAX_TERMS = 8
+# trigram 索引能直接命中的最短词长
+TRIGRAM = 3
+
+
+def search_terms(keyword: str) -> List[str]:
+    """关键词 → 检索词（只保留字母数字，避免拼出非法的查询语法）"""
+    return _TERM.findall(keyword or "")[:MAX_TERMS]
+
+
+def _like_pattern(term: str) -> str:
+    """子串匹配的 LIKE 模式（检索词只含 \\w，需转义 _）"""
+    return "%" + term.replace("\\", "\\\\").replace("_", "\\_") + "%"
+
+
+class SearchBackend:
+    """检索后端：install 建索引 + 同步机制；hits 返回命中子查询 (id, rank)，rank 越大越相关"""
+
+    # 新表随 after_create 同事务建索引；False 时只由 SearchIndex.ensure_all 安装
+    install_on_create = True
+
+    def install(self, conn, tablename: str, fields: tuple) -> bool:
+        """建索引（幂等），返回 hits 是否可用"""
+        raise NotImplementedError
+
+    async def prepare(self, engine, tablename: str, fields: tuple) -> bool:
+        """启动时的快速步骤，返回 hits 是否可用（之后即可切换到索引查询）"""
+        async with engine.begin() as conn:
+            return await conn.run_sync(self.install, tablename, fields)
+
+    async def build(self, engine, tablename: str, fields: tuple) -> None:
+        """启动时的慢步骤（如在大表上建索引），在后台执行"""
+
+    def hits(self, model, terms: List[str]):
+        raise NotImplementedError
+
+
+class PostgresSearchBackend(SearchBackend):
+    """
+    pg_trgm 表达式 GIN 索引：coalesce(f1, '') || ' ' || coalesce(f2, '') ... gin_trgm_ops
+    查询用同一表达式 ILIKE '%词%'（多个词 AND），规划器据此匹配到表达式索引
+    """
+
+    # 索引只由启动时的 build 以 CONCURRENTLY 构建，不在 create_all 事务里建
+    install_on_create = False
+    LOCK_KEY = 0x5EA2C4  # pg_try_advisory_lock 的键：多 worker 只有一个执行 DDL
+
+    @staticmethod
+    def document(fields: tuple, quote=lambda name: f'"{name}"') -> str:
+        return " || ' ' || ".join(f"coalesce({quote(f)}, '')" for f in fields)
+
+    @staticmethod
+    def index_name(tablename: str) -> str:
+        return f"ix_{tablename}_search_trgm"
+
+    def _index_state(self, conn, tablename: str) -> Optional[bool]:
+        """None = 不存在；True / False = 是否有效（CONCURRENTLY 失败会留下无效索引）"""
+        row = conn.execute(
+            text("SELECT i.indisvalid FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid "
+                 "WHERE c.relname = :n AND pg_table_is_visible(c.oid)"),
+            {"n": self.index_name(tablename)},
+        ).first()
+        return None if row is None else bool(row[0])
+
+    async def prepare(self, engine, tablename: str, fields: tuple) -> bool:
+        """
+        只需要 pg_trgm 扩展：查询是表达式 ILIKE，索引还没建好时结果一样正确（只是暂不走索引）
+        """
+        async with engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            try:
+                await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            except Exception as e:
+                # 无权限 / 多 worker 并发创建：以实际是否已安装为准
+                print(f"⚠️ pg_trgm 扩展创建失败: {e}")
+            return await conn.scalar(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")) is not None
+
+    async def build(self, engine, tablename: str, fields: tuple) -> None:
+        """
+        AUTOCOMMIT 连接上 CREATE INDEX CONCURRENTLY IF NOT EXISTS（不加列、不重写表、不阻塞写入）
+        pg_try_advisory_lock 保证多个 worker 只有一个在建，拿不到锁的直接跳过
+        """
+        async with engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            state = await conn.run_sync(self._index_state, tablename)
+            if state:
+                return
+
+            locked = await conn.scalar(text("SELECT pg_try_advisory_lock(:k)"), {"k": self.LOCK_KEY})
+            if not locked:
+                return
+            try:
+                quote = conn.dialect.identifier_preparer.quote
+                name = quote(self.index_name(tablename))
+                if state is False:
+                    # 上次 CONCURRENTLY 中断留下的无效索引：IF NOT EXISTS 会跳过它，需先删掉
+                    await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+                print(f"🔍 正在建立 {tablename} trigram 索引（CONCURRENTLY）...")
+                await conn.execute(text(
+                    f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {quote(tablename)} "
+                    f"USING GIN (({self.document(fields, quote)}) gin_trgm_ops)"
+                ))
+            finally:
+                await conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": self.LOCK_KEY})
+
+    def hits(self, model, terms: List[str]):
+        document = literal_column(self.document(tuple(model.__search_fields__)))
+        return (
+            select(
+                model.id.label("id"),
+                func.word_similarity(literal(" ".join(terms)), document).label("rank"),
+            )
+            .where(and_(*(document.ilike(_like_pattern(t), escape="\\") for t in terms)))
+            .subquery("search_hits")
+        )
+
+
+class SQLiteSearchBackend(SearchBackend):
+    """FTS5 外部内容表（trigram 分词，不重复存正文）+ 插入 / 删除 / 更新触发器"""
+
+    def install(self, conn, tablename: str, fields: tuple) -> bool:
+        fts = f"{tablename}_fts"
+        row = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :n"), {"n": fts}
+        ).first()
+
+        cols = ", ".join(fields)
+        new = ", ".join(f"new.{f}" for f in fields)
+        old = ", ".join(f"old.{f}" for f in fields)
+        statements = [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+            f"{cols}, content='{tablename}', content_rowid='id', tokenize='trigram')",
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {tablename} BEGIN "
+            f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new}); END",
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {tablename} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old}); END",
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON {tablename} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old}); "
+            f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new}); END",
+        ]
+        for statement in statements:
+            conn.execute(text(statement))
+        if row is None:
+            # 已有数据的表：一次性重建索引
+            conn.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+        return True
+
+    def hits(self, model, terms: List[str]):
+        fields = tuple(model.__search_fields__)
+        fts = f"{model.__tablename__}_fts"
+        fts_table = table(fts, column("rowid"), column(fts), *(column(f) for f in fields))
+
+        # ≥3 字：trigram MATCH（子串短语）；<3 字：trigram 无法命中，按列 LIKE 兜底
+        long_terms = [t for t in terms if len(t) >= TRIGRAM]
+        short_terms = [t for t in terms if len(t) < TRIGRAM]
+        criteria = []
+        if long_terms:
+            criteria.append(fts_table.c[fts].op("MATCH")(" ".join(f'"{t}"' for t in long_terms)))
+        for term in short_terms:
+            pattern = _like_pattern(term)
+            criteria.append(or_(*(fts_table.c[f].like(pattern, escape="\\") for f in fields)))
+
+        rank = -func.bm25(literal_column(fts)) if long_terms else literal(0)
+        return (
+            select(fts_table.c.rowid.label("id"), rank.label("rank"))
+            .where(and_(*criteria))
+            .subquery("search_hits")
+        )
+
+
+class SearchIndex:
+    """声明了 __search_fields__ 的模型登记 + 各方言后端"""
+
+    def __init__(self):
+        self.backends: Dict[str, SearchBackend] = {
+            "postgresql": PostgresSearchBackend(),
+            "sqlite": SQLiteSearchBackend(),
+        }
+        self.models: Dict[str, Type] = {}
+        self._installed: Set[str] = set()
+
+    def register_backend(self, dialect: str, backend: SearchBackend) -> None:
+        """替换 / 新增方言后端"""
+        self.backends[dialect] = backend
+
+    # ======================================================
+    # 🧩 模型钩子
+    # ======================================================
+    def _on_mapped(self, mapper, cls):
+        fields = getattr(cls, "__search_fields__", None)
+        if not fields or mapper.local_table is None:
+            return
+        self.models[mapper.local_table.name] = cls
+        event.listen(mapper.local_table, "after_create", self._after_create)
+
+    def _after_create(self, target, connection, **kw):
+        backend = self.backends.get(connection.dialect.name)
+        model = self.models.get(target.name)
+        if backend is None or model is None or not backend.install_on_create:
+            return
+        if backend.install(connection, target.name, tuple(model.__search_fields__)):
+            self._installed.add(target.name)
+
+    async def ensure_all(self, engine) -> List[str]:
+        """
+        为已存在的表补建索引（幂等），返回已就绪的表名；未就绪的表继续走 ILIKE
+        prepare 通过即切换到索引查询，随后 build（可能很慢）
+        """
+        backend = self.backends.get(engine.dialect.name)
+        if backend is None:
+            return []
+        for name, model in list(self.models.items()):
+            fields = tuple(model.__search_fields__)
+            try:
+                if not await backend.prepare(engine, name, fields):
+                    continue
+                self._installed.add(name)
+                await backend.build(engine, name, fields)
+            except Exception as e:
+                print(f"⚠️ 全文索引 {name} 建立失败: {e}")
+        return sorted(self._installed)
+
+    # ======================================================
+    # 🔍 查询
+    # ======================================================
+    def hits(self, model, keyword: Optional[str], fields, dialect: str):
+        """
+        命中子查询 (id, rank)；以下情况返回 None（调用方回退 ILIKE）：
+        模型未声明 / 索引未就绪 / 请求字段与索引字段不一致 / 方言无后端 / 关键词无可检索词
+        """
+        search_fields = getattr(model, "__search_fields__", None)
+        if (
+                not keyword
+                or not search_fields
+                or model.__tablename__ not in self._installed
+                or set(fields or ()) != set(search_fields)
+        ):
+            return None
+        backend = self.backends.get(dialect)
+        terms = search_terms(keyword)
+        if backend is None or not terms:
+            return None
+        return backend.hits(model, terms)
+
+
+search_index = SearchIndex()
+event.listen(BaseModel, "instrument_class", search_index._on_mapped, propagate=True)
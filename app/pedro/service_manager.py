@@ -4,18 +4,25 @@ Pedro-Core | 通用服务注册与动态加载模块
 ✅ 自动扫描 app/extension 下的所有服务类
 ✅ 每个服务继承 BaseService 即可自动注册
 ✅ 支持 FastAPI 生命周期自动启动与关闭
+✅ depends_on 声明依赖，按拓扑分层并发初始化（asyncio.gather）
+✅ 单服务初始化超时 + 启动耗时记录
 """
 
 import asyncio
 import inspect
 import pkgutil
 import importlib
-from typing import Dict, Type, Any
+import time
+from typing import Dict, List, Type, Any
 
 
 class BaseService:
     """所有服务模块的基类"""
     name: str = "base"
+    # 依赖的服务名（这些服务初始化成功后才会初始化本服务）
+    depends_on: tuple = ()
+    # 单个服务初始化超时（秒），None 表示不限制
+    init_timeout: float | None = 30
 
     async def init(self):
         """初始化逻辑"""
@@ -29,39 +36,145 @@ class BaseService:
 class ServiceManager:
     """统一的服务管理器"""
     _services: Dict[str, BaseService] = {}
+    # 初始化超时的服务实例：init 被取消时可能已建立连接 / 启动后台任务，关闭时同样要 close
+    _timed_out: Dict[str, BaseService] = {}
+    _init_durations: Dict[str, float] = {}
+    _waves: List[List[str]] = []
 
     # ======================================================
-    # 初始化加载
+    # 扫描服务类
     # ======================================================
-    @classmethod
-    async def init_all(cls):
-        """递归扫描 app/extension 下的服务模块"""
-        print("🔍 ServiceManager: 正在递归扫描 app/extension 下的服务模块...")
+    @staticmethod
+    def _discover(package_path: str = "app/extension", package_name: str = "app.extension") -> Dict[str, Type[BaseService]]:
+        """递归扫描服务模块，返回 name -> 服务类（同一个类被多个模块 import 时只保留一次）"""
 
-        def iter_modules_recursively(package_path, package_name):
-            for finder, name, ispkg in pkgutil.iter_modules([package_path]):
-                full_name = f"{package_name}.{name}"
+        def iter_modules_recursively(path, pkg):
+            for finder, name, ispkg in pkgutil.iter_modules([path]):
+                full_name = f"{pkg}.{name}"
                 yield full_name
                 if ispkg:
-                    subpath = f"{package_path}/{name}"
+                    subpath = f"{path}/{name}"
                     yield from iter_modules_recursively(subpath, full_name)
 
-        for module_name in iter_modules_recursively("app/extension", "app.extension"):
+        found: Dict[str, Type[BaseService]] = {}
+        for module_name in iter_modules_recursively(package_path, package_name):
             try:
                 module = importlib.import_module(module_name)
-                for attr_name in dir(module):
-                    obj = getattr(module, attr_name)
-                    if (
-                            inspect.isclass(obj)
-                            and issubclass(obj, BaseService)
-                            and obj is not BaseService
-                    ):
-                        instance = obj()
-                        await instance.init()
-                        cls._services[obj.name] = instance
-                        print(f"✅ 已加载服务: {obj.name}")
             except Exception as e:
                 print(f"⚠️ 加载服务模块失败: {module_name}, 原因: {e}")
+                continue
+
+            for attr_name in dir(module):
+                obj = getattr(module, attr_name)
+                if (
+                        inspect.isclass(obj)
+                        and issubclass(obj, BaseService)
+                        and obj is not BaseService
+                ):
+                    existing = found.get(obj.name)
+                    if existing is not None and existing is not obj:
+                        print(f"⚠️ 服务名冲突: {obj.name} ({existing.__module__} / {obj.__module__})，保留先发现的")
+                        continue
+                    found[obj.name] = obj
+        return found
+
+    @staticmethod
+    def _build_waves(classes: Dict[str, Type[BaseService]]) -> tuple[List[List[str]], Dict[str, str]]:
+        """
+        按 depends_on 拓扑分层：同一层内的服务互不依赖，可以并发初始化
+        返回 (waves, skipped)，skipped 为 name -> 原因（依赖缺失 / 循环依赖）
+        """
+        skipped: Dict[str, str] = {}
+        pending = {name: set(cls.depends_on) for name, cls in classes.items()}
+
+        # 依赖不存在的服务（以及间接依赖它们的服务）直接跳过
+        changed = True
+        while changed:
+            changed = False
+            for name, deps in list(pending.items()):
+                missing = [d for d in deps if d not in pending]
+                if missing:
+                    skipped[name] = f"依赖缺失: {', '.join(missing)}"
+                    pending.pop(name)
+                    changed = True
+
+        waves: List[List[str]] = []
+        done: set = set()
+        while pending:
+            wave = sorted(name for name, deps in pending.items() if deps <= done)
+            if not wave:
+                for name in pending:
+                    skipped[name] = "循环依赖"
+                break
+            waves.append(wave)
+            done.update(wave)
+            for name in wave:
+                pending.pop(name)
+        return waves, skipped
+
+    # ======================================================
+    # 初始化加载
+    # ======================================================
+    @classmethod
+    async def _init_one(cls, name: str, service_cls: Type[BaseService]) -> bool:
+        start = time.perf_counter()
+        try:
+            instance = service_cls()
+            await asyncio.wait_for(instance.init(), timeout=service_cls.init_timeout)
+        except asyncio.TimeoutError:
+            cls._init_durations[name] = time.perf_counter() - start
+            cls._timed_out[name] = instance
+            print(f"⏰ 服务初始化超时: {name} ({service_cls.init_timeout}s)")
+            return False
+        except Exception as e:
+            cls._init_durations[name] = time.perf_counter() - start
+            print(f"⚠️ 服务初始化失败: {name}, 原因: {e}")
+            return False
+
+        cls._init_durations[name] = time.perf_counter() - start
+        cls._services[name] = instance
+        print(f"✅ 已加载服务: {name} ({cls._init_durations[name] * 1000:.0f}ms)")
+        return True
+
+    @classmethod
+    async def init_all(cls):
+        """递归扫描 app/extension 下的服务模块，并按依赖分层并发初始化"""
+        print("🔍 ServiceManager: 正在递归扫描 app/extension 下的服务模块...")
+        started = time.perf_counter()
+
+        classes = cls._discover()
+        waves, skipped = cls._build_waves(classes)
+        for name, reason in skipped.items():
+            print(f"⏭️ 跳过服务: {name}，原因: {reason}")
+
+        failed: set = set(skipped)
+        cls._waves = []
+        for wave in waves:
+            # 上游失败的服务不再初始化
+            runnable = []
+            for name in wave:
+                broken = [d for d in classes[name].depends_on if d in failed]
+                if broken:
+                    failed.add(name)
+                    print(f"⏭️ 跳过服务: {name}，原因: 依赖初始化失败 {', '.join(broken)}")
+                else:
+                    runnable.append(name)
+            if not runnable:
+                continue
+
+            results = await asyncio.gather(*(cls._init_one(n, classes[n]) for n in runnable))
+            cls._waves.append([n for n, ok in zip(runnable, results) if ok])
+            failed.update(n for n, ok in zip(runnable, results) if not ok)
+
+        total = time.perf_counter() - started
+        slowest = sorted(cls._init_durations.items(), key=lambda kv: kv[1], reverse=True)
+        summary = ", ".join(f"{n}={d * 1000:.0f}ms" for n, d in slowest)
+        print(f"⏱️ ServiceManager: {len(cls._services)} 个服务启动完成，总耗时 {total * 1000:.0f}ms | {summary}")
+
+    @classmethod
+    def init_durations(cls) -> Dict[str, float]:
+        """各服务初始化耗时（秒）"""
+        return dict(cls._init_durations)
 
     # ======================================================
     # 获取服务
@@ -76,16 +189,34 @@ class ServiceManager:
     # ======================================================
     # 关闭所有服务
     # ======================================================
+    @classmethod
+    async def _close_one(cls, name: str, service: BaseService):
+        try:
+            await service.close()
+            print(f"🛑 已关闭服务: {name}")
+        except Exception as e:
+            print(f"⚠️ 关闭服务 {name} 失败: {e}")
+
     @classmethod
     async def close_all(cls):
-        """关闭所有服务"""
-        for name, service in cls._services.items():
-            try:
-                await service.close()
-                print(f"🛑 已关闭服务: {name}")
-            except Exception as e:
-                print(f"⚠️ 关闭服务 {name} 失败: {e}")
+        """按初始化的逆序分层并发关闭（先关依赖方，再关被依赖方）；初始化超时的服务最先关闭"""
+        if cls._timed_out:
+            timed_out, cls._timed_out = cls._timed_out, {}
+            await asyncio.gather(*(cls._close_one(n, s) for n, s in timed_out.items()))
+
+        ordered = {n for wave in cls._waves for n in wave}
+        waves = [list(w) for w in reversed(cls._waves)]
+        rest = [n for n in cls._services if n not in ordered]
+        if rest:
+            waves.insert(0, rest)
+
+        for wave in waves:
+            await asyncio.gather(*(
+                cls._close_one(n, cls._services[n]) for n in wave if n in cls._services
+            ))
+        cls._services.clear()
+        cls._waves = []
 
 
 # 单例实例
-service = ServiceManager()
\ No newline at end of file
+service = ServiceManager()
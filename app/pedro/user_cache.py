@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+Pedro-Core 认证用户缓存
+---------------------------------------------
+✅ 进程内 LRU + TTL，命中时不访问数据库
+✅ 以 token 版本号（ver）为缓存维度，bump_version 后旧缓存自动失效
+✅ 可选 Redis Hash 二级缓存（多 worker 共享）
+✅ 每次命中都重建独立的 detached ORM 对象，请求之间互不影响
+✅ watch(User)：任何经 ORM flush 的用户更新 / 删除（update、soft_delete、extra 修改…）提交后自动失效
+"""
+
+import asyncio
+import copy
+import json
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import DateTime, event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached, object_session
+
+from app.config.settings_manager import get_current_settings
+from app.extension.redis.redis_client import rds
+
+
+class UserCache:
+    """get_current_user 使用的用户缓存"""
+
+    key_prefix = "user:cache"
+
+    def __init__(self, maxsize: int = 10000, ttl: int = 30, use_redis: bool = False):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.use_redis = use_redis
+        # uid -> (ver, expire_at, row)
+        self._store: "OrderedDict[int, Tuple[int, float, Dict[str, Any]]]" = OrderedDict()
+
+    @classmethod
+    def from_settings(cls) -> "UserCache":
+        auth = get_current_settings().auth
+        return cls(
+            maxsize=auth.user_cache_size,
+            ttl=auth.user_cache_ttl,
+            use_redis=auth.user_cache_redis,
+        )
+
+    def redis_key(self, uid: int) -> str:
+        return f"{self.key_prefix}:{uid}"
+
+    # ------------------------------------------------------
+    # 🧩 行数据 <-> ORM 对象
+    # ------------------------------------------------------
+    @staticmethod
+    def _dump(user: Any) -> Dict[str, Any]:
+        return {
+            attr.key: copy.deepcopy(getattr(user, attr.key))
+            for attr in inspect(type(user)).column_attrs
+        }
+
+    @staticmethod
+    def _build(model: Any, row: Dict[str, Any]) -> Any:
+        user = model(**copy.deepcopy(row))
+        make_transient_to_detached(user)
+        return user
+
+    @staticmethod
+    def _encode(row: Dict[str, Any]) -> str:
+        def default(v):
+            if isinstance(v, (datetime, date)):
+                return v.isoformat()
+            return str(v)
+
+        return json.dumps(row, ensure_ascii=False, default=default)
+
+    @staticmethod
+    def _decode(model: Any, raw: str) -> Dict[str, Any]:
+        row = json.loads(raw)
+        for attr in inspect(model).column_attrs:
+            value = row.get(attr.key)
+            if isinstance(value, str) and isinstance(attr.columns[0].type, DateTime):
+                row[attr.key] = datetime.fromisoformat(value)
+        return row
+
+    # ------------------------------------------------------
+    # 🔍 读取
+    # ------------------------------------------------------
+    async def get(self, model: Any, uid: int, ver: int) -> Optional[Any]:
+        if self.ttl <= 0:
+            return None
+
+        entry = self._store.get(uid)
+        if entry:
+            cached_ver, expire_at, row = entry
+            if cached_ver == ver and expire_at > time.monotonic():
+                self._store.move_to_end(uid)
+                return self._build(model, row)
+            self._store.pop(uid, None)
+
+        if not self.use_redis:
+            return None
+
+        try:
+            r = await rds.instance()
+            raw = await r.hget(self.redis_key(uid), str(ver))
+        except Exception as e:
+            print(f"⚠️ 用户缓存读取失败: {e}")
+            return None
+        if not raw:
+            return None
+
+        row = self._decode(model, raw)
+        self._put(uid, ver, row)
+        return self._build(model, row)
+
+    # ------------------------------------------------------
+    # ✏️ 写入
+    # ------------------------------------------------------
+    def _put(self, uid: int, ver: int, row: Dict[str, Any]) -> None:
+        self._store[uid] = (ver, time.monotonic() + self.ttl, row)
+        self._store.move_to_end(uid)
+        while len(self._store) > self.maxsize:
+            self._store.popitem(last=False)
+
+    async def set(self, user: Any, ver: int) -> None:
+        if self.ttl <= 0:
+            return
+
+        row = self._dump(user)
+        self._put(user.id, ver, row)
+
+        if not self.use_redis:
+            return
+
+        try:
+            r = await rds.instance()
+            key = self.redis_key(user.id)
+            pipe = r.pipeline(transaction=False)
+            pipe.hset(key, str(ver), self._encode(row))
+            pipe.expire(key, self.ttl)
+            await pipe.execute()
+        except Exception as e:
+            print(f"⚠️ 用户缓存写入失败: {e}")
+
+    # ------------------------------------------------------
+    # 🧹 失效
+    # ------------------------------------------------------
+    async def invalidate(self, uid: int) -> None:
+        self._store.pop(uid, None)
+
+        if not self.use_redis:
+            return
+
+        try:
+            r = await rds.instance()
+            await r.delete(self.redis_key(uid))
+        except Exception as e:
+            print(f"⚠️ 用户缓存清理失败: {e}")
+
+    def discard(self, uid: int) -> None:
+        """同步失效（提交钩子里使用）；Redis 层在后台删除"""
+        self._store.pop(uid, None)
+        if not self.use_redis:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        loop.create_task(self.invalidate(uid))
+
+    # ------------------------------------------------------
+    # 🪝 ORM 钩子：flush 时记录变更的 uid，事务提交后统一失效
+    # ------------------------------------------------------
+    _PENDING = "user_cache_pending"
+
+    def watch(self, model: Any) -> None:
+        def _mark(mapper, connection, target):
+            session = object_session(target)
+            if session is not None and target.id is not None:
+                session.info.setdefault(self._PENDING, set()).add(target.id)
+
+        event.listen(model, "after_update", _mark, propagate=True)
+        event.listen(model, "after_delete", _mark, propagate=True)
+
+    def _after_commit(self, session: Session) -> None:
+        for uid in session.info.pop(self._PENDING, ()):
+            self.discard(uid)
+
+    def _after_rollback(self, session: Session) -> None:
+        session.info.pop(self._PENDING, None)
+
+    def clear(self) -> None:
+        self._store.clear()
+
+
+user_cache = UserCache.from_settings()
+event.listen(Session, "after_commit", user_cache._after_commit)
+event.listen(Session, "after_soft_rollback", lambda session, previous: user_cache._after_rollback(session))
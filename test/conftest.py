@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+# @Time    : 2025/11/25 09:30
+# @Author  : Pedro
+# @File    : conftest.py
+# @Software: PyCharm
+
+测试公共夹具
+---------------------------------------------
+✅ APP_ENV=test：加载 app/config/test.yaml（不依赖 Postgres / Redis / 真实 Firebase 凭据）
+✅ Firebase Admin 在 import 阶段初始化：生成一次性的假服务账号密钥供其解析（不发起网络请求）
+✅ db：每个用例独立的 SQLite 文件库，async_session_factory 临时绑定到该引擎
+✅ fake_redis：fakeredis 替换全局 rds 客户端
+✅ JSONB 在 SQLite 上按 JSON 建表（用户表的 extra 字段）
+"""
+import json
+import os
+import tempfile
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+
+def _fake_service_account() -> str:
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+    fd, path = tempfile.mkstemp(prefix="pedro-test-sa-", suffix=".json")
+    with os.fdopen(fd, "w") as f:
+        json.dump({
+            "type": "service_account",
+            "project_id": "pedro-test",
+            "private_key_id": "test",
+            "private_key": pem,
+            "client_email": "test@pedro-test.iam.gserviceaccount.com",
+            "client_id": "0",
+            "token_uri": "https://oauth2.googleapis.com/token",
+        }, f)
+    return path
+
+
+os.environ.setdefault("APP_ENV", "test")
+os.environ.setdefault("FIREBASE_SERVICE_ACCOUNT_PATH", _fake_service_account())
+
+import fakeredis
+import pytest
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.ext.compiler import compiles
+
+
+@compiles(JSONB, "sqlite")
+def _jsonb_on_sqlite(type_, compiler, **kw):
+    return "JSON"
+
+
+async def create_tables(engine, *models):
+    """按需建表（只建用例用到的表，避免整库 metadata 里的 PG 专属类型）"""
+    async with engine.begin() as conn:
+        for model in models:
+            await conn.run_sync(model.__table__.create, checkfirst=True)
+
+
+class QueryCounter:
+    """before_cursor_execute 计数（executemany 记一次）"""
+
+    def __init__(self, engine):
+        self.engine = engine.sync_engine
+        self.statements = []
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        self.statements.clear()
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+
+@pytest.fixture
+async def db(tmp_path):
+    from app.pedro.db import async_session_factory
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    previous = async_session_factory.kw.get("bind")
+    async_session_factory.configure(bind=engine)
+    yield engine
+    async_session_factory.configure(bind=previous)
+    await engine.dispose()
+
+
+@pytest.fixture
+async def fake_redis():
+    from app.extension.redis.redis_client import rds
+
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    previous = (rds.client, rds._initialized)
+    rds.client, rds._initialized = client, True
+    yield client
+    rds.client, rds._initialized = previous
+    await client.aclose()
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+Binance combined-stream：本地 websockets 服务回放 {stream, data} 帧并执行 SUBSCRIBE / UNSUBSCRIBE
+- 按 streams_per_connection 分连接，URL 带上各自的 streams
+- 订阅变更走控制消息（不重连），断线重连的 URL 带最新 streams
+"""
+import asyncio
+import json
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+import websockets
+
+from app.extension.stream import binance
+from app.extension.stream.binance import BinanceCombinedStream, KlineHub, MarketState
+
+
+def kline_frame(name: str) -> str:
+    symbol, interval = name.split("@kline_")
+    return json.dumps({
+        "stream": name,
+        "data": {"e": "kline", "k": {
+            "s": symbol.upper(), "i": interval, "o": "1", "h": "2", "l": "0.5", "c": "1.5",
+            "v": "10", "n": 3, "t": 1700000000000, "x": True,
+        }},
+    })
+
+
+class ReplayServer:
+    """按连接维护 streams，连接建立 / SUBSCRIBE 时为每路流回放一帧 kline"""
+
+    def __init__(self):
+        self.paths = []
+        self.controls = []
+        self.sockets = []
+        self.server = None
+
+    async def handler(self, ws):
+        self.paths.append(ws.request.path)
+        self.sockets.append(ws)
+        query = parse_qs(urlparse(ws.request.path).query)
+        streams = set(query["streams"][0].split("/")) if query.get("streams") else set()
+        for name in sorted(streams):
+            await ws.send(kline_frame(name))
+        try:
+            async for raw in ws:
+                msg = json.loads(raw)
+                self.controls.append((msg["method"], msg["params"]))
+                await ws.send(json.dumps({"result": None, "id": msg["id"]}))
+                if msg["method"] == "SUBSCRIBE":
+                    streams.update(msg["params"])
+                    for name in msg["params"]:
+                        await ws.send(kline_frame(name))
+                else:
+                    streams.difference_update(msg["params"])
+        except websockets.ConnectionClosed:
+            pass
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.sockets[0].getsockname()[:2]
+        return f"ws://{host}:{port}"
+
+
+@pytest.fixture
+async def server():
+    replay = ReplayServer()
+    async with websockets.serve(replay.handler, "127.0.0.1", 0) as srv:
+        replay.server = srv
+        yield replay
+
+
+@pytest.fixture
+async def hub(server, fake_redis, monkeypatch):
+    pushed = []
+
+    async def broadcast(channel, payload, local_only=False):
+        pushed.append(channel)
+
+    monkeypatch.setattr(binance.websocket_manager, "broadcast", broadcast)
+    monkeypatch.setattr(BinanceCombinedStream, "control_interval", 0)
+
+    hub = KlineHub([], base_url=server.url, streams_per_connection=2)
+    hub.redis = fake_redis
+    hub.state = MarketState(fake_redis)
+    hub.pushed = pushed
+    yield hub
+    await hub.stop()
+
+
+async def wait_for(predicate, timeout: float = 3.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+async def test_streams_packed_into_combined_connections(hub, server):
+    await hub.update_pairs([["BTCUSDT", ["1m", "5m"]], ["ETHUSDT", ["1m"]]])
+
+    await wait_for(lambda: len(hub.pushed) == 3)
+    assert sorted(server.paths) == [
+        "/stream?streams=btcusdt@kline_1m/btcusdt@kline_5m",
+        "/stream?streams=ethusdt@kline_1m",
+    ]
+    assert sorted(hub.pushed) == ["btcusdt-1m", "btcusdt-5m", "ethusdt-1m"]
+    assert hub.state.latest[("BTCUSDT", "1m")]["close"] == "1.5"
+
+
+async def test_pair_changes_use_control_messages(hub, server):
+    await hub.update_pairs([["BTCUSDT", ["1m"]], ["ETHUSDT", ["1m"]]])
+    await wait_for(lambda: len(hub.pushed) == 2)
+
+    await hub.update_pairs([["ETHUSDT", ["1m"]], ["SOLUSDT", ["1m"]]])
+    await wait_for(lambda: len(hub.pushed) == 3)
+
+    assert len(server.paths) == 1
+    assert server.controls == [
+        ("UNSUBSCRIBE", ["btcusdt@kline_1m"]),
+        ("SUBSCRIBE", ["solusdt@kline_1m"]),
+    ]
+    assert hub.pushed[-1] == "solusdt-1m"
+    assert set(hub.handlers) == {"ethusdt@kline_1m", "solusdt@kline_1m"}
+
+
+async def test_reconnect_uses_current_streams(hub, server):
+    await hub.update_pairs([["BTCUSDT", ["1m"]]])
+    await wait_for(lambda: len(hub.pushed) == 1)
+    await hub.update_pairs([["BTCUSDT", ["1m"]], ["ETHUSDT", ["1m"]]])
+    await wait_for(lambda: len(hub.pushed) == 2)
+
+    await server.sockets[0].close()
+    await wait_for(lambda: len(server.paths) == 2)
+
+    assert server.paths[-1] == "/stream?streams=btcusdt@kline_1m/ethusdt@kline_1m"
+    await wait_for(lambda: len(hub.pushed) == 4)
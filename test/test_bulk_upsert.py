@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+bulk_upsert：content_hash 列随行写入，DO UPDATE ... WHERE 在库内跳过未变化的行；其它途径改过的行不会被永久跳过
+"""
+import pytest
+from sqlalchemy import select
+
+from app.api.v1.model.shop_product import ShopProduct
+from app.pedro.db import async_session_factory
+from test.conftest import create_tables
+
+
+def product(i: int, price: float = 10.0) -> dict:
+    return {"external_id": f"p{i}", "title": f"Product {i}", "brand": "Bench", "retail_price": price}
+
+
+@pytest.fixture
+async def table(db):
+    await create_tables(db, ShopProduct)
+    return db
+
+
+async def titles():
+    async with async_session_factory() as session:
+        rows = await session.execute(select(ShopProduct.external_id, ShopProduct.title, ShopProduct.retail_price))
+        return {eid: (title, float(price)) for eid, title, price in rows}
+
+
+async def test_unchanged_rows_skipped_in_database(table):
+    rows = [product(i) for i in range(3)]
+    assert (await ShopProduct.bulk_upsert(rows))["written"] == 3
+
+    stats = await ShopProduct.bulk_upsert([product(i) for i in range(3)])
+    assert stats["written"] == 0 and stats["skipped"] == 3
+
+    stats = await ShopProduct.bulk_upsert([product(0), product(1, price=12.5), product(2)])
+    assert stats["written"] == 1 and stats["skipped"] == 2
+    assert (await titles())["p1"] == ("Product 1", 12.5)
+
+
+async def test_core_write_without_hash_is_rewritten(table):
+    await ShopProduct.bulk_upsert([product(0)])
+    # 绕过 bulk_upsert 的写入（如单行 upsert）会清空哈希
+    await ShopProduct.upsert(where={"external_id": "p0"}, data={"external_id": "p0", "title": "drifted"})
+
+    stats = await ShopProduct.bulk_upsert([product(0)])
+    assert stats["written"] == 1
+    assert (await titles())["p0"] == ("Product 0", 10.0)
+
+
+async def test_orm_update_resets_hash(table):
+    await ShopProduct.bulk_upsert([product(0)])
+    async with async_session_factory() as session:
+        item = await session.scalar(select(ShopProduct).where(ShopProduct.external_id == "p0"))
+        item.title = "edited"
+        await session.commit()
+        assert item.content_hash is None
+
+    assert (await ShopProduct.bulk_upsert([product(0)]))["written"] == 1
+    assert (await titles())["p0"] == ("Product 0", 10.0)
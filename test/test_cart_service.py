@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+购物车详情：查询次数与购物车大小无关；失效条目一次 HDEL 清理
+"""
+import json
+from decimal import Decimal
+
+import pytest
+
+from app.api.v1.model.shop_product import ShopProduct
+from app.api.v1.services.cart_service import CartService
+from app.pedro.db import async_session_factory
+from test.conftest import QueryCounter, create_tables
+
+UID = "42"
+
+
+@pytest.fixture
+async def products(db, fake_redis):
+    await create_tables(db, ShopProduct)
+    async with async_session_factory() as session:
+        session.add_all([
+            ShopProduct(id=i, title=f"商品 {i}", price=Decimal("2.50"), thumbnail=f"{i}.jpg")
+            for i in range(1, 61)
+        ])
+        session.add(ShopProduct(id=999, title="已下架", price=Decimal("1.00"), is_deleted=True))
+        await session.commit()
+
+
+async def fill_cart(redis, ids, extra=None):
+    mapping = {str(i): json.dumps({"qty": 2}) for i in ids}
+    mapping.update(extra or {})
+    await redis.delete(f"cart:{UID}")
+    await redis.hset(f"cart:{UID}", mapping=mapping)
+
+
+async def cart_queries(db) -> int:
+    with QueryCounter(db) as counter:
+        await CartService.get_cart(UID)
+    return counter.count
+
+
+async def test_query_count_independent_of_cart_size(db, fake_redis, products):
+    await fill_cart(fake_redis, range(1, 6))
+    small = await cart_queries(db)
+
+    await fill_cart(fake_redis, range(1, 51))
+    large = await cart_queries(db)
+
+    assert small == large == 1
+
+
+async def test_fifty_items_totals(db, fake_redis, products):
+    await fill_cart(fake_redis, range(1, 51))
+    cart = await CartService.get_cart(UID)
+
+    assert len(cart["items"]) == 50
+    assert cart["total"] == 250.0
+    assert cart["items"][0] == {
+        "product_id": 1, "title": "商品 1", "price": 2.5,
+        "thumbnail": "1.jpg", "quantity": 2, "subtotal": 5.0,
+    }
+
+
+async def test_stale_entries_pruned_with_one_hdel(db, fake_redis, products, monkeypatch):
+    await fill_cart(fake_redis, range(1, 51), extra={
+        "999": json.dumps({"qty": 1}),    # 软删除
+        "12345": json.dumps({"qty": 1}),  # 不存在
+        "abc": json.dumps({"qty": 1}),    # 非法 id
+    })
+
+    hdel_calls = []
+    original = fake_redis.hdel
+
+    async def spy(key, *fields):
+        hdel_calls.append(set(fields))
+        return await original(key, *fields)
+
+    monkeypatch.setattr(fake_redis, "hdel", spy)
+
+    with QueryCounter(db) as counter:
+        cart = await CartService.get_cart(UID)
+
+    assert counter.count == 1
+    assert len(cart["items"]) == 50
+    assert hdel_calls == [{"999", "12345", "abc"}]
+    remaining = await fake_redis.hkeys(f"cart:{UID}")
+    assert sorted(map(int, remaining)) == list(range(1, 51))
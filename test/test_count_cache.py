@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+estimate 模式的 count 缓存：有容量上限，写入时淘汰过期项
+"""
+from app.pedro import interface
+from app.pedro.interface import CountCache
+
+
+def test_hit_within_ttl():
+    cache = CountCache(maxsize=4, ttl=60)
+    cache.set("a", 10)
+    assert cache.get("a") == 10
+    assert cache.get("missing") is None
+
+
+def test_size_cap_evicts_oldest():
+    cache = CountCache(maxsize=3, ttl=60)
+    for i in range(10):
+        cache.set(f"k{i}", i)
+    assert len(cache) == 3
+    assert cache.get("k0") is None
+    assert [cache.get(f"k{i}") for i in (7, 8, 9)] == [7, 8, 9]
+
+
+def test_expired_entries_evicted_on_insert(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(interface.time, "monotonic", lambda: clock[0])
+    cache = CountCache(maxsize=100, ttl=60)
+    for i in range(50):
+        cache.set(f"old{i}", i)
+
+    clock[0] += 61
+    assert cache.get("old0") is None
+    cache.set("fresh", 1)
+
+    assert len(cache) == 1
+    assert cache.get("fresh") == 1
+
+
+def test_rewrite_moves_key_to_back(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(interface.time, "monotonic", lambda: clock[0])
+    cache = CountCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    clock[0] += 30
+    cache.set("b", 2)
+    cache.set("a", 3)  # 刷新后 a 排到队尾，过期时间也更新
+    clock[0] += 40     # 两项都未过期 → 按容量上限淘汰最早写入的 b
+    cache.set("c", 4)
+    assert cache.get("b") is None
+    assert cache.get("a") == 3 and cache.get("c") == 4
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+数据库连接池配置与指标
+- engine_options：SQLite 用默认池；其余走 MeteredPool，asyncpg 额外带预编译语句缓存参数
+- MeteredPool：每次 checkout 记录等待时间，超时计入 timeouts
+- substitute_env_vars：${VAR} / ${VAR:-默认值}
+- /admin/db/pool/stats 需要管理员权限
+"""
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError as SQLATimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.pedro import db as db_module
+from app.pedro.config import DatabaseConfig, substitute_env_vars
+from app.pedro.db import MeteredPool, PoolMetrics, engine_options, pool_stats
+
+
+@pytest.fixture
+def metrics(monkeypatch):
+    metrics = PoolMetrics()
+    monkeypatch.setattr(db_module, "pool_metrics", metrics)
+    return metrics
+
+
+def test_sqlite_uses_default_pool(metrics):
+    options = engine_options(DatabaseConfig(url="sqlite+aiosqlite:///./app.db", pool_recycle=60))
+
+    assert options == {"echo": False, "future": True, "pool_pre_ping": True, "pool_recycle": 60}
+
+
+def test_asyncpg_gets_metered_pool_and_statement_cache(metrics):
+    config = DatabaseConfig(
+        url="postgresql+asyncpg://u:p@db/app",
+        pool_size=20, max_overflow=5, pool_timeout=3,
+        statement_cache_size=0, prepared_statement_cache_size=0,
+        pool_slow_checkout_ms=50, pool_saturation_warn=0.8,
+    )
+    options = engine_options(config)
+
+    assert options["poolclass"] is MeteredPool
+    assert (options["pool_size"], options["max_overflow"], options["pool_timeout"]) == (20, 5, 3)
+    assert options["connect_args"] == {"statement_cache_size": 0, "prepared_statement_cache_size": 0}
+    assert (metrics.slow_checkout_ms, metrics.saturation_warn) == (50, 0.8)
+
+
+def test_other_drivers_skip_asyncpg_args(metrics):
+    options = engine_options(DatabaseConfig(url="mysql+aiomysql://u:p@db/app"))
+
+    assert options["poolclass"] is MeteredPool
+    assert "connect_args" not in options
+
+
+async def test_metered_pool_records_checkouts_and_timeouts(tmp_path, metrics, monkeypatch):
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}",
+        poolclass=MeteredPool, pool_size=1, max_overflow=0, pool_timeout=0.05,
+    )
+    monkeypatch.setattr(db_module, "get_engine", lambda: engine)
+    try:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            stats = pool_stats()
+            assert (stats["checked_out"], stats["saturation"]) == (1, 1.0)
+
+            with pytest.raises(SQLATimeoutError):
+                async with engine.connect():
+                    pass
+
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+    finally:
+        await engine.dispose()
+
+    assert metrics.checkouts == 3
+    assert metrics.timeouts == 1
+    assert metrics.max_wait_ms >= 40
+    stats = pool_stats()
+    assert (stats["checkouts"], stats["timeouts"], stats["checked_out"]) == (3, 1, 0)
+
+
+def test_env_var_substitution(monkeypatch):
+    monkeypatch.setenv("PEDRO_DB_HOST", "db.internal")
+    monkeypatch.setenv("PEDRO_EMPTY", "")
+    monkeypatch.delenv("PEDRO_MISSING", raising=False)
+
+    config = {
+        "url": "postgresql+asyncpg://${PEDRO_DB_HOST:-localhost}:${PEDRO_DB_PORT:-5432}/app",
+        "nested": [{"host": "${PEDRO_EMPTY:-fallback}"}, "${PEDRO_MISSING}", 5],
+        "empty_default": "${PEDRO_MISSING:-}",
+    }
+    assert substitute_env_vars(config) == {
+        "url": "postgresql+asyncpg://db.internal:5432/app",
+        "nested": [{"host": "fallback"}, "${PEDRO_MISSING}", 5],
+        "empty_default": "",
+    }
+
+
+def test_pool_stats_route_requires_admin():
+    from app.api.cms.admin import rp
+    from app.pedro.pedro_jwt import admin_required
+
+    route = next(r for r in rp.routes if r.path.endswith("/db/pool/stats"))
+    assert any(dep.dependency is admin_required for dep in route.dependencies)
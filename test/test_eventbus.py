@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+EventBus：publish_nowait 写 Redis Stream outbox（崩溃后可认领重投）；本地订阅者按 key 分区保序
+"""
+import asyncio
+import json
+import random
+
+import pytest
+
+from app.extension.eventbus.base import OUTBOX_GROUP, EventBus
+
+STREAM = "test:eventbus:outbox"
+
+
+@pytest.fixture
+async def bus(fake_redis):
+    bus = EventBus(outbox_stream=STREAM, outbox_block_ms=20)
+    yield bus
+    await bus.close(timeout=1)
+
+
+async def wait_for(predicate, timeout: float = 3.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+async def test_publish_nowait_goes_through_stream(bus, fake_redis):
+    handled = []
+
+    @bus.on("order.timeout")
+    async def on_timeout(data):
+        handled.append(data)
+
+    assert await bus.publish_nowait("order.timeout", {"order_id": 1, "user_id": 7}) is True
+
+    await wait_for(lambda: handled)
+    assert handled == [{"order_id": 1, "user_id": 7}]
+    await wait_for(lambda: bus.metrics["outbox_delivered"] == 1)
+    assert await fake_redis.xlen(STREAM) == 0
+
+
+async def test_unacked_event_redelivered_after_crash(fake_redis):
+    # 上一个进程读到事件后崩溃（未 XACK）
+    await fake_redis.xgroup_create(STREAM, OUTBOX_GROUP, id="0", mkstream=True)
+    await fake_redis.xadd(STREAM, {"event": "order.expired", "data": json.dumps({"order_id": 9})})
+    await fake_redis.xreadgroup(OUTBOX_GROUP, "crashed", {STREAM: ">"}, count=10)
+
+    bus = EventBus(outbox_stream=STREAM, outbox_block_ms=20, outbox_claim_idle_ms=0)
+    handled = []
+
+    @bus.on("order.expired")
+    async def on_expired(data):
+        handled.append(data)
+
+    bus.start_outbox()
+    await wait_for(lambda: handled)
+    assert handled == [{"order_id": 9}]
+    assert bus.metrics["outbox_claimed"] == 1
+    await bus.close(timeout=1)
+
+
+async def test_falls_back_to_sync_publish_without_redis(bus, monkeypatch):
+    async def unavailable():
+        raise ConnectionError("redis down")
+
+    monkeypatch.setattr(bus, "_redis", unavailable)
+    handled = []
+
+    @bus.on("user.notify")
+    async def on_notify(data):
+        handled.append(data)
+
+    assert await bus.publish_nowait("user.notify", {"user_id": 1}) is False
+    await wait_for(lambda: handled)
+    assert bus.metrics["outbox_fallbacks"] == 1
+
+
+async def test_same_key_handled_in_order(bus):
+    seen = {}
+
+    @bus.on("order.step")
+    async def on_step(data):
+        await asyncio.sleep(random.random() / 200)
+        seen.setdefault(data["order_id"], []).append(data["seq"])
+
+    for seq in range(10):
+        for order_id in range(5):
+            await bus.publish("order.step", {"order_id": order_id, "seq": seq})
+
+    await wait_for(lambda: sum(map(len, seen.values())) == 50)
+    assert all(steps == list(range(10)) for steps in seen.values())
+
+
+def test_partition_is_stable_per_key():
+    bus = EventBus(max_workers=4)
+    assert bus._partition({"order_id": 42}) == bus._partition({"order_id": 42, "user_id": 1})
+    assert bus._partition({"user_id": "7"}) == bus._partition({"user_id": 7})
+
+
+async def test_user_notify_end_to_end(bus, monkeypatch):
+    """钱包路径的 user.notify 载荷经 outbox → handler → WS 送达；中继副本（带 _src）不重复推送"""
+    from app.extension.eventbus.handlers.notify_handlers import push_user_notify
+    from app.extension.websocket.tasks import ws_user_notify
+    from app.extension.websocket.wss import WebSocketManager
+    from test.test_ws_outbox import RecordingSocket, drain
+
+    async def identity(msg, lang):
+        return msg
+
+    manager = WebSocketManager()
+    ws = RecordingSocket()
+    await manager.connect(ws, "7")
+    await manager.subscribe(ws, "user:7")
+    monkeypatch.setattr(ws_user_notify, "websocket_manager", manager)
+    monkeypatch.setattr(ws_user_notify, "translate_message", identity)
+    bus.on("user.notify")(push_user_notify)
+
+    await bus.publish_nowait("user.notify", {"user_id": 7, "event": {
+        "event": "wallet_credit", "amount": 5.0, "content": "账户入账 $5.00",
+    }})
+    await wait_for(lambda: bus.metrics["outbox_delivered"] == 1)
+    await bus.publish("user.notify", {"user_id": 7, "event": {"content": "x"}, "_src": "other"}, relay=False)
+    await wait_for(lambda: bus.metrics["handled"] == 2)
+    await drain(manager, ws)
+
+    assert bus.metrics["handler_errors"] == 0
+    assert ws.frames == [{"type": "user", "event": "wallet_credit", "uid": 7, "level": "info",
+                          "html": False, "message": "账户入账 $5.00"}]
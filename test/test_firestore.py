@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+FirestoreService：注入内存版 AsyncClient
+- set / update / get / delete 走异步文档引用（merge 语义、时间戳、缺失文档）
+- get_multi 只发起一次 get_all
+- safe_set / safe_update 全程 await，不触碰同步 Client、不阻塞事件循环
+"""
+import asyncio
+
+import pytest
+from google.api_core.exceptions import NotFound
+
+from app.extension.google_tools.firestore import FirestoreService
+
+
+class FakeSnapshot:
+    def __init__(self, path: str, data):
+        self.id = path.split("/")[-1]
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+
+class FakeDocument:
+    def __init__(self, client, path: str):
+        self.client = client
+        self.path = path
+
+    def collection(self, name: str):
+        return FakeCollection(self.client, f"{self.path}/{name}")
+
+    async def _io(self):
+        self.client.calls += 1
+        await self.client.gate.wait()
+
+    async def set(self, data: dict, merge: bool = False):
+        await self._io()
+        current = self.client.docs.get(self.path, {}) if merge else {}
+        self.client.docs[self.path] = {**current, **data}
+
+    async def update(self, data: dict):
+        await self._io()
+        if self.path not in self.client.docs:
+            raise NotFound(f"No document to update: {self.path}")
+        self.client.docs[self.path].update(data)
+
+    async def get(self):
+        await self._io()
+        return FakeSnapshot(self.path, self.client.docs.get(self.path))
+
+    async def delete(self):
+        await self._io()
+        self.client.docs.pop(self.path, None)
+
+
+class FakeCollection:
+    def __init__(self, client, path: str):
+        self.client = client
+        self.path = path
+
+    def document(self, doc_id: str):
+        return FakeDocument(self.client, f"{self.path}/{doc_id}")
+
+    async def stream(self):
+        depth = self.path.count("/") + 1
+        for path, data in list(self.client.docs.items()):
+            if path.startswith(f"{self.path}/") and path.count("/") == depth:
+                yield FakeSnapshot(path, data)
+
+
+class FakeAsyncClient:
+    """内存版 firestore AsyncClient：gate 未打开时所有 I/O 挂起，用来确认调用方让出了事件循环"""
+
+    def __init__(self):
+        self.docs = {}
+        self.calls = 0
+        self.get_all_calls = 0
+        self.gate = asyncio.Event()
+        self.gate.set()
+
+    def collection(self, name: str):
+        return FakeCollection(self, name)
+
+    def document(self, path: str):
+        return FakeDocument(self, path.strip("/"))
+
+    async def get_all(self, refs):
+        self.get_all_calls += 1
+        for ref in refs:
+            yield FakeSnapshot(ref.path, self.docs.get(ref.path))
+
+
+class SyncClientGuard:
+    """同步 Client 不应被服务方法使用"""
+
+    def __getattr__(self, name):
+        raise AssertionError(f"sync firestore client used: {name}")
+
+
+@pytest.fixture
+def client():
+    return FakeAsyncClient()
+
+
+@pytest.fixture
+def service(client):
+    return FirestoreService(client=SyncClientGuard(), async_client=client)
+
+
+async def test_set_update_get_delete(service, client):
+    await service.set(15, {"name": "pedro", "level": 1}, subpath="store/profile")
+    assert client.docs["users/15/store/profile"]["name"] == "pedro"
+    assert "updated_at" in client.docs["users/15/store/profile"]
+
+    await service.update("users/15/store/profile", {"level": 2})
+    profile = await service.get(15, "store/profile")
+    assert (profile["name"], profile["level"]) == ("pedro", 2)
+
+    await service.set(15, {"level": 3}, subpath="store/profile")
+    assert "name" not in client.docs["users/15/store/profile"]
+
+    await service.delete(15, "store/profile")
+    assert await service.get(15, "store/profile") is None
+
+
+async def test_get_multi_uses_one_get_all(service, client):
+    client.docs["users/1/kyc/a"] = {"ok": True}
+    client.docs["users/1/kyc/c"] = {"ok": True}
+
+    result = await service.get_multi(["users/1/kyc/a", "users/1/kyc/b", "users/1/kyc/c"])
+
+    assert result == {"a": True, "b": False, "c": True}
+    assert client.get_all_calls == 1
+    assert client.calls == 0
+    assert await service.get_multi([]) == {}
+    assert client.get_all_calls == 1
+
+
+async def test_list_documents(service, client):
+    client.docs["orders/1"] = {"n": 1}
+    client.docs["orders/2"] = {"n": 2}
+    client.docs["orders/1/items/x"] = {"n": 3}
+
+    docs = await service.list_documents("orders")
+
+    assert sorted(d.id for d in docs) == ["1", "2"]
+
+
+async def test_safe_update_falls_back_to_set(service, client):
+    await service.safe_update(7, {"balance": 10}, subpath="wallet/main")
+    assert client.docs["users/7/wallet/main"] == {"balance": 10}
+
+    await service.safe_update(7, {"frozen": 1}, subpath="wallet/main")
+    assert client.docs["users/7/wallet/main"] == {"balance": 10, "frozen": 1}
+
+
+async def test_safe_set_and_safe_update_do_not_block(service, client):
+    client.gate.clear()
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0)
+
+    ticking = asyncio.create_task(ticker())
+    writes = asyncio.gather(
+        service.safe_set(path="users/9/store/profile", data={"name": "x"}),
+        service.safe_update(9, {"level": 1}, subpath="store/stats"),
+    )
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+    # 两个写入都在等待 I/O，期间事件循环照常调度其它协程
+    assert client.calls == 2
+    assert not writes.done()
+    assert ticks >= 5
+
+    client.gate.set()
+    await writes
+    ticking.cancel()
+
+    assert client.docs["users/9/store/profile"]["name"] == "x"
+    assert {"create_time", "update_time"} <= set(client.docs["users/9/store/profile"])
+    assert client.docs["users/9/store/stats"] == {"level": 1}
+
+
+async def test_safe_set_rejects_odd_path(service):
+    with pytest.raises(ValueError):
+        await service.safe_set(path="users/9/store", data={})
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+JWTService.verify：单次 MGET 取回 token 状态 / 版本号 / 设备锁（decode_responses=True 下均为 str）
+"""
+from datetime import datetime, timedelta, timezone
+
+import jwt
+import pytest
+from starlette.requests import Request
+
+from app.pedro import pedro_jwt
+from app.pedro.exception import UnAuthentication
+from app.pedro.pedro_jwt import jwt_service
+
+UID = 7
+UA = "pytest-agent"
+IP = "10.0.0.1"
+
+
+def make_token(ver: int = 1, fp: str = None) -> str:
+    now = datetime.now(timezone.utc)
+    payload = {"uid": UID, "ver": ver, "fp": fp, "scope": ["user"], "iat": now,
+               "exp": now + timedelta(minutes=5), "type": "access"}
+    return jwt.encode(payload, jwt_service.secret, algorithm=jwt_service.algorithm)
+
+
+def make_request(ua: str = UA, ip: str = IP) -> Request:
+    return Request({"type": "http", "headers": [(b"user-agent", ua.encode())], "client": (ip, 50000)})
+
+
+@pytest.fixture
+async def redis(fake_redis, monkeypatch):
+    calls = []
+    original = fake_redis.execute_command
+
+    async def spy(*args, **options):
+        calls.append(args[0])
+        return await original(*args, **options)
+
+    monkeypatch.setattr(fake_redis, "execute_command", spy)
+    monkeypatch.setattr(pedro_jwt.login_risk, "observe", lambda *a: None)
+    fake_redis.calls = calls
+    return fake_redis
+
+
+async def issue(redis, token: str, ver: int = 1, device_lock: bool = False):
+    await redis.set(f"token:{UID}:access:{token}", "200")
+    await redis.set(f"user:{UID}:version", ver)
+    if device_lock:
+        await redis.set(f"user:{UID}:device_lock", "1")
+    redis.calls.clear()
+
+
+async def test_valid_token_single_round_trip(redis):
+    token = make_token()
+    await issue(redis, token)
+
+    payload = await jwt_service.verify(token)
+
+    assert payload["uid"] == UID
+    assert redis.calls == ["MGET"]
+
+
+async def test_revoked_token_rejected(redis):
+    token = make_token()
+    await issue(redis, token)
+    await redis.set(f"token:{UID}:access:{token}", "403")
+
+    with pytest.raises(UnAuthentication):
+        await jwt_service.verify(token)
+
+
+async def test_version_mismatch_rejected(redis):
+    token = make_token(ver=1)
+    await issue(redis, token, ver=2)
+
+    with pytest.raises(UnAuthentication):
+        await jwt_service.verify(token)
+
+
+async def test_device_lock_rejects_other_device(redis):
+    token = make_token(fp=jwt_service.make_fingerprint(UA, IP))
+    await issue(redis, token, device_lock=True)
+
+    with pytest.raises(UnAuthentication):
+        await jwt_service.verify(token, request=make_request(ip="10.0.0.2"))
+
+
+async def test_device_lock_accepts_same_device(redis):
+    token = make_token(fp=jwt_service.make_fingerprint(UA, IP))
+    await issue(redis, token, device_lock=True)
+
+    payload = await jwt_service.verify(token, request=make_request())
+
+    assert payload["uid"] == UID
+    assert redis.calls == ["MGET"]
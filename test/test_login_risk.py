@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+登录风控：关闭时停止后台任务并 flush 剩余队列
+- 写入失败时未写完的批次放回队列；队列已满的部分计入 dropped
+"""
+import pytest
+
+from app.extension.redis.login_risk_service import LoginRiskService
+from app.pedro.login_risk import LoginRiskRecorder
+from app.pedro.service_manager import ServiceManager
+
+
+async def test_close_flushes_pending(fake_redis):
+    recorder = LoginRiskRecorder(flush_interval=3600)
+    recorder.observe(1, "fp-a", "10.0.0.1")
+    recorder.observe(2, "fp-b", "10.0.0.2")
+    assert recorder._task is not None
+
+    await recorder.close()
+
+    assert recorder._task is None
+    assert await fake_redis.lrange("user:devices:1", 0, -1) == ["fp-a"]
+    assert await fake_redis.lrange("user:devices:2", 0, -1) == ["fp-b"]
+
+
+def test_registered_as_service_after_redis():
+    classes = ServiceManager._discover()
+    assert classes["login_risk"] is LoginRiskService
+    waves, skipped = ServiceManager._build_waves({n: classes[n] for n in ("redis", "login_risk")})
+    assert waves == [["redis"], ["login_risk"]] and not skipped
+
+
+async def test_failed_flush_requeues_batch(fake_redis, monkeypatch):
+    recorder = LoginRiskRecorder(flush_interval=3600, batch_size=1, max_pending=2)
+    recorder.observe(1, "fp-a", "10.0.0.1")
+    recorder.observe(2, "fp-b", "10.0.0.2")
+    recorder.observe(3, "fp-c", "10.0.0.3")
+
+    real_pipeline = fake_redis.pipeline
+    calls = []
+
+    def flaky_pipeline(*args, **kwargs):
+        pipe = real_pipeline(*args, **kwargs)
+        calls.append(pipe)
+        if len(calls) == 3:  # 第二批的读取失败
+            async def execute(*a, **kw):
+                # flush 期间又有新记录入队
+                recorder.observe(4, "fp-d", "10.0.0.4")
+                raise ConnectionError("redis down")
+
+            pipe.execute = execute
+        return pipe
+
+    monkeypatch.setattr(fake_redis, "pipeline", flaky_pipeline)
+    with pytest.raises(ConnectionError):
+        await recorder.flush()
+
+    # 第一批已写入；未写完的放回队列（新入队的优先），放不下的计入 dropped
+    assert await fake_redis.lrange("user:devices:1", 0, -1) == ["fp-a"]
+    assert set(recorder._pending) == {(4, "fp-d"), (2, "fp-b")}
+    assert recorder.dropped == 1
+
+    monkeypatch.setattr(fake_redis, "pipeline", real_pipeline)
+    await recorder.close()
+    assert await fake_redis.lrange("user:devices:2", 0, -1) == ["fp-b"]
+    assert await fake_redis.lrange("user:devices:4", 0, -1) == ["fp-d"]
+    assert await fake_redis.exists("user:devices:3") == 0
+    assert recorder._pending == {}
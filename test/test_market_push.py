@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+行情下行：kline 只推给订阅了 {symbol}-{interval} 频道的连接，不再全量广播
+- ticker:summary 订阅者每个 SUMMARY_INTERVAL 只收到一帧合并快照（每币取最新一帧）
+"""
+import asyncio
+import json
+
+import pytest
+
+from app.extension.stream import binance
+from app.extension.stream.binance import BinanceKlineStream, KlineHub, MarketState, kline_stream_name
+from app.extension.websocket.wss import WebSocketManager
+from test.test_ws_outbox import RecordingSocket, drain
+
+
+def kline_frame(symbol: str, interval: str, close: str, closed: bool = True) -> str:
+    return json.dumps({
+        "stream": kline_stream_name(symbol, interval),
+        "data": {"e": "kline", "k": {
+            "s": symbol.upper(), "i": interval, "o": "1", "h": "2", "l": "0.5", "c": close,
+            "v": "10", "n": 3, "t": 1700000000000, "x": closed,
+        }},
+    })
+
+
+@pytest.fixture
+async def manager(monkeypatch):
+    manager = WebSocketManager()
+    monkeypatch.setattr(binance, "websocket_manager", manager)
+    yield manager
+    for ws in list(manager.clients):
+        await manager.disconnect(ws)
+    manager.timers.close()
+
+
+@pytest.fixture
+def hub(fake_redis, manager):
+    hub = KlineHub([])
+    hub.redis = fake_redis
+    hub.state = MarketState(fake_redis)
+    for symbol in ("BTCUSDT", "ETHUSDT"):
+        hub.handlers[kline_stream_name(symbol, "1m")] = BinanceKlineStream(symbol, "1m", fake_redis, hub.state)
+    return hub
+
+
+async def client(manager, uid: str, *channels) -> RecordingSocket:
+    ws = RecordingSocket()
+    await manager.connect(ws, uid)
+    for channel in channels:
+        await manager.subscribe(ws, channel)
+    return ws
+
+
+async def test_kline_reaches_only_channel_subscribers(hub, manager):
+    btc = await client(manager, "1", "btcusdt-1m")
+    eth = await client(manager, "2", "ethusdt-1m")
+    summary = await client(manager, "3", binance.TICKER_SUMMARY_CHANNEL)
+    idle = await client(manager, "4")
+
+    await hub.dispatch(kline_frame("BTCUSDT", "1m", "100"))
+    await hub.dispatch(kline_frame("ETHUSDT", "1m", "10"))
+    for ws in (btc, eth, summary, idle):
+        await drain(manager, ws)
+
+    assert [(f["symbol"], f["close"]) for f in btc.frames] == [("BTCUSDT", "100")]
+    assert [(f["symbol"], f["close"]) for f in eth.frames] == [("ETHUSDT", "10")]
+    assert summary.frames == []
+    assert idle.frames == []
+
+
+async def test_summary_sends_one_merged_frame_per_interval(hub, manager, monkeypatch):
+    monkeypatch.setattr(binance, "SUMMARY_INTERVAL", 0.05)
+    summary = await client(manager, "1", binance.TICKER_SUMMARY_CHANNEL)
+    btc = await client(manager, "2", "btcusdt-1m")
+
+    # 没有订阅者时不推送
+    await hub.dispatch(kline_frame("BTCUSDT", "1m", "1"))
+    await manager.unsubscribe(summary, binance.TICKER_SUMMARY_CHANNEL)
+    await hub.push_summary()
+    await manager.subscribe(summary, binance.TICKER_SUMMARY_CHANNEL)
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    task = asyncio.create_task(hub._ticker_summary())
+    ticks = 0
+    try:
+        for i in range(40):
+            await hub.dispatch(kline_frame("BTCUSDT", "1m", str(100 + i), closed=False))
+            await hub.dispatch(kline_frame("ETHUSDT", "1m", str(10 + i), closed=False))
+            ticks += 2
+            await asyncio.sleep(0.003)
+        await asyncio.sleep(0.06)
+    finally:
+        task.cancel()
+    periods = (loop.time() - started) / binance.SUMMARY_INTERVAL
+    await drain(manager, summary)
+    await drain(manager, btc)
+
+    frames = summary.frames
+    assert all(f["type"] == "ticker_summary" for f in frames)
+    # 每个周期一帧，与 tick 数无关
+    assert 1 <= len(frames) <= periods + 1
+    assert len(frames) < ticks // 4
+    for frame in frames:
+        assert [item["symbol"] for item in frame["data"]] == ["BTCUSDT", "ETHUSDT"]
+    assert [item["close"] for item in frames[-1]["data"]] == ["139", "49"]
+    # 频道订阅者的逐帧推送被 coalesce_ms 限频
+    assert len(btc.frames) < 40
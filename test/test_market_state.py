@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+MarketState：每帧只写内存，定时一次 pipeline（MSET + EXPIRE）落盘每个 symbol/interval 的最新快照
+- 单独使用的 BinanceKlineStream 在 connect 时启动自己的 MarketState，退出时停止并 flush
+"""
+import asyncio
+import json
+
+import pytest
+import websockets
+
+from app.extension.stream import binance
+from app.extension.stream.binance import REDIS_LAST_KEY, REDIS_SNAPSHOT, BinanceKlineStream, MarketState
+
+
+def kline(symbol: str, close: str) -> dict:
+    return {"e": "kline", "k": {
+        "s": symbol, "i": "1m", "o": "1", "h": "2", "l": "0.5", "c": close,
+        "v": "10", "n": 3, "t": 1700000000000, "x": False,
+    }}
+
+
+@pytest.fixture
+def no_push(monkeypatch):
+    async def broadcast(channel, payload, local_only=False):
+        pass
+
+    monkeypatch.setattr(binance.websocket_manager, "broadcast", broadcast)
+
+
+@pytest.fixture
+def pipelines(fake_redis, monkeypatch):
+    """记录每个 pipeline 执行时的命令"""
+    executed = []
+    real_pipeline = fake_redis.pipeline
+
+    def recording_pipeline(*args, **kwargs):
+        pipe = real_pipeline(*args, **kwargs)
+        real_execute = pipe.execute
+
+        async def execute(*a, **kw):
+            executed.append([cmd[0][0] for cmd in pipe.command_stack])
+            return await real_execute(*a, **kw)
+
+        pipe.execute = execute
+        return pipe
+
+    monkeypatch.setattr(fake_redis, "pipeline", recording_pipeline)
+    return executed
+
+
+async def test_many_ticks_one_flush(fake_redis, pipelines, no_push):
+    state = MarketState(fake_redis, ttl=120)
+    streams = [BinanceKlineStream(s, "1m", fake_redis, state) for s in ("BTCUSDT", "ETHUSDT")]
+
+    for i in range(200):
+        for stream in streams:
+            await stream.handle_kline(kline(stream.symbol.upper(), str(i)))
+    assert pipelines == []  # 每帧处理不访问 Redis
+
+    await state.flush()
+    assert pipelines == [["MSET"] + ["EXPIRE"] * 4]
+
+    snapshot = json.loads(await fake_redis.get(REDIS_SNAPSHOT.format(symbol="BTCUSDT", interval="1m")))
+    assert snapshot["close"] == "199"
+    last_key = REDIS_LAST_KEY.format(symbol="ETHUSDT", interval="1m")
+    assert await fake_redis.get(last_key) is not None
+    assert 0 < await fake_redis.ttl(last_key) <= 120
+
+    # 没有新帧时不发请求
+    await state.flush()
+    assert len(pipelines) == 1
+
+
+@pytest.fixture
+async def kline_server():
+    async def handler(ws):
+        for i in range(20):
+            await ws.send(json.dumps(kline("BTCUSDT", str(i))))
+        await ws.wait_closed()
+
+    async with websockets.serve(handler, "127.0.0.1", 0) as server:
+        host, port = server.sockets[0].getsockname()[:2]
+        yield f"ws://{host}:{port}"
+
+
+async def wait_for(predicate, timeout: float = 2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not await predicate():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+async def test_standalone_stream_starts_own_state(fake_redis, kline_server, no_push):
+    stream = BinanceKlineStream("BTCUSDT", "1m", fake_redis)
+    stream.url = kline_server
+    stream.state.flush_interval = 0.02
+    key = REDIS_SNAPSHOT.format(symbol="BTCUSDT", interval="1m")
+
+    task = asyncio.create_task(stream.connect())
+
+    async def flushed():
+        raw = await fake_redis.get(key)
+        return raw is not None and json.loads(raw)["close"] == "19"
+
+    await wait_for(flushed)
+    assert stream.state.tasks
+
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert stream.state.tasks == []
+
+
+async def test_shared_state_left_to_hub(fake_redis):
+    state = MarketState(fake_redis)
+    stream = BinanceKlineStream("BTCUSDT", "1m", fake_redis, state)
+    stream.url = "ws://127.0.0.1:1"  # 连不上：只验证 connect 不会启动共享的 state
+
+    task = asyncio.create_task(stream.connect())
+    await asyncio.sleep(0.05)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert state.tasks == []
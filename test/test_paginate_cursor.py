@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+游标分页与 count_mode
+- encode_cursor / decode_cursor：datetime / date / Decimal 往返；被篡改的游标报 ParameterError
+- paginate_cursor：order_by 存在大量相同值时逐页拼接不重不漏
+- paginate：count_mode="none" 不发 count；"estimate" 在非 PG 上走短时缓存，且排除软删除行
+"""
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import Column, Date, DateTime, Numeric, String
+
+from app.pedro import interface
+from app.pedro.exception import ParameterError
+from app.pedro.interface import InfoCrud, decode_cursor, encode_cursor
+from test.conftest import QueryCounter, create_tables
+
+
+class CursorItem(InfoCrud):
+    __tablename__ = "test_cursor_item"
+
+    name = Column(String(20))
+    price = Column(Numeric(10, 2))
+    day = Column(Date)
+    happened = Column(DateTime)
+
+
+BASE = datetime(2025, 1, 1, 8, 0, 0)
+
+
+@pytest.fixture
+async def items(db):
+    await create_tables(db, CursorItem)
+    interface._count_cache.clear()
+    for i in range(23):
+        await CursorItem.create(
+            name=f"item{i}",
+            price=Decimal("9.90") + i % 3,  # 只有 3 个不同值
+            day=date(2025, 1, 1) + timedelta(days=i % 4),
+            happened=BASE + timedelta(minutes=i % 5),
+        )
+    yield db
+    interface._count_cache.clear()
+
+
+@pytest.mark.parametrize("value", [
+    datetime(2025, 3, 1, 12, 30, 15, 123456),
+    datetime(2025, 3, 1, 12, 30, tzinfo=timezone(timedelta(hours=9))),
+    date(2025, 3, 1),
+    Decimal("12345.6789"),
+    42,
+    "abc",
+    None,
+])
+def test_cursor_round_trip(value):
+    decoded, last_id = decode_cursor(encode_cursor(value, 17))
+    assert decoded == value and type(decoded) is type(value)
+    assert last_id == 17
+
+
+@pytest.mark.parametrize("cursor", [
+    "not-a-cursor!",
+    encode_cursor(1, 1)[:-3],
+    encode_cursor(1, 1).replace("W", "X", 1),
+    # 结构合法但内容被改过
+    interface.base64.urlsafe_b64encode(b'[["dt","yesterday"],1]').decode(),
+    interface.base64.urlsafe_b64encode(b'[["dec","1.2.3"],1]').decode(),
+    interface.base64.urlsafe_b64encode(b'[["v",1],"abc"]').decode(),
+    interface.base64.urlsafe_b64encode(b'[["evil",1],1]').decode(),
+])
+def test_tampered_cursor_rejected(cursor):
+    with pytest.raises(ParameterError):
+        decode_cursor(cursor)
+
+
+async def walk(size: int, **kwargs) -> list:
+    ids, cursor = [], None
+    while True:
+        page, cursor = await CursorItem.paginate_cursor(size=size, cursor=cursor, **kwargs)
+        ids += [item.id for item in page]
+        if cursor is None:
+            return ids
+
+
+@pytest.mark.parametrize("order_by", ["price", "day", "happened", None])
+@pytest.mark.parametrize("sort", ["asc", "desc"])
+async def test_cursor_pages_stable_across_equal_values(items, order_by, sort):
+    rows = await CursorItem.get(one=False)
+    key = order_by or "id"
+    expected = sorted(rows, key=lambda r: (getattr(r, key), r.id), reverse=sort == "desc")
+
+    ids = await walk(4, order_by=order_by, sort=sort)
+
+    assert ids == [r.id for r in expected]
+    assert len(set(ids)) == 23
+
+
+async def test_cursor_respects_filters_and_soft_delete(items):
+    doomed = await CursorItem.get(name="item0")
+    await doomed.update(commit=True, is_deleted=True)
+
+    ids = await walk(2, order_by="price", filters={"day": "2025-01-01"})
+
+    rows = await CursorItem.get(one=False)
+    assert sorted(ids) == sorted(r.id for r in rows if r.day == date(2025, 1, 1))
+    assert doomed.id not in ids
+
+
+async def test_count_mode_none_skips_count(items):
+    with QueryCounter(items) as counter:
+        page, total = await CursorItem.paginate(page=2, size=5, count_mode="none")
+    assert total is None
+    assert len(page) == 5
+    assert counter.count == 1
+
+
+async def test_count_mode_estimate_caches_exact_count(items):
+    _, total = await CursorItem.paginate(size=5, count_mode="estimate")
+    assert total == 23
+
+    await CursorItem.create(name="late", commit=True)
+    with QueryCounter(items) as counter:
+        _, cached = await CursorItem.paginate(size=5, count_mode="estimate")
+    assert cached == 23  # TTL 内复用缓存
+    assert counter.count == 1
+
+    _, exact = await CursorItem.paginate(size=5)
+    assert exact == 24
+
+    # 不同过滤条件各自缓存；软删除行不计入
+    doomed = await CursorItem.get(name="item1")
+    await doomed.update(commit=True, is_deleted=True)
+    _, filtered = await CursorItem.paginate(size=5, filters={"price": "10.90"}, count_mode="estimate")
+    assert filtered == 7
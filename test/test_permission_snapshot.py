@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+CMS 权限快照：命中不查库；权限相关表提交后本地失效并广播；PermissionSyncService 断线重连
+"""
+import asyncio
+
+import pytest
+from sqlalchemy import update
+
+from app.extension.redis.permission_sync_service import PermissionSyncService
+from app.pedro import pedro_jwt
+from app.pedro.db import async_session_factory
+from app.pedro.exception import Forbidden
+from app.pedro.model import Group, GroupPermission, Permission, User, UserGroup
+from app.pedro.permission_snapshot import permission_snapshot
+from test.conftest import QueryCounter, create_tables
+
+ROOT_GROUP, EDITOR_GROUP = 1, 2
+
+
+@pytest.fixture
+async def users(db, fake_redis):
+    await create_tables(db, User, Group, UserGroup, Permission, GroupPermission)
+    async with async_session_factory() as session:
+        root, editor = User(username="root"), User(username="editor")
+        session.add_all([
+            root, editor,
+            Group(id=ROOT_GROUP, name="root", level=1),
+            Group(id=EDITOR_GROUP, name="editor", level=3),
+            Permission(id=1, name="查看订单", module="订单"),
+            Permission(id=2, name="删除订单", module="订单", mount=False),
+        ])
+        await session.flush()
+        session.add_all([
+            UserGroup(user_id=root.id, group_id=ROOT_GROUP),
+            UserGroup(user_id=editor.id, group_id=EDITOR_GROUP),
+            GroupPermission(group_id=EDITOR_GROUP, permission_id=1),
+            GroupPermission(group_id=EDITOR_GROUP, permission_id=2),
+        ])
+        await session.commit()
+    await asyncio.sleep(0)  # 建数据本身也会触发一次失效广播
+    permission_snapshot.invalidate()
+    yield root, editor
+    permission_snapshot.invalidate()
+
+
+async def wait_for(predicate, timeout: float = 3.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+async def test_snapshot_resolves_without_queries_when_warm(db, users):
+    _, editor = users
+    groups = await permission_snapshot.group_ids_of(editor.id)
+    assert groups == {EDITOR_GROUP}
+    assert await permission_snapshot.is_allowed(groups, "订单", "查看订单")
+
+    with QueryCounter(db) as counter:
+        assert await permission_snapshot.group_ids_of(editor.id) == {EDITOR_GROUP}
+        assert await permission_snapshot.is_allowed(groups, "订单", "查看订单")
+        # mount=False 的权限不进快照
+        assert not await permission_snapshot.is_allowed(groups, "订单", "删除订单")
+    assert counter.count == 0
+
+
+async def test_orm_write_invalidates_and_publishes(db, users, fake_redis):
+    _, editor = users
+    pubsub = fake_redis.pubsub()
+    await pubsub.subscribe(permission_snapshot.channel)
+    await pubsub.get_message(timeout=0.1)  # subscribe 回执
+
+    await permission_snapshot.group_ids_of(editor.id)
+    async with async_session_factory() as session:
+        session.add(UserGroup(user_id=editor.id, group_id=ROOT_GROUP))
+        await session.commit()
+
+    assert await permission_snapshot.group_ids_of(editor.id) == {ROOT_GROUP, EDITOR_GROUP}
+    message = await pubsub.get_message(timeout=1)
+    assert message["channel"] == permission_snapshot.channel
+    await pubsub.aclose()
+
+
+async def test_bulk_update_invalidates(db, users):
+    _, editor = users
+    groups = await permission_snapshot.group_ids_of(editor.id)
+    assert await permission_snapshot.is_allowed(groups, "订单", "查看订单")
+
+    async with async_session_factory() as session:
+        await session.execute(update(Permission).where(Permission.id == 1).values(mount=False))
+        await session.commit()
+
+    assert not await permission_snapshot.is_allowed(groups, "订单", "查看订单")
+
+
+async def test_rolled_back_write_keeps_snapshot(db, users):
+    _, editor = users
+    await permission_snapshot.group_ids_of(editor.id)
+    async with async_session_factory() as session:
+        session.add(UserGroup(user_id=editor.id, group_id=ROOT_GROUP))
+        await session.flush()
+        await session.rollback()
+
+    with QueryCounter(db) as counter:
+        assert await permission_snapshot.group_ids_of(editor.id) == {EDITOR_GROUP}
+    assert counter.count == 0
+
+
+async def test_admin_required(db, users):
+    root, editor = users
+    assert await pedro_jwt.admin_required(root) is root
+    with pytest.raises(Forbidden):
+        await pedro_jwt.admin_required(editor)
+
+    # 提权提交后立即生效
+    async with async_session_factory() as session:
+        session.add(UserGroup(user_id=editor.id, group_id=ROOT_GROUP))
+        await session.commit()
+    assert await pedro_jwt.admin_required(editor) is editor
+
+
+async def test_sync_service_invalidates_and_reconnects(users, fake_redis, monkeypatch):
+    _, editor = users
+    monkeypatch.setattr(PermissionSyncService, "retry_delay", 0.01)
+
+    # 第一条订阅连接在读取时断开
+    created, real_pubsub = [], fake_redis.pubsub
+
+    def pubsub():
+        ps = real_pubsub()
+        if not created:
+            async def lost():
+                raise ConnectionError("connection lost")
+                yield
+            ps.listen = lost
+        created.append(ps)
+        return ps
+
+    monkeypatch.setattr(fake_redis, "pubsub", pubsub)
+    await permission_snapshot.group_ids_of(editor.id)
+
+    service = PermissionSyncService()
+    await service.init()
+    await wait_for(lambda: len(created) == 2 and created[1].subscribed)
+
+    # 订阅任务没有退出；旧连接已关闭；重连时丢弃了断线期间可能过期的快照
+    assert not service._task.done()
+    assert not created[0].subscribed
+    assert not permission_snapshot._user_groups
+
+    await permission_snapshot.group_ids_of(editor.id)
+    await fake_redis.publish(permission_snapshot.channel, "1")
+    await wait_for(lambda: not permission_snapshot._user_groups)
+
+    await service.close()
+    assert service._pubsub is None
+    assert not created[1].subscribed
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+WS 在线状态：touch / offline 只改内存，flush 一次 pipeline 写入 ws:online
+- 写入失败时整批放回待写队列，不丢状态
+- PresenceService 关闭时 flush 剩余状态
+"""
+import asyncio
+import time
+
+import pytest
+
+from app.extension.websocket.presence import ONLINE_KEY, PresenceTracker
+from app.extension.websocket.presence_service import PresenceService
+
+
+@pytest.fixture
+async def tracker(fake_redis):
+    tracker = PresenceTracker(flush_interval=3600, stale_after=90)
+    yield tracker
+    if tracker._task is not None:
+        tracker._task.cancel()
+
+
+async def test_touch_and_offline_flushed_in_one_batch(tracker, fake_redis):
+    tracker.touch(1)
+    tracker.touch("2")
+    tracker.touch(3)
+    assert await fake_redis.exists(ONLINE_KEY) == 0  # 请求路径不写 Redis
+
+    await tracker.flush()
+    assert set(await fake_redis.zrange(ONLINE_KEY, 0, -1)) == {"1", "2", "3"}
+
+    tracker.offline(3)
+    tracker.touch(4)
+    await tracker.flush()
+    assert set(await fake_redis.zrange(ONLINE_KEY, 0, -1)) == {"1", "2", "4"}
+    assert tracker._seen == {} and tracker._offline == set()
+
+
+async def test_touch_after_offline_wins(tracker, fake_redis):
+    tracker.touch(1)
+    tracker.offline(1)
+    tracker.touch(1)
+    await tracker.flush()
+    assert await fake_redis.zrange(ONLINE_KEY, 0, -1) == ["1"]
+
+
+async def test_count_and_last_seen_many(tracker, fake_redis):
+    now = int(time.time())
+    await fake_redis.zadd(ONLINE_KEY, {"1": now, "2": now - 60, "3": now - 600})
+
+    assert await tracker.count() == 2
+    assert await tracker.last_seen_many([1, "2", 3, 4]) == [
+        (True, now), (True, now - 60), (False, now - 600), (False, None),
+    ]
+    assert await tracker.last_seen_many([]) == []
+
+    # flush 顺带清掉过期成员
+    await tracker.flush()
+    assert set(await fake_redis.zrange(ONLINE_KEY, 0, -1)) == {"1", "2"}
+
+
+async def test_failed_flush_requeues_batch(tracker, fake_redis, monkeypatch):
+    tracker.touch(1)
+    tracker.touch(2)
+    tracker.offline(3)
+
+    real_pipeline = fake_redis.pipeline
+
+    def broken_pipeline(*args, **kwargs):
+        pipe = real_pipeline(*args, **kwargs)
+
+        async def execute(*a, **kw):
+            # flush 写入期间又有新的状态变化
+            tracker.offline(2)
+            tracker.touch(3)
+            raise ConnectionError("redis down")
+
+        pipe.execute = execute
+        return pipe
+
+    monkeypatch.setattr(fake_redis, "pipeline", broken_pipeline)
+    with pytest.raises(ConnectionError):
+        await tracker.flush()
+
+    # 失败的一批放回队列；flush 期间的新状态优先
+    assert set(tracker._seen) == {"1", "3"}
+    assert tracker._offline == {"2"}
+
+    monkeypatch.setattr(fake_redis, "pipeline", real_pipeline)
+    await fake_redis.zadd(ONLINE_KEY, {"2": int(time.time())})
+    await tracker.flush()
+    assert set(await fake_redis.zrange(ONLINE_KEY, 0, -1)) == {"1", "3"}
+
+
+async def test_background_flush(fake_redis):
+    tracker = PresenceTracker(flush_interval=0.02)
+    tracker.touch(9)
+    await asyncio.sleep(0.1)
+    assert await fake_redis.zrange(ONLINE_KEY, 0, -1) == ["9"]
+    await tracker.close()
+    assert tracker._task is None
+
+
+async def test_service_close_flushes_pending(fake_redis, monkeypatch):
+    tracker = PresenceTracker(flush_interval=3600)
+    monkeypatch.setattr("app.extension.websocket.presence_service.presence", tracker)
+    service = PresenceService()
+    await service.init()
+
+    tracker.touch(5)
+    await service.close()
+
+    assert await fake_redis.zrange(ONLINE_KEY, 0, -1) == ["5"]
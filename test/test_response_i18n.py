@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+响应 msg 翻译：PedroJSONResponse 发送前按请求语言翻译；中间件不缓冲、不解析响应体
+"""
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from starlette.responses import StreamingResponse
+
+from app.pedro import response as response_module
+from app.pedro.exception import NotFound, register_exception_handlers
+from app.pedro.request_path import InjectRequestPathMiddleware, parse_accept_language
+from app.pedro.response import PedroJSONResponse, PedroResponse
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    calls = []
+
+    async def fake_translate(msg, lang):
+        calls.append((msg, lang))
+        return msg if lang == "zh" else f"[{lang}] {msg}"
+
+    monkeypatch.setattr(response_module, "translate_message", fake_translate)
+    return calls
+
+
+@pytest.fixture
+async def client(calls):
+    app = FastAPI(default_response_class=PedroJSONResponse)
+    register_exception_handlers(app)
+    app.add_middleware(InjectRequestPathMiddleware)
+
+    @app.get("/ok")
+    async def ok():
+        return PedroResponse.success(data={"id": 1}, msg="操作成功")
+
+    @app.get("/plain")
+    async def plain():
+        return {"msg": "直接返回"}
+
+    @app.get("/missing")
+    async def missing():
+        raise NotFound()
+
+    @app.get("/stream")
+    async def stream():
+        chunks = [b'{"msg":', b'"\xe6\xb5\x81"}']
+        return StreamingResponse(iter(chunks), media_type="application/json")
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        yield c
+
+
+def test_parse_accept_language():
+    assert parse_accept_language("zh-CN,ja;q=0.9") == "zh"
+    assert parse_accept_language("en_US") == "en"
+    assert parse_accept_language("ja;q=0.8") == "ja"
+    assert parse_accept_language(None) is None
+
+
+async def test_success_msg_translated(client):
+    res = await client.get("/ok", headers={"Accept-Language": "en-US,en;q=0.9"})
+    assert res.json() == {"code": 0, "msg": "[en] 操作成功", "data": {"id": 1}}
+    assert int(res.headers["content-length"]) == len(res.content)
+
+
+async def test_default_language_untouched(client, calls):
+    res = await client.get("/ok")
+    assert res.json()["msg"] == "操作成功"
+    assert calls == []
+
+
+async def test_plain_dict_route_translated(client):
+    res = await client.get("/plain", headers={"Accept-Language": "ja"})
+    assert res.json() == {"msg": "[ja] 直接返回"}
+
+
+async def test_error_translated_once(client, calls):
+    res = await client.get("/missing", headers={"Accept-Language": "en"})
+    body = res.json()
+    assert res.status_code == 404
+    assert body["msg"] == "[en] 资源未找到"
+    assert body["request"] == "/missing"
+    assert calls == [("资源未找到", "en")]
+
+
+async def test_streaming_passthrough(client, calls):
+    res = await client.get("/stream", headers={"Accept-Language": "en"})
+    assert json.loads(res.content) == {"msg": "流"}
+    assert calls == []
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+json / orjson 两条渲染路径的黄金输出：同一份 payload 字节级一致
+"""
+import datetime
+import uuid
+from decimal import Decimal
+from enum import Enum
+
+import pytest
+from pydantic import BaseModel
+from sqlalchemy import Column, Integer, Numeric, String, create_engine, select
+from sqlalchemy.orm import declarative_base
+
+from app.pedro import response as response_module
+from app.pedro.response import PedroJSONResponse, PedroResponse
+
+orjson = pytest.importorskip("orjson")
+
+Base = declarative_base()
+
+
+class Item(Base):
+    __tablename__ = "golden_item"
+    id = Column(Integer, primary_key=True)
+    name = Column(String(20))
+    price = Column(Numeric(10, 2))
+
+
+class Level(Enum):
+    GOLD = "gold"
+
+
+class Profile(BaseModel):
+    nickname: str
+    joined: datetime.date
+
+
+GOLDEN = (
+    '{"code":0,"msg":"成功","data":{'
+    '"decimal":12.5,'
+    '"naive":"2025-11-25T08:30:00.123456",'
+    '"aware":"2025-11-25T08:30:00+00:00",'
+    '"date":"2025-11-25",'
+    '"time":"08:30:00",'
+    '"uuid":"12345678-1234-5678-1234-567812345678",'
+    '"enum":"gold",'
+    '"bytes":"raw",'
+    '"set":[1],'
+    '"model":{"nickname":"小月","joined":"2025-01-01"},'
+    '"orm":{"id":1,"name":"面膜","price":9.9},'
+    '"row":{"id":1,"name":"面膜","price":9.9},'
+    '"nested":[{"amount":0.1}]}}'
+)
+
+
+@pytest.fixture(scope="module")
+def db_objects():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(Item.__table__.insert(), {"id": 1, "name": "面膜", "price": Decimal("9.90")})
+    with engine.connect() as conn:
+        row = conn.execute(select(Item.id, Item.name, Item.price)).first()
+    return Item(id=1, name="面膜", price=Decimal("9.90")), row
+
+
+def payload(orm, row):
+    return {
+        "decimal": Decimal("12.50"),
+        "naive": datetime.datetime(2025, 11, 25, 8, 30, 0, 123456),
+        "aware": datetime.datetime(2025, 11, 25, 8, 30, tzinfo=datetime.timezone.utc),
+        "date": datetime.date(2025, 11, 25),
+        "time": datetime.time(8, 30),
+        "uuid": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+        "enum": Level.GOLD,
+        "bytes": b"raw",
+        "set": {1},
+        "model": Profile(nickname="小月", joined=datetime.date(2025, 1, 1)),
+        "orm": orm,
+        "row": row,
+        "nested": [{"amount": Decimal("0.1")}],
+    }
+
+
+def render(monkeypatch, use_orjson: bool, data) -> bytes:
+    monkeypatch.setattr(response_module, "orjson_enabled", lambda: use_orjson)
+    return PedroResponse.success(data=data, msg="成功").body
+
+
+@pytest.mark.parametrize("use_orjson", [False, True], ids=["json", "orjson"])
+def test_golden_output(monkeypatch, db_objects, use_orjson):
+    body = render(monkeypatch, use_orjson, payload(*db_objects))
+    assert body.decode("utf-8") == GOLDEN
+
+
+@pytest.mark.parametrize("use_orjson", [False, True], ids=["json", "orjson"])
+def test_rows_list(monkeypatch, db_objects, use_orjson):
+    _, row = db_objects
+    body = render(monkeypatch, use_orjson, [row, row])
+    assert body == ('{"code":0,"msg":"成功","data":[%s,%s]}' % (('{"id":1,"name":"面膜","price":9.9}',) * 2)).encode()
+
+
+def test_orjson_falls_back_for_big_int(monkeypatch):
+    monkeypatch.setattr(response_module, "orjson_enabled", lambda: True)
+    body = PedroJSONResponse({"n": 2 ** 70}).body
+    assert body == b'{"n":1180591620717411303424}'
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+商品检索：子串语义（中文无需分词），SQLite FTS5 trigram（<3 字 LIKE 兜底）；PostgreSQL 表达式 ILIKE 走 pg_trgm 索引
+"""
+import pytest
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from app.api.v1.model.shop_product import ShopProduct
+from app.pedro.db import async_session_factory
+from app.pedro.search import PostgresSearchBackend, search_index, search_terms
+from test.conftest import create_tables
+
+FIELDS = ["title", "description", "brand"]
+
+
+@pytest.fixture
+async def products(db):
+    await create_tables(db, ShopProduct)
+    async with async_session_factory() as session:
+        session.add_all([
+            ShopProduct(title="补水面膜套装", description="深层补水", brand="Pedro"),
+            ShopProduct(title="Hydrating Sheet Mask", description="moisture_plus", brand="Glow"),
+            ShopProduct(title="氨基酸洗面奶", description="温和清洁", brand="Pedro"),
+        ])
+        await session.commit()
+    return db
+
+
+async def search(keyword: str) -> list:
+    items, total = await ShopProduct.paginate(keyword=keyword, keyword_fields=FIELDS, size=10)
+    assert total == len(items)
+    return sorted(item.title for item in items)
+
+
+async def test_uses_index_not_ilike_fallback(products):
+    assert search_index.hits(ShopProduct, "面膜", FIELDS, "sqlite") is not None
+
+
+async def test_chinese_substring_short_term(products):
+    assert await search("面膜") == ["补水面膜套装"]
+    assert await search("面") == ["氨基酸洗面奶", "补水面膜套装"]
+
+
+async def test_chinese_substring_trigram_term(products):
+    assert await search("水面膜") == ["补水面膜套装"]
+    assert await search("氨基酸洗") == ["氨基酸洗面奶"]
+
+
+async def test_mixed_terms_and_case(products):
+    assert await search("MASK") == ["Hydrating Sheet Mask"]
+    assert await search("补水 套装") == ["补水面膜套装"]
+    assert await search("pedro 洗面") == ["氨基酸洗面奶"]
+    # _ 按字面匹配，不当作 LIKE 通配符
+    assert await search("_") == ["Hydrating Sheet Mask"]
+    assert await search("g_s") == []
+
+
+def test_postgres_query_matches_trigram_index_expression():
+    hits = PostgresSearchBackend().hits(ShopProduct, search_terms("面膜 mask"))
+    sql = str(select(hits).compile(dialect=postgresql.dialect()))
+    document = PostgresSearchBackend.document(("title", "description", "brand"))
+
+    assert sql.count(f"{document} ILIKE") == 2
+    assert "word_similarity" in sql
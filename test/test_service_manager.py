@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+ServiceManager：初始化超时的服务在关闭阶段同样被 close
+"""
+import asyncio
+
+import pytest
+
+from app.pedro.service_manager import BaseService, ServiceManager
+
+
+class SlowService(BaseService):
+    name = "slow"
+    init_timeout = 0.05
+
+    async def init(self):
+        self.worker = asyncio.create_task(asyncio.sleep(3600))  # 超时前已启动的后台任务
+        await asyncio.sleep(3600)
+
+    async def close(self):
+        self.worker.cancel()
+        self.closed = True
+
+
+class FastService(BaseService):
+    name = "fast"
+
+    async def init(self):
+        pass
+
+    async def close(self):
+        self.closed = True
+
+
+@pytest.fixture(autouse=True)
+def isolated_manager(monkeypatch):
+    monkeypatch.setattr(ServiceManager, "_services", {})
+    monkeypatch.setattr(ServiceManager, "_timed_out", {})
+    monkeypatch.setattr(ServiceManager, "_init_durations", {})
+    monkeypatch.setattr(ServiceManager, "_waves", [])
+
+
+async def test_timed_out_service_closed_on_shutdown():
+    assert await ServiceManager._init_one("slow", SlowService) is False
+    assert await ServiceManager._init_one("fast", FastService) is True
+    slow = ServiceManager._timed_out["slow"]
+    fast = ServiceManager._services["fast"]
+    assert "slow" not in ServiceManager._services
+
+    await ServiceManager.close_all()
+
+    assert slow.closed and fast.closed
+    await asyncio.sleep(0)
+    assert slow.worker.cancelled()
+    assert ServiceManager._timed_out == {}
+
+
+async def test_eventbus_closes_before_redis_and_rabbitmq():
+    from app.extension.eventbus.service import EventBusService
+
+    closed = []
+
+    class Recording(BaseService):
+        def __init__(self, name):
+            self.name = name
+
+        async def close(self):
+            closed.append(self.name)
+
+    class Bus(Recording):
+        async def close(self):
+            await asyncio.sleep(0.01)  # handler / outbox 收尾期间 redis 仍可用
+            closed.append(self.name)
+
+    classes = {"redis": BaseService, "rabbitmq": BaseService, "eventbus": EventBusService}
+    waves, skipped = ServiceManager._build_waves(classes)
+    assert skipped == {} and waves == [["rabbitmq", "redis"], ["eventbus"]]
+
+    ServiceManager._waves = waves
+    ServiceManager._services = {
+        "redis": Recording("redis"), "rabbitmq": Recording("rabbitmq"), "eventbus": Bus("eventbus"),
+    }
+    await ServiceManager.close_all()
+    assert closed[0] == "eventbus"
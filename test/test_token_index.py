@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+用户 Token 索引（ZSET，score = 过期时间）
+- 超出 max_sessions 时踢掉最老的设备（access + 配对的 refresh）
+- 并发登录在 WATCH/MULTI 事务内完成检查与写入，在线数不超上限
+- revoke_all 一次 UNLINK；migrate_token_index 用 SCAN 补录旧 key
+"""
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.pedro.pedro_jwt import jwt_service
+
+UID = 7
+
+
+def index(kind: str) -> str:
+    return jwt_service.token_index_key(UID, kind)
+
+
+@pytest.fixture
+async def redis(fake_redis, monkeypatch):
+    monkeypatch.setattr(jwt_service, "max_sessions", 2)
+    return fake_redis
+
+
+async def login(redis, n: int, now_ts: float = None):
+    return await jwt_service._store_pair(redis, UID, f"a{n}", f"r{n}", now_ts or time.time())
+
+
+async def test_create_pair_indexes_both_tokens(redis):
+    async def is_admin():
+        return False
+
+    user = SimpleNamespace(id=UID, uuid=123, extra=SimpleNamespace(), is_admin=is_admin)
+    tokens = await jwt_service.create_pair(user)
+
+    assert await redis.zrange(index("access"), 0, -1) == [tokens["access_token"]]
+    assert await redis.zrange(index("refresh"), 0, -1) == [tokens["refresh_token"]]
+    assert await redis.hget(index("pairs"), tokens["access_token"]) == tokens["refresh_token"]
+    assert await redis.get(f"token:{UID}:access:{tokens['access_token']}") == "200"
+    assert 0 < await redis.ttl(index("refresh")) <= jwt_service.refresh_exp.total_seconds()
+
+
+async def test_eviction_removes_oldest_device_and_its_refresh(redis):
+    now = time.time()
+    await login(redis, 1, now)
+    await login(redis, 2, now + 1)
+    evicted = await login(redis, 3, now + 2)
+
+    assert evicted == ["a1"]
+    assert await redis.zrange(index("access"), 0, -1) == ["a2", "a3"]
+    assert await redis.zrange(index("refresh"), 0, -1) == ["r2", "r3"]
+    assert await redis.exists(f"token:{UID}:access:a1", f"token:{UID}:refresh:r1") == 0
+    assert await redis.exists(f"token:{UID}:access:a2", f"token:{UID}:refresh:r2") == 2
+    assert await redis.hkeys(index("pairs")) == ["a2", "a3"]
+
+
+async def test_expired_access_not_counted(redis):
+    now = time.time()
+    access_ttl = jwt_service.access_exp.total_seconds()
+    await login(redis, 1, now)
+    await login(redis, 2, now + access_ttl + 1)  # a1 已过期，不算在线
+
+    assert await redis.zrange(index("access"), 0, -1) == ["a2"]
+    # 过期设备的 refresh token 仍可用来续期
+    assert await redis.zrange(index("refresh"), 0, -1) == ["r1", "r2"]
+    assert await redis.exists(f"token:{UID}:refresh:r1")
+
+
+async def test_concurrent_logins_respect_device_limit(redis, monkeypatch):
+    original = redis.pipeline
+
+    def pipeline(*args, **kwargs):
+        # 读完在线列表后让出事件循环，让其它登录插进来
+        pipe = original(*args, **kwargs)
+        read = pipe.zrangebyscore
+
+        async def slow_read(*a, **kw):
+            result = await read(*a, **kw)
+            await asyncio.sleep(0)
+            return result
+
+        pipe.zrangebyscore = slow_read
+        return pipe
+
+    monkeypatch.setattr(redis, "pipeline", pipeline)
+    await login(redis, 0)
+    await asyncio.gather(*(login(redis, n) for n in range(1, 6)))
+
+    live = await redis.zrange(index("access"), 0, -1)
+    assert len(live) == jwt_service.max_sessions
+    assert await redis.zcard(index("refresh")) == jwt_service.max_sessions
+    assert len(await redis.keys(f"token:{UID}:access:*")) == jwt_service.max_sessions
+    assert len(await redis.keys(f"token:{UID}:refresh:*")) == jwt_service.max_sessions
+
+
+async def test_revoke_all_unlinks_indexed_keys(redis):
+    await login(redis, 1)
+    await login(redis, 2)
+    await redis.set("token:8:access:other", "200")
+
+    calls = []
+    original = redis.unlink
+
+    async def spy(*keys):
+        calls.append(keys)
+        return await original(*keys)
+
+    redis.unlink = spy
+    await jwt_service.revoke_all(UID)
+
+    assert len(calls) == 1
+    assert await redis.keys(f"token:{UID}:*") == []
+    assert await redis.get("token:8:access:other") == "200"
+
+
+async def test_migrate_token_index_backfills_from_ttl(redis):
+    await redis.setex(f"token:{UID}:access:old-a", 600, "200")
+    await redis.setex(f"token:{UID}:refresh:old-r", 3600, "200")
+    await redis.setex("token:8:access:other", 600, "200")
+    await redis.set(f"token:{UID}:access:no-ttl", "200")
+    await redis.setex(f"token:used:{UID}:x", 600, "1")
+
+    before = time.time()
+    assert await jwt_service.migrate_token_index(batch=2) == 3
+
+    access = await redis.zrange(index("access"), 0, -1, withscores=True)
+    assert [token for token, _ in access] == ["old-a"]
+    assert before + 590 < access[0][1] <= time.time() + 600
+    assert await redis.zrange(index("refresh"), 0, -1) == ["old-r"]
+    assert await redis.zrange(jwt_service.token_index_key(8, "access"), 0, -1) == ["other"]
+
+    # 迁移后的 token 参与在线数统计
+    await login(redis, 1)
+    evicted = await login(redis, 2)
+    assert evicted == ["old-a"]
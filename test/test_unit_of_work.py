@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+unit_of_work：块内 BaseCrud 共用一个 Session，结束时只提交一次
+- 异常整体回滚；嵌套加入外层事务
+- _session_scope：块外每次调用独立 Session，块内复用并交给外层提交
+"""
+import pytest
+from sqlalchemy import event, func, select
+
+from app.pedro.db import async_session_factory, current_session, unit_of_work, uow_session
+from app.pedro.interface import _session_scope
+from app.pedro.model import User
+from test.conftest import create_tables
+
+
+@pytest.fixture
+async def commits(db):
+    await create_tables(db, User)
+    counter = []
+
+    def on_commit(conn):
+        counter.append(conn)
+
+    event.listen(db.sync_engine, "commit", on_commit)
+    yield counter
+    event.remove(db.sync_engine, "commit", on_commit)
+
+
+async def usernames() -> list:
+    async with async_session_factory() as session:
+        result = await session.execute(select(User.username).order_by(User.id))
+        return list(result.scalars())
+
+
+async def test_commits_once_at_the_end(commits):
+    async with unit_of_work() as session:
+        alice = await User.create(username="alice", commit=True)
+        await User.create(username="bob", commit=True)
+        await alice.update(commit=True, nickname="Alice")
+        assert await User.count() == 2
+        assert commits == []
+        assert current_session() is session
+
+    assert len(commits) == 1
+    assert current_session() is None
+    assert await usernames() == ["alice", "bob"]
+    assert (await User.get(username="alice")).nickname == "Alice"
+
+
+async def test_exception_rolls_back_everything(commits):
+    with pytest.raises(RuntimeError):
+        async with unit_of_work():
+            await User.create(username="alice")
+            raise RuntimeError("boom")
+
+    assert commits == []
+    assert current_session() is None
+    assert await usernames() == []
+
+
+async def test_nested_joins_outer_transaction(commits):
+    async with unit_of_work() as outer:
+        await User.create(username="alice")
+        async with unit_of_work() as inner:
+            assert inner is outer
+            await User.create(username="bob")
+        assert commits == []  # 内层退出不提交
+
+        with pytest.raises(ValueError):
+            async with unit_of_work():
+                raise ValueError("inner failure")
+        # 内层异常在外层块内被捕获 → 外层照常提交
+
+    assert len(commits) == 1
+    assert await usernames() == ["alice", "bob"]
+
+    # 内层异常传到外层 → 整体回滚
+    with pytest.raises(ValueError):
+        async with unit_of_work():
+            await User.create(username="carol")
+            async with unit_of_work():
+                raise ValueError("inner failure")
+    assert await usernames() == ["alice", "bob"]
+
+
+async def test_session_scope_checkout(commits):
+    # 块外：每次调用开独立 Session，commit 由调用方负责
+    async with _session_scope() as (first, shared):
+        assert shared is False
+    async with _session_scope() as (second, shared):
+        assert shared is False
+    assert first is not second
+
+    # 块内：复用 unit_of_work 的 Session
+    async with unit_of_work() as session:
+        async with _session_scope() as (scoped, shared):
+            assert scoped is session and shared is True
+
+    # commit=True 在块外立即提交
+    await User.create(username="alice", commit=True)
+    assert len(commits) == 1
+    async with async_session_factory() as session:
+        assert await session.scalar(select(func.count(User.id))) == 1
+
+
+async def test_uow_session_dependency(commits):
+    dependency = uow_session()
+    session = await anext(dependency)
+    assert current_session() is session
+    await User.create(username="alice")
+
+    with pytest.raises(StopAsyncIteration):
+        await anext(dependency)
+    assert len(commits) == 1
+    assert current_session() is None
+    assert await usernames() == ["alice"]
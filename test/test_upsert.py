@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+BaseCrud.upsert：单行 INSERT ... ON CONFLICT DO UPDATE ... RETURNING
+- 先插入后更新都只发一条语句；返回的实例就是更新后的行（同一 Session 中已加载的对象也被刷新）
+- where 对不上 __upsert_key__ 时回退为 SELECT + INSERT / UPDATE
+- 块外 commit=False：Session 关闭即回滚
+"""
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import func, select
+
+from app.api.v1.model.crypto_assets import CryptoAsset
+from app.pedro.db import async_session_factory, unit_of_work
+from test.conftest import QueryCounter, create_tables
+
+
+@pytest.fixture
+async def table(db):
+    await create_tables(db, CryptoAsset)
+    return db
+
+
+async def stored(coin_id: str):
+    async with async_session_factory() as session:
+        return await session.scalar(select(CryptoAsset).where(CryptoAsset.coin_id == coin_id))
+
+
+async def row_count() -> int:
+    async with async_session_factory() as session:
+        return await session.scalar(select(func.count(CryptoAsset.id)))
+
+
+async def test_insert_then_update_via_on_conflict(table):
+    with QueryCounter(table) as counter:
+        created = await CryptoAsset.upsert(
+            where={"coin_id": "bitcoin"}, data={"symbol": "btc", "name": "Bitcoin", "current_price": 100},
+        )
+    assert counter.count == 1 and "ON CONFLICT" in counter.statements[0]
+
+    with QueryCounter(table) as counter:
+        updated = await CryptoAsset.upsert(where={"coin_id": "bitcoin"}, data={"current_price": 120})
+    assert counter.count == 1 and "ON CONFLICT" in counter.statements[0]
+
+    assert updated.id == created.id
+    assert await row_count() == 1
+    row = await stored("bitcoin")
+    assert (row.symbol, row.name, row.current_price) == ("btc", "Bitcoin", Decimal("120"))
+
+
+async def test_returning_row_reflects_update(table):
+    await CryptoAsset.upsert(where={"coin_id": "eth"}, data={"symbol": "eth", "current_price": 10})
+
+    async with unit_of_work():
+        loaded = await CryptoAsset.get(coin_id="eth")
+        assert loaded.current_price == Decimal("10")
+
+        updated = await CryptoAsset.upsert(where={"coin_id": "eth"}, data={"current_price": 11, "name": "Ether"})
+        # 同一 Session 的身份映射：RETURNING 覆盖已加载的旧值
+        assert updated is loaded
+        assert (updated.current_price, updated.name, updated.symbol) == (Decimal("11"), "Ether", "eth")
+
+    assert (await stored("eth")).current_price == Decimal("11")
+
+
+async def test_where_without_upsert_key_falls_back(table):
+    with QueryCounter(table) as counter:
+        created = await CryptoAsset.upsert(where={"symbol": "sol"}, data={"coin_id": "solana", "current_price": 1})
+    assert not any("ON CONFLICT" in s for s in counter.statements)
+    assert counter.statements[0].lstrip().upper().startswith("SELECT")
+    assert any(s.lstrip().upper().startswith("INSERT") for s in counter.statements)
+
+    with QueryCounter(table) as counter:
+        updated = await CryptoAsset.upsert(where={"symbol": "sol"}, data={"current_price": 2})
+    assert not any("ON CONFLICT" in s for s in counter.statements)
+    assert any(s.lstrip().upper().startswith("UPDATE") for s in counter.statements)
+
+    assert updated.id == created.id and updated.current_price == Decimal("2")
+    assert await row_count() == 1
+
+
+@pytest.mark.parametrize("where, data", [
+    ({"coin_id": "doge"}, {"symbol": "doge"}),           # ON CONFLICT 路径
+    ({"symbol": "doge"}, {"coin_id": "doge"}),            # SELECT + INSERT 回退路径
+])
+async def test_commit_false_outside_unit_of_work_rolls_back(table, where, data):
+    instance = await CryptoAsset.upsert(where=where, data=data, commit=False)
+    assert instance.coin_id == "doge"
+
+    assert await stored("doge") is None
+    assert await row_count() == 0
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+认证用户缓存：命中不查库；ORM 更新 / 软删除 / JSONB 直写提交后立即失效
+"""
+import pytest
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import update
+
+from app.api.cms.model.user import User as CmsUser
+from app.pedro import pedro_jwt
+from app.pedro.db import async_session_factory
+from app.pedro.exception import UnAuthentication
+from app.pedro.model import User
+from app.pedro.user_cache import user_cache
+from test.conftest import QueryCounter, create_tables
+
+CREDENTIALS = HTTPAuthorizationCredentials(scheme="Bearer", credentials="token")
+
+
+@pytest.fixture
+async def user(db, monkeypatch):
+    await create_tables(db, User)
+    user_cache.clear()
+
+    async with async_session_factory() as session:
+        user = User(username="alice", nickname="Alice")
+        session.add(user)
+        await session.commit()
+
+    async def fake_verify(token, request=None):
+        return {"uid": user.id, "ver": 0}
+
+    monkeypatch.setattr(pedro_jwt.jwt_service, "verify", fake_verify)
+    yield user
+    user_cache.clear()
+
+
+async def current_user():
+    return await pedro_jwt.get_current_user(CREDENTIALS, request=None)
+
+
+async def test_cache_hit_skips_database(db, user):
+    await current_user()
+    with QueryCounter(db) as counter:
+        cached = await current_user()
+    assert cached.nickname == "Alice"
+    assert counter.count == 0
+
+
+async def test_orm_update_invalidates(db, user):
+    await current_user()
+    await user.update(commit=True, nickname="Alice II")
+    assert (await current_user()).nickname == "Alice II"
+
+
+async def test_uncommitted_update_keeps_cache(db, user):
+    await current_user()
+    await user.update(nickname="rolled back")  # 未提交 → 会话关闭时回滚
+    with QueryCounter(db) as counter:
+        await current_user()
+    assert counter.count == 0
+
+
+async def test_soft_deleted_user_rejected_on_next_request(db, user):
+    await current_user()
+    await user.soft_delete(commit=True)
+    with pytest.raises(UnAuthentication):
+        await current_user()
+
+
+async def test_jsonb_write_invalidates(db, user):
+    async def rename(session, model, user_id, nickname):
+        # JsonbManager 依赖 PG 的 jsonb_set；这里用同样不经 ORM flush 的 Core UPDATE 代替
+        await session.execute(update(model).where(model.id == user_id).values(nickname=nickname))
+
+    await current_user()
+    await CmsUser._jsonb_write(rename, user.id, "Alice JSON")
+    assert (await current_user()).nickname == "Alice JSON"
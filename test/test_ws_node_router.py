@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+WS 跨节点路由：两个 WebSocketManager 共享同一个 fakeredis
+- 跨节点推送恰好送达一次（EventBus 中继事件不再经 WS adapter 重复投递）
+- PUBLISH 返回 0 只剔除心跳已过期的节点；订阅重连后重新登记本地路由
+"""
+import asyncio
+
+import pytest
+
+from app.extension.eventbus.adapter_ws import WebSocketAdapter
+from app.extension.eventbus.base import EventBus
+from app.extension.websocket.node_router import USER_ROUTE_KEY
+from app.extension.websocket.wss import WebSocketManager
+from test.test_ws_outbox import RecordingSocket, drain
+
+UID = "7"
+
+
+@pytest.fixture
+async def nodes(fake_redis):
+    a, b = WebSocketManager(), WebSocketManager()
+    await a.enable_routing(fake_redis, node_id="a")
+    await b.enable_routing(fake_redis, node_id="b")
+    yield a, b
+    await a.disable_routing()
+    await b.disable_routing()
+
+
+async def settle():
+    await asyncio.sleep(0.05)
+
+
+async def test_cross_node_user_delivered_once(nodes):
+    a, b = nodes
+    ws = RecordingSocket()
+    await b.connect(ws, UID)
+
+    await a.send_to_user(UID, {"type": "notice", "n": 1})
+    await settle()
+    await drain(b, ws)
+
+    assert ws.frames == [{"type": "notice", "n": 1}]
+
+
+async def test_relayed_event_skips_adapters(nodes, monkeypatch):
+    """源节点经 adapter 推送一次；其它节点收到的中继事件（relay=False）只触发本地订阅者"""
+    a, b = nodes
+    ws = RecordingSocket()
+    await b.connect(ws, UID)
+
+    adapter = WebSocketAdapter()
+    await adapter.init()
+    source, relayed = EventBus(), EventBus()
+    source.register_adapter(adapter)
+    relayed.register_adapter(adapter)
+    handled = []
+
+    @relayed.on("notify")
+    async def on_notify(data):
+        handled.append(data)
+
+    monkeypatch.setattr("app.extension.eventbus.adapter_ws.websocket_manager", a)
+    data = {"uid": UID, "message": {"type": "notice"}}
+    await source.publish("notify", data)
+
+    # 节点 B 收到 Redis / MQ 中继
+    monkeypatch.setattr("app.extension.eventbus.adapter_ws.websocket_manager", b)
+    await relayed.publish("notify", {**data, "_src": "a"}, relay=False)
+    await settle()
+    await drain(b, ws)
+
+    assert ws.frames == [{"type": "notice"}]
+    assert handled and handled[0]["_src"] == "a"
+    await relayed.close()
+
+
+async def test_missed_publish_keeps_live_node(nodes, fake_redis):
+    a, b = nodes
+    ws = RecordingSocket()
+    await b.connect(ws, UID)
+    route_key = USER_ROUTE_KEY.format(uid=UID)
+
+    # B 的订阅断开（心跳仍在）→ PUBLISH 返回 0，但不剔除
+    b.router.reconnect_delay = 0.2
+    await b.router._pubsub.unsubscribe(b.router.inbox)
+    await settle()
+    await a.send_to_user(UID, {"n": 1})
+    assert await fake_redis.smembers(route_key) == {"b"}
+
+    # 心跳过期 = 真正下线 → 剔除
+    await fake_redis.delete(b.router.alive_key)
+    await a.send_to_user(UID, {"n": 2})
+    assert await fake_redis.smembers(route_key) == set()
+
+    # 订阅重连后重新登记本地 uid，投递恢复
+    await asyncio.sleep(0.3)
+    assert await fake_redis.smembers(route_key) == {"b"}
+    await a.send_to_user(UID, {"n": 3})
+    await settle()
+    await drain(b, ws)
+    assert ws.frames == [{"n": 3}]
+
+
+async def test_heartbeat_lapse_reregisters_routes(fake_redis):
+    manager = WebSocketManager()
+    await manager.connect(RecordingSocket(), UID)
+    router = await manager.enable_routing(fake_redis, node_id="c")
+    router.heartbeat_interval = 0.01
+    router._heartbeat_task.cancel()
+    router._heartbeat_task = asyncio.create_task(router._heartbeat())
+
+    # 模拟心跳过期后被其它节点剔除
+    await fake_redis.delete(router.alive_key)
+    await fake_redis.srem(USER_ROUTE_KEY.format(uid=UID), "c")
+    await asyncio.sleep(0.05)
+
+    assert await fake_redis.exists(router.alive_key)
+    assert await fake_redis.smembers(USER_ROUTE_KEY.format(uid=UID)) == {"c"}
+    await manager.disable_routing()
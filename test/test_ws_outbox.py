@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+WS 发送队列：控制帧插队；空闲断开的提示与 close 都由写协程串行完成
+"""
+import asyncio
+import json
+
+from app.extension.websocket.wss import WebSocketManager
+
+
+class RecordingSocket:
+    """记录下行帧；检测是否有两个协程同时写 socket"""
+
+    def __init__(self, delay: float = 0.001):
+        self.delay = delay
+        self.frames = []
+        self.closed_with = None
+        self._writing = False
+        self.overlaps = 0
+
+    async def _write(self, item):
+        if self._writing:
+            self.overlaps += 1
+        self._writing = True
+        try:
+            await asyncio.sleep(self.delay)
+            self.frames.append(item)
+        finally:
+            self._writing = False
+
+    async def send_text(self, msg: str):
+        await self._write(json.loads(msg))
+
+    async def send_json(self, data):
+        await self._write(data)
+
+    async def close(self, code: int = 1000, reason: str = ""):
+        await self._write(("close", code))
+        self.closed_with = (code, reason)
+
+
+async def drain(manager, ws, timeout: float = 1.0):
+    outbox = manager.clients[ws]["outbox"]
+    deadline = asyncio.get_running_loop().time() + timeout
+    while (outbox.queue or outbox.control) and asyncio.get_running_loop().time() < deadline:
+        await asyncio.sleep(0.005)
+    await asyncio.sleep(0.01)
+
+
+async def test_control_frames_jump_the_queue():
+    manager = WebSocketManager()
+    ws = RecordingSocket()
+    await manager.connect(ws, "1")
+
+    for i in range(20):
+        await manager.send(ws, {"type": "tick", "i": i})
+    await manager.send(ws, {"type": "pong", "t": 1}, priority=True)
+    await drain(manager, ws)
+
+    types = [f["type"] for f in ws.frames]
+    assert types.index("pong") < 3  # 最多等当前正在写的那一帧
+    assert types.count("tick") == 20
+    assert ws.overlaps == 0
+    await manager.disconnect(ws)
+
+
+async def test_control_frames_bypass_disconnect_policy():
+    manager = WebSocketManager()
+    manager.outbox_size = 2
+    manager.slow_policy = "disconnect"
+    ws = RecordingSocket(delay=0.05)
+    await manager.connect(ws, "1")
+
+    for i in range(3):
+        await manager.send(ws, {"type": "tick", "i": i})
+    assert ws not in manager.clients  # 业务队列溢出 → 断开
+
+    ws2 = RecordingSocket(delay=0.05)
+    await manager.connect(ws2, "2")
+    for _ in range(10):
+        await manager.send(ws2, {"type": "pong"}, priority=True)
+    assert ws2 in manager.clients
+    await manager.disconnect(ws2)
+
+
+async def test_idle_close_goes_through_writer():
+    manager = WebSocketManager()
+    ws = RecordingSocket()
+    await manager.connect(ws, "1")
+
+    for i in range(5):
+        await manager.send(ws, {"type": "tick", "i": i})
+    await manager._close_idle_batch([ws])
+    await manager.send(ws, {"type": "tick", "i": 99})  # 关闭过程中的新消息被忽略
+    for _ in range(100):
+        if ws not in manager.clients:
+            break
+        await asyncio.sleep(0.005)
+
+    assert ws.overlaps == 0
+    assert ws.closed_with == (4004, "Idle timeout")
+    assert ws.frames[-2] == {"type": "system", "error": "idle_timeout"}
+    assert ws.frames[-1] == ("close", 4004)
+    assert {"type": "tick", "i": 99} not in ws.frames
+    assert ws not in manager.clients and not manager.is_online("1")
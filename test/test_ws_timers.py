@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+ConnectionTimers：一个最小堆调度全部连接的 ping / 空闲断开
+- _collect 按真实 last_seen 判定到期；touch 只改内存，出堆时顺延
+- 同一连接重复登记不会留下第二条 ping 流
+- _run 在最近的 deadline 唤醒并批量回调 manager
+"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.extension.websocket import timers as timers_module
+from app.extension.websocket.timers import ConnectionTimers
+from app.extension.websocket.wss import WebSocketManager
+from test.test_ws_outbox import RecordingSocket
+
+
+class RecordingManager:
+    def __init__(self):
+        self.pings = []
+        self.idle = []
+
+    def _ping_batch(self, sockets):
+        self.pings.append(list(sockets))
+
+    async def _close_idle_batch(self, sockets):
+        self.idle.append(list(sockets))
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """只替换 timers 模块看到的 time.monotonic（事件循环仍用真实时钟）"""
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(timers_module, "time", SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+
+@pytest.fixture
+def timers():
+    timers = ConnectionTimers(RecordingManager(), heartbeat_interval=30, resolution=0.5)
+    yield timers
+    timers.close()
+
+
+def collect_at(timers, clock, t: float):
+    clock.now = 1000.0 + t
+    return timers._collect(clock.now)
+
+
+async def test_ping_due_after_heartbeat_interval(timers, clock):
+    ws = object()
+    timers.add(ws)
+
+    assert collect_at(timers, clock, 29) == ([], [])
+    assert collect_at(timers, clock, 30) == ([ws], [])
+    assert collect_at(timers, clock, 45) == ([], [])
+    assert collect_at(timers, clock, 60) == ([ws], [])
+
+
+async def test_touch_pushes_ping_back(timers, clock):
+    ws = object()
+    timers.add(ws)
+
+    clock.now = 1020.0
+    timers.touch(ws)
+    assert collect_at(timers, clock, 30) == ([], [])  # 出堆后按 last_seen 顺延到 50
+    assert len(timers._heap) == 1
+    assert collect_at(timers, clock, 50) == ([ws], [])
+
+
+async def test_idle_deadline_and_touch(timers, clock):
+    ws = object()
+    timers.add(ws, idle_timeout=10)
+
+    clock.now = 1005.0
+    timers.touch(ws)
+    assert collect_at(timers, clock, 10) == ([], [])
+    assert collect_at(timers, clock, 15) == ([], [ws])
+    # 空闲断开后不再调度
+    assert len(timers) == 0
+    assert collect_at(timers, clock, 30) == ([], [])
+
+
+async def test_set_idle_timeout_after_add(timers, clock):
+    ws = object()
+    timers.add(ws)
+    timers.set_idle_timeout(ws, 5)
+
+    assert collect_at(timers, clock, 5) == ([], [ws])
+
+
+async def test_reregister_keeps_single_ping_stream(timers, clock):
+    ws = object()
+    timers.add(ws, idle_timeout=100)
+    clock.now = 1010.0
+    timers.remove(ws)
+    timers.add(ws)  # WebSocketManager.connect 对同一连接重复登记
+
+    assert collect_at(timers, clock, 30) == ([], [])  # 第一次登记的 ping 条目被丢弃
+    assert collect_at(timers, clock, 40) == ([ws], [])
+    assert collect_at(timers, clock, 70) == ([ws], [])
+    assert collect_at(timers, clock, 100) == ([ws], [])  # 旧的空闲断开也不再生效
+    assert len(timers._heap) == 1
+
+
+async def test_manager_reconnect_same_socket():
+    manager = WebSocketManager()
+    ws = RecordingSocket()
+    await manager.connect(ws, "1")
+    await manager.connect(ws, "1")
+
+    live = [entry for entry in manager.timers._heap
+            if manager.timers._state.get(entry[2], {}).get("gen") == entry[4]]
+    assert len(live) == 1
+    await manager.disconnect(ws)
+    manager.timers.close()
+
+
+async def test_run_loop_pings_and_closes_idle():
+    manager = RecordingManager()
+    timers = ConnectionTimers(manager, heartbeat_interval=0.05, resolution=0.005)
+    busy, idle = object(), object()
+    timers.add(busy, idle_timeout=0.12)
+    timers.add(idle, idle_timeout=0.12)
+
+    # busy 持续活跃：空闲断开与 ping 都被 touch 顺延
+    for _ in range(12):
+        await asyncio.sleep(0.02)
+        timers.touch(busy)
+
+    pinged = [ws for batch in manager.pings for ws in batch]
+    closed = [ws for batch in manager.idle for ws in batch]
+    assert closed == [idle]
+    assert busy not in pinged
+    assert 1 <= pinged.count(idle) <= 3
+    assert len(timers) == 1
+    timers.close()
+
+
+async def test_run_loop_wakes_for_earlier_deadline():
+    manager = RecordingManager()
+    timers = ConnectionTimers(manager, heartbeat_interval=10, resolution=0.005)
+    timers.add(object())
+    await asyncio.sleep(0.01)  # 调度协程在 10s 后的 ping 上等待
+
+    ws = object()
+    timers.add(ws, idle_timeout=0.03)
+    await asyncio.sleep(0.1)
+
+    assert manager.idle == [[ws]]
+    timers.close()
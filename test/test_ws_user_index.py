@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+WS uid 索引（user_clients）：send_to_user O(设备数)
+- int / str uid 归到同一个键；多端同时在线都能收到
+- 同一连接重复登记、主动断开、发送队列溢出 / 写失败被剔除后，索引里不留旧条目
+"""
+import asyncio
+
+import pytest
+
+from app.extension.websocket.wss import WebSocketManager
+from test.test_ws_outbox import RecordingSocket, drain
+
+
+class BrokenSocket(RecordingSocket):
+    async def send_text(self, msg: str):
+        raise ConnectionError("client gone")
+
+
+@pytest.fixture
+async def manager():
+    manager = WebSocketManager()
+    yield manager
+    for ws in list(manager.clients):
+        await manager.disconnect(ws)
+    manager.timers.close()
+
+
+async def wait_for(predicate, timeout: float = 1.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.005)
+
+
+async def test_int_and_str_uid_share_one_key(manager):
+    ws = RecordingSocket()
+    await manager.connect(ws, 7)
+
+    assert manager.is_online(7) and manager.is_online("7")
+    assert manager.user_connections("7") == {ws}
+    await manager.send_to_user("7", {"n": 1})
+    await manager.send_to_user(7, {"n": 2})
+    await drain(manager, ws)
+
+    assert ws.frames == [{"n": 1}, {"n": 2}]
+    assert list(manager.user_clients) == ["7"]
+
+
+async def test_all_devices_receive(manager):
+    phone, laptop, other = RecordingSocket(), RecordingSocket(), RecordingSocket()
+    await manager.connect(phone, "7")
+    await manager.connect(laptop, 7)
+    await manager.connect(other, "8")
+
+    await manager.send_to_user(7, {"type": "notice"})
+    await drain(manager, phone)
+    await drain(manager, laptop)
+
+    assert phone.frames == laptop.frames == [{"type": "notice"}]
+    assert other.frames == []
+
+    await manager.disconnect(phone)
+    assert manager.user_connections(7) == {laptop}
+    await manager.disconnect(laptop)
+    assert not manager.is_online(7)
+    assert "7" not in manager.user_clients
+
+
+async def test_reregister_same_socket(manager):
+    ws = RecordingSocket()
+    await manager.connect(ws, "7")
+    await manager.connect(ws, "7")
+
+    assert manager.user_connections("7") == {ws}
+    await manager.send_to_user("7", {"n": 1})
+    await drain(manager, ws)
+    assert ws.frames == [{"n": 1}]
+
+    # 换了 uid 重新登记：旧 uid 的索引被清掉
+    await manager.connect(ws, "8")
+    assert not manager.is_online("7")
+    assert manager.user_connections("8") == {ws}
+    assert len(manager.clients) == 1
+
+
+async def test_outbox_overflow_eviction_empties_index(manager):
+    manager.outbox_size = 2
+    manager.slow_policy = "disconnect"
+    slow, ok = RecordingSocket(delay=0.05), RecordingSocket()
+    await manager.connect(slow, "7")
+    await manager.connect(ok, "8")
+
+    for i in range(4):
+        await manager.send_to_user("7", {"i": i})
+
+    assert slow not in manager.clients
+    assert not manager.is_online("7")
+    assert "7" not in manager.user_clients
+    assert manager.is_online("8")
+
+
+async def test_write_failure_eviction_empties_index(manager):
+    broken, ok = BrokenSocket(), RecordingSocket()
+    await manager.connect(broken, "7")
+    await manager.connect(ok, "7")
+
+    await manager.send_to_user("7", {"n": 1})
+    await wait_for(lambda: broken not in manager.clients)
+
+    assert manager.user_connections("7") == {ok}
+    await drain(manager, ok)
+    assert ok.frames == [{"n": 1}]
+
+    await manager.disconnect(ok)
+    assert manager.user_clients == {}